@@ -0,0 +1,12 @@
+"""
+Benchmarks for kenkenpa.
+
+Run the suite from the repository root:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline results.json
+
+The import time budgets can also be checked alone:
+
+    python -m benchmarks.importtime
+"""
@@ -0,0 +1,136 @@
+"""
+Measures the import time of kenkenpa modules with `python -X importtime`
+and checks it against a budget.
+
+Each module is imported in a fresh interpreter, so the times include
+the modules it pulls in that the interpreter does not load at startup.
+The process exits with status 1 if any module exceeds its budget.
+
+Usage:
+    python -m benchmarks.importtime [--repeat 5] [--budget kenkenpa.builder=300]
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+IMPORT_BUDGETS_MS = {
+    "kenkenpa.common": 100.0,
+    "kenkenpa.param": 100.0,
+    "kenkenpa.builder": 300.0,
+}
+"""The default import time budgets in milliseconds, keyed by module."""
+
+def import_time_ms(module:str) -> float:
+    """
+    Imports a module in a fresh interpreter and returns its cumulative import time.
+
+    Args:
+        module (str): The module name.
+
+    Returns:
+        float: The cumulative import time in milliseconds, as reported by `-X importtime`.
+
+    Raises:
+        RuntimeError: If the import fails or its time is not reported.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=False,
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}: {completed.stderr.strip()}")
+
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"The import time of {module} was not reported.")
+
+def measure_imports(modules:List[str], repeat:int = 5) -> Dict:
+    """
+    Measures the import time of modules.
+
+    Args:
+        modules (List[str]): The module names.
+        repeat (int, optional): The number of fresh imports per module. Defaults to 5.
+
+    Returns:
+        Dict: The best and mean import time in milliseconds and repeat, keyed by module.
+    """
+    results = {}
+    for module in modules:
+        timings = [import_time_ms(module) for _ in range(repeat)]
+        results[module] = {
+            "best_ms":min(timings),
+            "mean_ms":sum(timings) / len(timings),
+            "number":1,
+            "repeat":repeat,
+        }
+    return results
+
+def check_budgets(results:Dict, budgets:Optional[Dict[str,float]] = None) -> Dict:
+    """
+    Compares the best import times against their budgets.
+
+    Args:
+        results (Dict): The output of measure_imports.
+        budgets (Optional[Dict[str,float]], optional): The budgets in milliseconds,
+            keyed by module. Defaults to IMPORT_BUDGETS_MS.
+
+    Returns:
+        Dict: For every measured module with a budget, the budget, the best time
+            and whether the budget is exceeded.
+    """
+    budgets = IMPORT_BUDGETS_MS if budgets is None else budgets
+    return {
+        module:{
+            "budget_ms":budgets[module],
+            "best_ms":result["best_ms"],
+            "exceeded":result["best_ms"] > budgets[module],
+        }
+        for module, result in results.items() if module in budgets
+    }
+
+def parse_budgets(items:List[str]) -> Dict[str,float]:
+    """
+    Parses budget overrides of the form module=milliseconds.
+
+    Args:
+        items (List[str]): The overrides.
+
+    Returns:
+        Dict[str,float]: The default budgets updated with the overrides.
+
+    Raises:
+        ValueError: If an override is malformed.
+    """
+    budgets = dict(IMPORT_BUDGETS_MS)
+    for item in items:
+        module, separator, value = item.partition("=")
+        if not separator or not module:
+            raise ValueError(f"Budgets must be given as module=milliseconds: {item}")
+        budgets[module] = float(value)
+    return budgets
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", action="append", default=[],
+                        help="Override or add a budget, as module=milliseconds. May be repeated.")
+    args = parser.parse_args()
+
+    budgets = parse_budgets(args.budget)
+    results = measure_imports(list(budgets), args.repeat)
+    report = {"results":results, "budgets":check_budgets(results, budgets)}
+    print(json.dumps(report, indent=2))
+
+    if any(item["exceeded"] for item in report["budgets"].values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
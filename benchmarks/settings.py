@@ -0,0 +1,167 @@
+"""
+Synthesizes graph settings of configurable size for the benchmarks.
+"""
+import operator
+from typing import Dict, List
+
+STATE_FIELDS = [
+    {"field_name":"value","type":"int"},
+    {"field_name":"flag","type":"bool"},
+    {"field_name":"messages","type":"list","reducer":"add"},
+]
+
+def node_factory(factory_parameter,flow_parameter):
+    """
+    Node factory for the synthesized settings. The nodes do nothing.
+    """
+    def node(state):
+        return {}
+    return node
+
+def get_value(state,config,key):
+    """
+    Evaluation function for the synthesized settings. Returns a state value.
+    """
+    return state.get(key)
+
+EVALUETE_FUNCTIONS = {"get_value":get_value}
+NODE_FACTORYS = {"node_factory":node_factory}
+REDUCERS = {"add":operator.add}
+
+def gen_comparison(seed:int):
+    """
+    Generates a comparison, rotating between state, config and function operands.
+    """
+    kind = seed % 3
+    if kind == 0:
+        return {"eq":[{"type":"state_value","name":"value"},seed]}
+    if kind == 1:
+        return {"neq":[{"type":"config_value","name":"mode"},f"mode_{seed}"]}
+    return {"gt":[{"type":"function","name":"get_value","args":{"key":"value"}},seed]}
+
+def gen_expression(depth:int,seed:int):
+    """
+    Generates an expression nested depth levels deep, alternating `and` and `or`.
+    An expression of depth 1 is a single comparison.
+    """
+    if depth <= 1:
+        return gen_comparison(seed)
+    operator_ = "and" if depth % 2 == 0 else "or"
+    return {operator_:[
+        gen_expression(depth - 1,seed),
+        gen_expression(depth - 1,seed + 1),
+    ]}
+
+def gen_conditions(
+    condition_count:int,
+    expression_depth:int,
+    targets:List[str],
+    default:str = "END",
+    ) -> List[Dict]:
+    """
+    Generates condition_count conditions routing to targets, followed by a default.
+    """
+    conditions = [
+        {
+            "expression":gen_expression(expression_depth,index),
+            "result":targets[index % len(targets)],
+        }
+        for index in range(condition_count)
+    ]
+    conditions.append({"default":default})
+    return conditions
+
+def gen_flows(
+    node_count:int,
+    fan_out:int,
+    depth:int,
+    condition_count:int,
+    expression_depth:int,
+    ) -> List[Dict]:
+    """
+    Generates the flows of one graph level.
+
+    Nodes are chained from START; every node has a configurable conditional edge
+    to the fan_out following nodes. If depth is greater than zero, a nested
+    `stategraph` flow with the same shape is reached from the last node.
+    """
+    node_names = [f"node_{index}" for index in range(node_count)]
+    flows = [
+        {
+            "graph_type":"node",
+            "flow_parameter":{"name":name,"factory":"node_factory"},
+            "factory_parameter":{"index":index},
+        }
+        for index, name in enumerate(node_names)
+    ]
+    flows.append({
+        "graph_type":"edge",
+        "flow_parameter":{"start_key":"START","end_key":node_names[0]},
+    })
+
+    for index, name in enumerate(node_names):
+        targets = [
+            node_names[(index + offset) % node_count]
+            for offset in range(1, max(fan_out, 1) + 1)
+        ]
+        is_last = index == node_count - 1
+        flows.append({
+            "graph_type":"configurable_conditional_edge",
+            "flow_parameter":{
+                "start_key":name,
+                "conditions":gen_conditions(
+                    condition_count,
+                    expression_depth,
+                    targets,
+                    default="subgraph" if is_last and depth > 0 else "END",
+                ),
+            },
+        })
+
+    if depth > 0:
+        flows.append({
+            "graph_type":"stategraph",
+            "flow_parameter":{
+                "name":"subgraph",
+                "state":STATE_FIELDS,
+            },
+            "flows":gen_flows(node_count,fan_out,depth - 1,condition_count,expression_depth),
+        })
+        flows.append({
+            "graph_type":"edge",
+            "flow_parameter":{"start_key":"subgraph","end_key":"END"},
+        })
+
+    return flows
+
+def gen_graph_settings(
+    node_count:int = 50,
+    fan_out:int = 3,
+    depth:int = 1,
+    condition_count:int = 5,
+    expression_depth:int = 3,
+    ) -> Dict:
+    """
+    Generates graph settings of configurable size.
+
+    Args:
+        node_count (int, optional): The number of nodes in each graph level. Defaults to 50.
+        fan_out (int, optional): The number of distinct targets of each conditional edge.
+            Defaults to 3.
+        depth (int, optional): The nesting depth of `stategraph` flows. Defaults to 1.
+        condition_count (int, optional): The number of conditions of each conditional edge,
+            excluding the default. Defaults to 5.
+        expression_depth (int, optional): The nesting depth of each condition's expression.
+            Defaults to 3.
+
+    Returns:
+        Dict: The graph settings.
+    """
+    return {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"benchmark",
+            "state":STATE_FIELDS,
+        },
+        "flows":gen_flows(node_count,fan_out,depth,condition_count,expression_depth),
+    }
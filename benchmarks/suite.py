@@ -0,0 +1,262 @@
+"""
+Times the phases of building and running a graph on synthesized graph settings:
+validate_state_graph, StateBuilder.gen_state, StateGraphBuilder.gen_stategraph,
+StateGraph.compile and ConfigurableConditionalHandler.__call__,
+and measures the import time of kenkenpa modules against their budgets.
+
+Results are written as JSON, and can be compared against a baseline written
+by an earlier run. The process exits with status 1 if any benchmark is slower
+than its baseline by more than the threshold, or if a module exceeds its import budget.
+
+Usage:
+    python -m benchmarks.suite [--nodes 50] [--fan-out 3] [--depth 1]
+        [--conditions 5] [--expression-depth 3] [--repeat 5]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.2]
+        [--budget kenkenpa.builder=300]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from importlib import metadata
+from typing import Callable, Dict, Optional
+
+from kenkenpa.builder import StateGraphBuilder, validate_state_graph
+from kenkenpa.edges import ConfigurableConditionalHandler
+from kenkenpa.state import StateBuilder
+
+from benchmarks import importtime, validation_benchmark
+from benchmarks.settings import (
+    EVALUETE_FUNCTIONS,
+    NODE_FACTORYS,
+    REDUCERS,
+    gen_conditions,
+    gen_graph_settings,
+)
+
+def measure(
+    func:Callable[[],None],
+    setup:Optional[Callable[[],None]] = None,
+    number:int = 1,
+    repeat:int = 5,
+    ) -> Dict:
+    """
+    Times func, calling setup before each repetition outside the timed section.
+
+    Args:
+        func (Callable[[],None]): The function to time.
+        setup (Optional[Callable[[],None]], optional): Called before each repetition.
+        number (int, optional): The number of calls per repetition. Defaults to 1.
+        repeat (int, optional): The number of repetitions. Defaults to 5.
+
+    Returns:
+        Dict: The best and mean time per call in milliseconds, number and repeat.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+
+    return {
+        "best_ms":min(timings) * 1000,
+        "mean_ms":sum(timings) / len(timings) * 1000,
+        "number":number,
+        "repeat":repeat,
+    }
+
+def new_builder(graph_settings:Dict) -> StateGraphBuilder:
+    """
+    Creates a StateGraphBuilder for the synthesized settings.
+    """
+    return StateGraphBuilder(
+        graph_settings,
+        node_factorys=dict(NODE_FACTORYS),
+        evaluete_functions=dict(EVALUETE_FUNCTIONS),
+        reducers=dict(REDUCERS),
+        )
+
+def run_benchmarks(
+    node_count:int = 50,
+    fan_out:int = 3,
+    depth:int = 1,
+    condition_count:int = 5,
+    expression_depth:int = 3,
+    repeat:int = 5,
+    handler_calls:int = 1000,
+    import_budgets:Optional[Dict[str,float]] = None,
+    ) -> Dict:
+    """
+    Runs every benchmark on settings of the given size.
+    The modules with an import budget are imported repeat times in fresh interpreters.
+
+    Returns:
+        Dict: The run parameters, environment and results keyed by benchmark name.
+    """
+    params = {
+        "node_count":node_count,
+        "fan_out":fan_out,
+        "depth":depth,
+        "condition_count":condition_count,
+        "expression_depth":expression_depth,
+        "repeat":repeat,
+        "handler_calls":handler_calls,
+    }
+    graph_settings = gen_graph_settings(
+        node_count=node_count,
+        fan_out=fan_out,
+        depth=depth,
+        condition_count=condition_count,
+        expression_depth=expression_depth,
+        )
+    results = {}
+
+    results["validate_state_graph"] = measure(
+        lambda: validate_state_graph(graph_settings),
+        repeat=repeat,
+        )
+
+    flat_settings = validation_benchmark.gen_graph_settings(len(graph_settings["flows"]))
+    results["validate_state_graph_flat"] = measure(
+        lambda: validate_state_graph(flat_settings),
+        repeat=repeat,
+        )
+
+    state_builder = StateBuilder(reducers=dict(REDUCERS))
+    state = graph_settings["flow_parameter"]["state"]
+    results["gen_state"] = measure(
+        lambda: state_builder.gen_state(state),
+        number=100,
+        repeat=repeat,
+        )
+
+    builders = []
+    results["gen_stategraph"] = measure(
+        lambda: builders[-1].gen_stategraph(),
+        setup=lambda: builders.append(new_builder(graph_settings)),
+        repeat=repeat,
+        )
+
+    stategraphs = []
+    results["compile"] = measure(
+        lambda: stategraphs[-1].compile(),
+        setup=lambda: stategraphs.append(new_builder(graph_settings).gen_stategraph()),
+        repeat=repeat,
+        )
+
+    targets = [f"node_{index}" for index in range(max(fan_out, 1))]
+    handler = ConfigurableConditionalHandler(
+        gen_conditions(condition_count,expression_depth,targets),
+        EVALUETE_FUNCTIONS,
+        )
+    # no condition matches, so every condition is evaluated before the default.
+    handler_state = {"value":-1,"flag":False,"messages":[]}
+    handler_config = {"configurable":{"mode":"mode_1"}}
+    results["handler_call"] = measure(
+        lambda: handler(handler_state,handler_config),
+        number=handler_calls,
+        repeat=repeat,
+        )
+
+    import_budgets = importtime.IMPORT_BUDGETS_MS if import_budgets is None else import_budgets
+    import_results = importtime.measure_imports(list(import_budgets), repeat)
+    for module, result in import_results.items():
+        results[f"import_{module}"] = result
+
+    return {
+        "params":params,
+        "environment":{
+            "python":platform.python_version(),
+            "platform":platform.platform(),
+            "kenkenpa":_version("kenkenpa"),
+            "langgraph":_version("langgraph"),
+        },
+        "results":results,
+        "import_budgets":importtime.check_budgets(import_results, import_budgets),
+    }
+
+def compare(results:Dict,baseline:Dict,threshold:float) -> Dict:
+    """
+    Compares the best times of results against a baseline.
+
+    Args:
+        results (Dict): The output of run_benchmarks.
+        baseline (Dict): The output of an earlier run.
+        threshold (float): The allowed relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        Dict: For every benchmark in both runs, the baseline and current best times,
+            their ratio and whether it is a regression.
+    """
+    comparison = {}
+    for name, result in results["results"].items():
+        base = baseline.get("results",{}).get(name)
+        if base is None:
+            continue
+        ratio = result["best_ms"] / base["best_ms"] if base["best_ms"] else float("inf")
+        comparison[name] = {
+            "baseline_ms":base["best_ms"],
+            "current_ms":result["best_ms"],
+            "ratio":ratio,
+            "regression":ratio > 1 + threshold,
+        }
+    return comparison
+
+def _version(distribution:str) -> Optional[str]:
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=50)
+    parser.add_argument("--fan-out", type=int, default=3)
+    parser.add_argument("--depth", type=int, default=1)
+    parser.add_argument("--conditions", type=int, default=5)
+    parser.add_argument("--expression-depth", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--handler-calls", type=int, default=1000)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare the results against this JSON file.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed relative slowdown against the baseline. Defaults to 0.2.")
+    parser.add_argument("--budget", action="append", default=[],
+                        help="Override or add an import budget, as module=milliseconds. May be repeated.")
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        node_count=args.nodes,
+        fan_out=args.fan_out,
+        depth=args.depth,
+        condition_count=args.conditions,
+        expression_depth=args.expression_depth,
+        repeat=args.repeat,
+        handler_calls=args.handler_calls,
+        import_budgets=importtime.parse_budgets(args.budget),
+        )
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("params") != results["params"]:
+            print("warning: the baseline was run with different parameters", file=sys.stderr)
+        results["comparison"] = compare(results, baseline, args.threshold)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    print(output)
+
+    if any(item["regression"] for item in results.get("comparison",{}).values()):
+        sys.exit(1)
+    if any(item["exceeded"] for item in results["import_budgets"].values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
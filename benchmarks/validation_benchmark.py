@@ -0,0 +1,74 @@
+"""
+Measures the time taken by validate_state_graph for a graph with thousands of flows.
+
+Run it from the repository root:
+
+    python -m benchmarks.validation_benchmark [--flows 3000] [--repeat 5]
+
+The full suite in benchmarks/suite.py also runs this benchmark as validate_state_graph_flat.
+"""
+import argparse
+import timeit
+
+from kenkenpa.builder import validate_state_graph
+
+def gen_graph_settings(flow_count:int):
+    """
+    Generates graph settings with roughly flow_count flows,
+    split evenly between nodes, edges and configurable conditional edges.
+    """
+    node_count = max(flow_count // 3, 1)
+    flows = []
+    for i in range(node_count):
+        flows.append({
+            "graph_type":"node",
+            "flow_parameter":{"name":f"node_{i}","factory":"node_factory"},
+            "factory_parameter":{"index":i},
+        })
+        flows.append({
+            "graph_type":"edge",
+            "flow_parameter":{"start_key":f"node_{i}","end_key":f"node_{i + 1}"},
+        })
+        flows.append({
+            "graph_type":"configurable_conditional_edge",
+            "flow_parameter":{
+                "start_key":f"node_{i}",
+                "conditions":[
+                    {
+                        "expression":{"eq":[{"type":"state_value","name":"value"},i]},
+                        "result":f"node_{i}",
+                    },
+                    {"default":"END"},
+                ],
+            },
+        })
+
+    return {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"validation_benchmark",
+            "state":[{"field_name":"value","type":"int"}],
+        },
+        "flows":flows,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--flows", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    graph_settings = gen_graph_settings(args.flows)
+    validate_state_graph(graph_settings)
+
+    timings = timeit.repeat(
+        lambda: validate_state_graph(graph_settings),
+        number=1,
+        repeat=args.repeat,
+    )
+    print(f"flows: {len(graph_settings['flows'])}")
+    print(f"validate_state_graph best: {min(timings) * 1000:.2f} ms")
+    print(f"validate_state_graph mean: {sum(timings) / len(timings) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
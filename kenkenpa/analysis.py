@@ -0,0 +1,262 @@
+"""
+This module provides a static reachability analysis of graph settings.
+
+The flow graph of each state graph is built from its `edge` flows, its
+`configurable_conditional_edge` flows and its `configurable_conditional_entry_point`
+flows, whose next nodes are taken from `path_map` or from the literal results
+of their conditions. Nodes and sub-state graphs that cannot be reached from START
+are reported, and can be removed from the settings before the graph is built.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+
+from kenkenpa.common import convert_key, to_list_key
+
+CONDITIONAL_GRAPH_TYPES = ("configurable_conditional_edge", "configurable_conditional_entry_point")
+
+class ReachabilityReport:
+    """
+    ReachabilityReport holds the result of analyze_reachability.
+
+    Nodes are identified by the names of the state graphs enclosing them,
+    from the root state graph, and their name.
+
+    Attributes:
+        unreachable_nodes (List[Tuple[Tuple[str, ...], str]]):
+            The `node` flows that cannot be reached from START.
+        unreachable_stategraphs (List[Tuple[Tuple[str, ...], str]]):
+            The `stategraph` flows that cannot be reached from START.
+            The flows inside them are not analyzed.
+        dynamic_edges (List[Tuple[Tuple[str, ...], str]]):
+            The conditional edges, by start key, whose next nodes cannot be determined
+            because a result is not a literal and there is no path_map.
+            Nothing is reported unreachable in the state graphs that contain them.
+        unknown_targets (List[Tuple[Tuple[str, ...], str, str]]):
+            The start key and next node of the edges whose next node is not
+            a node, a state graph or END.
+    """
+    def __init__(self):
+        """
+        Initializes an empty ReachabilityReport.
+        """
+        self.unreachable_nodes: List[Tuple[Tuple[str, ...], str]] = []
+        self.unreachable_stategraphs: List[Tuple[Tuple[str, ...], str]] = []
+        self.dynamic_edges: List[Tuple[Tuple[str, ...], str]] = []
+        self.unknown_targets: List[Tuple[Tuple[str, ...], str, str]] = []
+
+    @property
+    def unreachable(self) -> List[Tuple[Tuple[str, ...], str]]:
+        """
+        Returns the unreachable nodes and state graphs.
+
+        Returns:
+            List[Tuple[Tuple[str, ...], str]]: The unreachable nodes, then the unreachable state graphs.
+        """
+        return self.unreachable_nodes + self.unreachable_stategraphs
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the report as a JSON serializable dictionary.
+
+        Returns:
+            Dict: The report entries, with paths as lists.
+        """
+        return {
+            "unreachable_nodes": [[list(path), name] for path, name in self.unreachable_nodes],
+            "unreachable_stategraphs": [[list(path), name] for path, name in self.unreachable_stategraphs],
+            "dynamic_edges": [[list(path), start_key] for path, start_key in self.dynamic_edges],
+            "unknown_targets": [[list(path), start_key, end_key] for path, start_key, end_key in self.unknown_targets],
+        }
+
+def analyze_reachability(graph_settings:Dict, parent_path:Tuple[str, ...]=()) -> ReachabilityReport:
+    """
+    Analyzes which nodes and sub-state graphs of the settings can be reached from START.
+
+    Nodes that are only reached through `Command` or `Send` objects returned by nodes
+    are not visible in the settings and are reported as unreachable.
+
+    Args:
+        graph_settings (Dict): The settings for the state graph. Must be valid.
+        parent_path (Tuple[str, ...], optional): The names of the enclosing state graphs.
+            Defaults to the root.
+
+    Returns:
+        ReachabilityReport: The analysis result.
+    """
+    report = ReachabilityReport()
+    _analyze(graph_settings, parent_path, report)
+    return report
+
+def prune_settings(graph_settings:Dict) -> Dict:
+    """
+    Removes the nodes and sub-state graphs that cannot be reached from START,
+    together with the edges leaving them, at every level of the settings.
+    The settings are not modified.
+
+    Args:
+        graph_settings (Dict): The settings for the state graph. Must be valid.
+
+    Returns:
+        Dict: The pruned settings.
+    """
+    flows = [
+        prune_settings(flow) if flow.get("graph_type") == "stategraph" else flow
+        for flow in prune_unreachable_flows(graph_settings.get("flows",[]))
+    ]
+    return {**graph_settings, "flows": flows}
+
+def prune_unreachable_flows(flows:List[Dict]) -> List[Dict]:
+    """
+    Removes the nodes of one state graph that cannot be reached from START,
+    together with the edges leaving them.
+    Nothing is removed if a conditional edge has results that are not literals and no path_map.
+
+    Args:
+        flows (List[Dict]): The flows of the state graph.
+
+    Returns:
+        List[Dict]: The flows of the reachable nodes and their edges.
+    """
+    reachable = reachable_keys(flows)
+    if reachable is None:
+        return flows
+
+    pruned = []
+    for flow in flows:
+        graph_type = flow.get("graph_type")
+        flow_parameter = flow.get("flow_parameter",{})
+        if graph_type in ("node", "stategraph"):
+            if flow_parameter["name"] in reachable:
+                pruned.append(flow)
+        elif graph_type == "edge":
+            start_key = flow_parameter["start_key"]
+            if isinstance(start_key, str):
+                if convert_key(start_key) in reachable:
+                    pruned.append(flow)
+                continue
+            start_key = [key for key in start_key if convert_key(key) in reachable]
+            if start_key:
+                pruned.append({**flow, "flow_parameter": {**flow_parameter, "start_key": start_key}})
+        elif graph_type in CONDITIONAL_GRAPH_TYPES:
+            if convert_key(flow_parameter.get("start_key","START")) in reachable:
+                pruned.append(flow)
+        else:
+            pruned.append(flow)
+    return pruned
+
+def reachable_keys(flows:List[Dict]) -> Optional[Set[str]]:
+    """
+    Returns the keys of one state graph that can be reached from START.
+
+    Args:
+        flows (List[Dict]): The flows of the state graph.
+
+    Returns:
+        Optional[Set[str]]: The reachable keys, including START and END when reached,
+            or None if a conditional edge has results that are not literals and no path_map.
+    """
+    successors = flow_successors(flows)
+    if successors is None:
+        return None
+
+    reachable = set()
+    pending = [convert_key("START")]
+    while pending:
+        key = pending.pop()
+        if key in reachable:
+            continue
+        reachable.add(key)
+        pending.extend(successors.get(key, ()))
+    return reachable
+
+def flow_successors(flows:List[Dict]) -> Optional[Dict[str, List[str]]]:
+    """
+    Builds the flow graph of one state graph.
+
+    Args:
+        flows (List[Dict]): The flows of the state graph.
+
+    Returns:
+        Optional[Dict[str, List[str]]]: The next keys of each key, or None if
+            a conditional edge has results that are not literals and no path_map.
+    """
+    successors = {}
+    for start_key, targets in _iter_edges(flows):
+        if targets is None:
+            return None
+        successors.setdefault(start_key, []).extend(targets)
+    return successors
+
+def conditional_targets(flow_parameter:Dict) -> Optional[List[str]]:
+    """
+    Returns the possible next nodes of a conditional edge or entry point.
+
+    Args:
+        flow_parameter (Dict): The flow parameters of the conditional edge or entry point.
+
+    Returns:
+        Optional[List[str]]: The path_map if given, otherwise the literal results,
+            or None if a result is not a literal.
+    """
+    if flow_parameter.get("path_map"):
+        return to_list_key(flow_parameter["path_map"])
+
+    results = []
+    for condition in flow_parameter["conditions"]:
+        if "switch" in condition:
+            results.extend(case["result"] for case in condition["cases"])
+        elif "result" in condition:
+            results.append(condition["result"])
+        elif "default" in condition:
+            results.append(condition["default"])
+
+    if any(isinstance(result, dict) for result in results):
+        return None
+    return [key for result in results for key in to_list_key(result)]
+
+def _iter_edges(flows:List[Dict]):
+    """
+    Yields the start key and the next keys of every edge of one state graph.
+    The next keys are None for conditional edges whose next nodes cannot be determined.
+    """
+    for flow in flows:
+        graph_type = flow.get("graph_type")
+        flow_parameter = flow.get("flow_parameter",{})
+        if graph_type == "edge":
+            targets = to_list_key(flow_parameter["end_key"])
+            for start_key in to_list_key(flow_parameter["start_key"]):
+                yield start_key, targets
+        elif graph_type in CONDITIONAL_GRAPH_TYPES:
+            yield convert_key(flow_parameter.get("start_key","START")), conditional_targets(flow_parameter)
+
+def _analyze(graph_settings:Dict, parent_path:Tuple[str, ...], report:ReachabilityReport):
+    """
+    Adds the analysis result of one state graph and its reachable sub-state graphs to a report.
+    """
+    path = (*parent_path, graph_settings.get("flow_parameter",{}).get("name"))
+    flows = graph_settings.get("flows",[])
+
+    names = {
+        flow["flow_parameter"]["name"]
+        for flow in flows if flow.get("graph_type") in ("node", "stategraph")
+    }
+    for start_key, targets in _iter_edges(flows):
+        if targets is None:
+            report.dynamic_edges.append((path, start_key))
+            continue
+        for target in targets:
+            if target not in names and target != convert_key("END"):
+                report.unknown_targets.append((path, start_key, target))
+
+    reachable = reachable_keys(flows)
+    for flow in flows:
+        graph_type = flow.get("graph_type")
+        if graph_type not in ("node", "stategraph"):
+            continue
+        name = flow["flow_parameter"]["name"]
+        if reachable is not None and name not in reachable:
+            if graph_type == "node":
+                report.unreachable_nodes.append((path, name))
+            else:
+                report.unreachable_stategraphs.append((path, name))
+        elif graph_type == "stategraph":
+            _analyze(flow, path, report)
@@ -0,0 +1,250 @@
+"""
+This module provides a MicroBatcher class that coalesces concurrent calls of a node
+into calls of its batch method, for nodes backed by batchable services such as
+embedding models or classifiers.
+"""
+import asyncio
+import inspect
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from kenkenpa.common import current_runtime
+
+class _Batch:
+    """
+    The calls collected for one batch call.
+    """
+    def __init__(self):
+        self.states: List[Any] = []
+        self.configs: List[Any] = []
+        # concurrent futures of sync callers, or (loop, future) pairs of async callers.
+        self.waiters: List[Any] = []
+        self.full = threading.Event()
+
+class MicroBatcher:
+    """
+    MicroBatcher coalesces concurrent calls into batch calls.
+    It is safe to share between threads.
+
+    The first call of a batch waits up to max_wait seconds for other calls,
+    or until the batch has max_size calls, and then makes the batch call
+    on its own thread, or on a thread of the default executor for async calls.
+    Each caller receives the output at its position, or the exception raised
+    by the batch call. Async callers wait on a future of their event loop,
+    so they do not hold a thread while they wait.
+
+    Attributes:
+        max_size (int): The maximum number of calls in a batch.
+        max_wait (float): The maximum number of seconds the first call of a batch waits.
+        batches (int): The number of batch calls made.
+        calls (int): The number of calls coalesced into batch calls.
+    """
+    def __init__(
+        self,
+        batch_func: Callable[[List[Any], List[Any]], List[Any]],
+        max_size: int = 16,
+        max_wait: float = 0.01,
+        ):
+        """
+        Initializes the MicroBatcher.
+
+        Args:
+            batch_func (Callable[[List[Any], List[Any]], List[Any]]): Takes the states and
+                configs of the calls and returns their outputs in the same order.
+            max_size (int, optional): The maximum number of calls in a batch. Defaults to 16.
+            max_wait (float, optional): The maximum number of seconds the first call
+                of a batch waits for other calls. Defaults to 0.01.
+
+        Raises:
+            ValueError: If max_size is less than 1 or max_wait is negative.
+        """
+        if max_size < 1:
+            raise ValueError(f"max_size must be at least 1: {max_size}")
+        if max_wait < 0:
+            raise ValueError(f"max_wait must not be negative: {max_wait}")
+
+        self.batch_func = batch_func
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.calls = 0
+        self._open: Optional[_Batch] = None
+        self._lock = threading.Lock()
+
+    def __call__(self, state: Any, config: Any = None) -> Any:
+        """
+        Adds a call to the current batch and waits for its output.
+
+        Args:
+            state (Any): The node input.
+            config (Any, optional): The runnable config of the call.
+
+        Returns:
+            Any: The output of the call.
+        """
+        future = Future()
+        batch, leader = self._add(state, config, future)
+        if leader:
+            self._lead(batch)
+        return future.result()
+
+    async def acall(self, state: Any, config: Any = None) -> Any:
+        """
+        Adds a call to the current batch and waits for its output without blocking the event loop.
+
+        Args:
+            state (Any): The node input.
+            config (Any, optional): The runnable config of the call.
+
+        Returns:
+            Any: The output of the call.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch, leader = self._add(state, config, (loop, future))
+        if leader:
+            # the batch call is made even if this caller is cancelled meanwhile.
+            await asyncio.shield(loop.run_in_executor(None, self._lead, batch))
+        return await future
+
+    def _add(self, state: Any, config: Any, waiter: Any) -> Tuple[_Batch, bool]:
+        """
+        Adds a call to the current batch, opening a new batch if there is none.
+
+        Returns:
+            Tuple[_Batch, bool]: The batch, and whether the call opened it.
+        """
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            batch.states.append(state)
+            batch.configs.append(config)
+            batch.waiters.append(waiter)
+            if len(batch.states) >= self.max_size:
+                self._open = None
+                batch.full.set()
+        return batch, leader
+
+    def _lead(self, batch: _Batch):
+        """
+        Waits until the batch is full or max_wait has passed, closes it and makes the batch call.
+        """
+        batch.full.wait(self.max_wait)
+        with self._lock:
+            if self._open is batch:
+                self._open = None
+        self._run(batch)
+
+    def _run(self, batch: _Batch):
+        """
+        Makes a batch call and hands the outputs over to the callers.
+        """
+        with self._lock:
+            self.batches += 1
+            self.calls += len(batch.states)
+        try:
+            outputs = list(self.batch_func(batch.states, batch.configs))
+            if len(outputs) != len(batch.states):
+                raise ValueError(
+                    f"The batch call returned {len(outputs)} outputs for {len(batch.states)} inputs.")
+        except BaseException as e:
+            for waiter in batch.waiters:
+                _resolve(waiter, None, e)
+            return
+        for waiter, output in zip(batch.waiters, outputs):
+            _resolve(waiter, output, None)
+
+def _resolve(waiter: Any, output: Any, error: Optional[BaseException]):
+    """
+    Hands an output or an exception over to a sync or async caller.
+    """
+    if isinstance(waiter, Future):
+        if error is None:
+            waiter.set_result(output)
+        else:
+            waiter.set_exception(error)
+        return
+    loop, future = waiter
+    try:
+        loop.call_soon_threadsafe(_set_future, future, output, error)
+    except RuntimeError:
+        # the event loop of the caller is closed.
+        pass
+
+def _set_future(future: asyncio.Future, output: Any, error: Optional[BaseException]):
+    """
+    Sets the result of an async caller's future, unless the caller was cancelled.
+    """
+    if future.done():
+        return
+    if error is None:
+        future.set_result(output)
+    else:
+        future.set_exception(error)
+
+def batch_node(node: Any, name: str, max_size: int = 16, max_wait: float = 0.01) -> Any:
+    """
+    Wraps a node so that its concurrent calls are coalesced into calls of its batch method.
+
+    Runnables are called with `batch(states, configs)`. Other nodes must have
+    a `batch` method taking the list of states and returning the list of outputs.
+    Like the parameters LangGraph injects into nodes, the method is also given
+    `configs`, the config of each call, and `runtimes`, the runtime of each call,
+    if it has parameters of those names.
+
+    Args:
+        node (Any): The node returned by a node factory.
+        name (str): The node name, used in error messages.
+        max_size (int, optional): The maximum number of calls in a batch. Defaults to 16.
+        max_wait (float, optional): The maximum number of seconds the first call
+            of a batch waits for other calls. Defaults to 0.01.
+
+    Returns:
+        RunnableLambda: The node with sync and async entry points that batch calls.
+
+    Raises:
+        ValueError: If the node does not have a batch method.
+    """
+    from langchain_core.runnables import Runnable, RunnableLambda
+
+    if isinstance(node, Runnable):
+        batch_func = lambda states, calls: node.batch(states, [config for config, _ in calls])
+    elif callable(getattr(node, "batch", None)):
+        batch_func = _batch_method(node.batch)
+    else:
+        raise ValueError(f"Node {name} does not have a batch method.")
+
+    batcher = MicroBatcher(batch_func, max_size, max_wait)
+
+    # the runtime is taken on the caller's side, since the batch call runs on another thread.
+    def call(state, config):
+        return batcher(state, (config, current_runtime()))
+
+    async def acall(state, config):
+        return await batcher.acall(state, (config, current_runtime()))
+
+    return RunnableLambda(call, afunc=acall, name=name)
+
+def _batch_method(method: Callable) -> Callable[[List[Any], List[Any]], List[Any]]:
+    """
+    Adapts the batch method of a node to take the states and the (config, runtime) pairs
+    of the calls, passing it the configs and runtimes if it has parameters of those names.
+    """
+    try:
+        parameters = inspect.signature(method).parameters
+    except (TypeError, ValueError):
+        parameters = {}
+    pass_configs = "configs" in parameters
+    pass_runtimes = "runtimes" in parameters
+
+    def batch_func(states, calls):
+        kwargs = {}
+        if pass_configs:
+            kwargs["configs"] = [config for config, _ in calls]
+        if pass_runtimes:
+            kwargs["runtimes"] = [runtime for _, runtime in calls]
+        return method(states, **kwargs)
+    return batch_func
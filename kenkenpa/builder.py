@@ -3,20 +3,43 @@ This module provides a StateGraphBuilder class for
 constructing state graphs based on provided settings.
 It includes methods for adding nodes, edges, and conditional edges,
 as well as for generating the state graph.
-"""
-from typing import List, Dict, Union, Optional, Type, Any
 
-from langgraph.graph import  StateGraph
+The pydantic models, LangGraph and LangChain are imported on first use,
+so importing this module stays cheap.
+"""
+from __future__ import annotations
 
-from kenkenpa.models.stategraph import KStateGraph
-from kenkenpa.models.node import KNode
-from kenkenpa.models.edge import KEdge
-from kenkenpa.models.configurable_conditional_edge import KConfigurableConditionalEdge
-from kenkenpa.models.configurable_conditional_entry_point import KConfigurableConditionalEntryPoint
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Dict, Union, Optional, Tuple, Type, Any
 
 from kenkenpa.state import StateBuilder
 from kenkenpa.edges import ConfigurableConditionalHandler
-from kenkenpa.common import to_list_key
+from kenkenpa.common import to_list_key, extract_literals, node_input_schema
+from kenkenpa.cache import (
+    GraphCache,
+    NodeOutputCache,
+    NodePool,
+    shared_node_pool,
+    settings_digest,
+    registry_key,
+)
+from kenkenpa.instrumentation import BuildReport, NodeMetrics, RoutingMetrics
+from kenkenpa.specialize import specialize_settings
+from kenkenpa.analysis import ReachabilityReport, analyze_reachability, prune_settings
+from kenkenpa.plan import check_build_plan
+from kenkenpa.policy import get_concurrency_limiter, limit_node, retry_policy
+from kenkenpa.batch import batch_node
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableLambda
+    from kenkenpa.models.stategraph import KStateGraph
+    from kenkenpa.models.node import KNode
+    from kenkenpa.models.edge import KEdge
+    from kenkenpa.models.configurable_conditional_edge import KConfigurableConditionalEdge
+    from kenkenpa.models.configurable_conditional_entry_point import KConfigurableConditionalEntryPoint
 
 class StateGraphBuilder():
     """
@@ -26,10 +49,24 @@ class StateGraphBuilder():
         graph_settings (Dict): The settings for the state graph.
         config_schema (Optional[Type[Any]]): The schema for configuration.
         node_factorys (Dict): A dictionary of node factory functions.
+        shared_node_factorys (Set[str]): Names of node factories whose node instances
+            are shared through the node pool.
         evaluete_functions (Dict): A dictionary of evaluation functions.
+        impure_evaluete_functions (Set[str]): Names of evaluation functions
+            whose results are not memoized within a routing decision.
+        evaluete_function_dependencies (Dict[str, Tuple[Tuple[str,...], Tuple[str,...]]]):
+            The state keys and config values read by evaluation functions that declared them.
         statebuilder (StateBuilder): An instance of StateBuilder for managing state.
         stategraph (Dict): The constructed state graph.
         custom_state (Any): The custom state generated for the graph.
+        graph_cache (Optional[GraphCache]): The cache shared between builders, if any.
+        node_pool (NodePool): The pool of node instances created by shared node factories.
+        build_report (BuildReport): The wall time of validation and of each build phase and flow.
+        node_caches (Dict[str, NodeOutputCache]): The output caches of the nodes with
+            a `cache` setting, keyed by the names of the enclosing state graphs
+            and the node name joined by "/".
+        routing_metrics (Optional[RoutingMetrics]): The collector of routing decision metrics, if any.
+        node_metrics (Optional[NodeMetrics]): The collector of node call metrics, if any.
     """
     def __init__(
         self,
@@ -39,6 +76,12 @@ class StateGraphBuilder():
         evaluete_functions:Dict=None,
         reducers:Dict=None,
         types:Dict=None,
+        graph_cache:Optional[GraphCache]=None,
+        node_pool:Optional[NodePool]=None,
+        build_hook:Optional[Callable[[Dict],None]]=None,
+        routing_metrics:Optional[RoutingMetrics]=None,
+        node_metrics:Optional[NodeMetrics]=None,
+        validate:bool=True,
         ):
         """
         Initializes the StateGraphBuilder with provided settings,
@@ -53,9 +96,48 @@ class StateGraphBuilder():
                 A dictionary of evaluation functions. Defaults to an empty dictionary.
             reducers (Dict, optional): A dictionary of reducers. Defaults to None.
             types (Dict, optional): A dictionary of custom types. Defaults to None.
+            graph_cache (Optional[GraphCache], optional):
+                A cache shared between builders. When given, settings that were
+                already validated are not validated again, and gen_stategraph
+                reuses the StateGraph built from identical settings and registrations.
+                Defaults to None.
+            node_pool (Optional[NodePool], optional):
+                The pool of node instances created by shared node factories.
+                Defaults to the process-wide pool.
+            build_hook (Optional[Callable[[Dict],None]], optional):
+                Called with each record added to build_report. Defaults to None.
+            routing_metrics (Optional[RoutingMetrics], optional):
+                A collector of the routing decisions of every configurable conditional
+                edge and entry point. Edges are named by the names of the enclosing
+                state graphs and their start_key, or START for entry points,
+                joined by "/". Defaults to None.
+            node_metrics (Optional[NodeMetrics], optional):
+                A collector of the calls of every node and sub-state graph. Each node
+                is recorded under the names of the enclosing state graphs joined by "/"
+                and its name. Defaults to None.
+            validate (bool, optional): If False, the settings are not validated.
+                Only use it for settings that were already validated, such as
+                the settings of a build plan. Defaults to True.
         """
+        self.build_report = BuildReport(build_hook)
+        self.routing_metrics = routing_metrics
+        self.node_metrics = node_metrics
+        root_path = (graph_settings.get("flow_parameter",{}).get("name"),)
+
+        self.graph_cache = graph_cache
+        self._settings_digest = None
+        if graph_cache is not None:
+            try:
+                self._settings_digest = settings_digest(graph_settings)
+            except TypeError:
+                self._settings_digest = None
+
         # validate
-        validate_state_graph(graph_settings)
+        if validate and (self._settings_digest is None or not graph_cache.is_validated(self._settings_digest)):
+            with self.build_report.time("validate", root_path, root_path[0]):
+                validate_state_graph(graph_settings)
+            if self._settings_digest is not None:
+                graph_cache.mark_validated(self._settings_digest)
         self.graph_settings = graph_settings
         self.config_schema = config_schema
 
@@ -63,46 +145,230 @@ class StateGraphBuilder():
             self.node_factorys = node_factorys
         else:
             self.node_factorys = {}
+        self.shared_node_factorys = set()
+        self.node_pool = node_pool if node_pool is not None else shared_node_pool
 
         if evaluete_functions:
             self.evaluete_functions = evaluete_functions
         else:
             self.evaluete_functions = {}
+        self.impure_evaluete_functions = set()
+        self.evaluete_function_dependencies = {}
 
         self.statebuilder = StateBuilder(types,reducers)
 
         self.stategraph = {}
         self.custom_state = None
+        self.node_caches = {}
+        self._prebuilt_nodes = {}
+
+    @classmethod
+    def from_build_plan(cls,plan:Dict,graph_settings:Optional[Dict]=None,**kwargs):
+        """
+        Creates a StateGraphBuilder from a build plan, without validating its settings again.
+
+        Args:
+            plan (Dict): A build plan generated by kenkenpa.plan.gen_build_plan.
+            graph_settings (Optional[Dict], optional): The settings the plan must have been
+                generated from. Defaults to None, in which case the source is not checked.
+            **kwargs: The other arguments of the constructor, except validate.
 
-    def gen_stategraph(self):
+        Returns:
+            StateGraphBuilder: The builder of the planned settings.
+
+        Raises:
+            ValueError: If the plan cannot be used, e.g. because it was generated
+                by another plan format version or from other settings,
+                or if validate is given.
+        """
+        if "validate" in kwargs:
+            raise ValueError("Build plans are always loaded without validation.")
+        check_build_plan(plan, graph_settings)
+        return cls(plan["graph_settings"], validate=False, **kwargs)
+
+    def gen_stategraph(
+            self,
+            parallel_factories:bool=False,
+            max_workers:Optional[int]=None,
+            specialize_config:Optional[Dict[str,Any]]=None,
+            prune_unreachable:bool=True,
+            skip_unreachable:bool=False,
+            ):
         """
         Generates the state graph based on the provided settings.
+        The wall time of each build phase and flow is recorded in build_report.
+
+        When specialize_config is given, the graph is built for those config values:
+        `config_value` operands they name are replaced by their values, comparisons
+        between constants are evaluated, conditions that can never match are dropped,
+        conditional edges that no longer depend on the state become plain edges,
+        and unreachable nodes are removed. The values in the runtime config are then
+        ignored for the specialized operands.
+
+        When a graph_cache is set, the StateGraph is shared with every builder
+        that uses the same settings and the same registered objects,
+        so it must not be modified after it is returned.
+
+        Args:
+            parallel_factories (bool, optional): If True, the node factories of every
+                `node` flow, including those in nested `stategraph` flows, are called
+                concurrently on a thread pool before the graph is assembled.
+                Nodes are still added in declaration order. Defaults to False.
+            max_workers (Optional[int], optional): The maximum number of threads used
+                when parallel_factories is True. Defaults to the ThreadPoolExecutor default.
+            specialize_config (Optional[Dict[str,Any]], optional): The config values,
+                by name, that are fixed for the lifetime of the graph. Defaults to None.
+            prune_unreachable (bool, optional): If True, nodes that cannot be reached from
+                START after specialization are removed. Set it to False when nodes are only
+                reached through `Command` or `Send`. Defaults to True.
+            skip_unreachable (bool, optional): If True, the nodes and sub-state graphs
+                reported unreachable by analyze_reachability are removed before the graph
+                is built, so their node factories are not called and they are not compiled.
+                Defaults to False.
 
         Returns:
             Dict: The constructed state graph.
         """
-        self.stategraph = self._gen_stategraph(self.graph_settings)
+        root_name = self.graph_settings.get("flow_parameter",{}).get("name")
+        start = time.perf_counter()
+        cached = True
+
+        specialize_digest = None
+        if specialize_config is not None and self._settings_digest is not None:
+            try:
+                specialize_digest = (settings_digest(specialize_config), prune_unreachable)
+            except TypeError:
+                specialize_digest = None
+
+        def build():
+            nonlocal cached
+            cached = False
+            graph_settings = self.graph_settings
+            if specialize_config is not None:
+                with self.build_report.time("specialize", (root_name,), root_name):
+                    graph_settings = specialize_settings(
+                        graph_settings, specialize_config, prune_unreachable)
+            if skip_unreachable:
+                with self.build_report.time("analyze", (root_name,), root_name):
+                    graph_settings = prune_settings(graph_settings)
+            self.node_caches = {}
+            stategraph = self._build_stategraph(graph_settings, parallel_factories, max_workers)
+            return stategraph, self.custom_state, self.node_caches
+
+        try:
+            if self._settings_digest is None or (
+                    specialize_config is not None and specialize_digest is None):
+                self.stategraph, self.custom_state, self.node_caches = build()
+            else:
+                registries = (
+                    self.node_factorys,
+                    self.evaluete_functions,
+                    self.statebuilder.reducer_list,
+                    self.statebuilder.type_list,
+                    {"config_schema": self.config_schema},
+                    dict.fromkeys(self.impure_evaluete_functions, False),
+                    {"routing_metrics": self.routing_metrics, "node_metrics": self.node_metrics},
+                    {"node_pool": self.node_pool},
+                    dict.fromkeys(self.shared_node_factorys, True),
+                )
+                key = (
+                    self._settings_digest,
+                    specialize_digest,
+                    skip_unreachable,
+                    registry_key(*registries),
+                    tuple(sorted(self.evaluete_function_dependencies.items())),
+                )
+                refs = tuple(obj for registry in registries for obj in registry.values())
+                self.stategraph, self.custom_state, self.node_caches = (
+                    self.graph_cache.get_or_build(key, build, refs))
+        finally:
+            self.build_report.record(
+                "build", (root_name,), root_name, time.perf_counter() - start, cached=cached)
         return self.stategraph
 
-    def add_node_factory(self,name:str,function):
+    def analyze_reachability(self) -> ReachabilityReport:
+        """
+        Reports the nodes and sub-state graphs that cannot be reached from START
+        through edges, conditional edges and conditional entry points.
+
+        Returns:
+            ReachabilityReport: The analysis result.
+        """
+        return analyze_reachability(self.graph_settings)
+
+    def node_cache_stats(self) -> Dict[str,Dict[str,int]]:
+        """
+        Returns the statistics of the node output caches of the last generated graph.
+
+        Returns:
+            Dict[str,Dict[str,int]]: The statistics of each node cache, keyed as node_caches.
+        """
+        return {name: node_cache.stats() for name, node_cache in self.node_caches.items()}
+
+    def add_node_factory(self,name:str,function,shared:bool=False):
         """
         Adds a node factory function to the builder.
 
+        The node instances of a shared factory are taken from the node pool:
+        every `node` flow that uses the factory with the same factory_parameter,
+        in this or any other graph using the same pool, gets the same instance,
+        and the factory is called once per factory_parameter for as long as the instance is in use.
+
         Args:
             name (str): The name of the node factory.
             function (callable): The node factory function to add.
+            shared (bool, optional): True if the node instances are safe to share.
+                The factory must not depend on flow_parameter, and its factory_parameter
+                must be JSON serializable to be pooled. Defaults to False.
         """
         self.node_factorys[name] = function
+        if shared:
+            self.shared_node_factorys.add(name)
+        else:
+            self.shared_node_factorys.discard(name)
 
-    def add_evaluete_function(self,name:str,function):
+    def add_evaluete_function(
+            self,
+            name:str,
+            function,
+            pure:bool=True,
+            state_keys:Optional[List[str]]=None,
+            config_keys:Optional[List[str]]=None,
+            ):
         """
         Adds an evaluation function to the builder.
 
+        The result of a pure evaluation function is memoized within one routing decision,
+        so a function operand that appears in several conditions of an edge
+        with the same args is called once.
+
+        A pure function may declare the state keys and config values it reads,
+        so that edges with `incremental` enabled can reuse their last result
+        while those values are unchanged.
+
         Args:
             name (str): The name of the evaluation function.
             function (callable): The evaluation function to add.
+            pure (bool, optional): False if the function must be called every time
+                it appears, e.g. because it has side effects. Defaults to True.
+            state_keys (Optional[List[str]], optional): The state keys the function reads.
+                Defaults to None.
+            config_keys (Optional[List[str]], optional): The config values the function reads.
+                Defaults to None. The dependencies are declared if either is given.
         """
         self.evaluete_functions[name] = function
+        if pure:
+            self.impure_evaluete_functions.discard(name)
+        else:
+            self.impure_evaluete_functions.add(name)
+
+        if state_keys is None and config_keys is None:
+            self.evaluete_function_dependencies.pop(name, None)
+        else:
+            self.evaluete_function_dependencies[name] = (
+                tuple(state_keys or ()),
+                tuple(config_keys or ()),
+            )
 
     def add_reducer(self,name:str,function):
         """
@@ -124,12 +390,37 @@ class StateGraphBuilder():
         """
         self.statebuilder.add_type(name,type_)
 
-    def _gen_stategraph(self,stategraph_settings):
+    def _build_stategraph(self,graph_settings:Dict,parallel_factories:bool,max_workers:Optional[int]):
+        """
+        Builds the state graph, calling the node factories concurrently beforehand if requested.
+
+        Args:
+            graph_settings (Dict): The settings for the state graph.
+            parallel_factories (bool): Whether to call the node factories concurrently.
+            max_workers (Optional[int]): The maximum number of threads.
+
+        Returns:
+            StateGraph: The constructed state graph.
+        """
+        if parallel_factories:
+            node_flows = list(iter_node_flows(graph_settings))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                nodes = list(executor.map(lambda item: self._create_node(item[1], item[0]), node_flows))
+            self._prebuilt_nodes = {id(flow): node for (_, flow), node in zip(node_flows, nodes)}
+
+        try:
+            return self._gen_stategraph(graph_settings)
+        finally:
+            self._prebuilt_nodes = {}
+
+    def _gen_stategraph(self,stategraph_settings,parent_path:Tuple[str,...]=()):
         """
         Generates the state graph based on the provided settings.
 
         Args:
             stategraph_settings (Dict): The settings for the state graph.
+            parent_path (Tuple[str,...], optional):
+                The names of the enclosing state graphs. Defaults to the root.
 
         Returns:
             StateGraph: The constructed state graph.
@@ -137,64 +428,192 @@ class StateGraphBuilder():
 
         stategraph_flow_parameter = stategraph_settings.get("flow_parameter")
         state = stategraph_flow_parameter.get("state",[])
+        name = stategraph_flow_parameter.get("name")
+        path = (*parent_path, name)
 
-        self.custom_state = self.statebuilder.gen_state(state)
-        stategraph = StateGraph(self.custom_state,context_schema=self.config_schema)
+        with self.build_report.time("gen_stategraph", path, name):
+            with self.build_report.time("gen_state", path, name):
+                self.custom_state = self.statebuilder.gen_state(state)
+            stategraph = _state_graph_class()(self.custom_state,context_schema=self.config_schema)
 
-        for flow in stategraph_settings.get("flows",[]):
-            graph_type = flow.get('graph_type')
+            for flow in stategraph_settings.get("flows",[]):
+                self._add_flow(stategraph,flow,path)
 
-            if graph_type == "stategraph":
-                self._add_stategraph(stategraph,flow)
+        return stategraph
 
-            elif graph_type == "node":
-                self._add_node(stategraph,flow)
+    def _add_flow(self,stategraph,flow,path:Tuple[str,...]):
+        """
+        Adds a flow to the state graph.
 
-            elif graph_type == "edge":
-                self._add_edge(stategraph,flow)
+        Args:
+            stategraph (StateGraph): The state graph.
+            flow (Dict): The flow to add.
+            path (Tuple[str,...]): The names of the state graph and its enclosing state graphs.
+        """
+        graph_type = flow.get('graph_type')
 
-            elif graph_type == "configurable_conditional_edge":
-                self._add_configurable_conditional_edge(stategraph,flow)
+        if graph_type == "stategraph":
+            self._add_stategraph(stategraph,flow,path)
 
-            elif graph_type == "configurable_conditional_entry_point":
-                self._add_configurable_conditional_entry_point(stategraph,flow)
+        elif graph_type == "node":
+            self._add_node(stategraph,flow,path)
 
-        return stategraph
+        elif graph_type == "edge":
+            self._add_edge(stategraph,flow)
 
-    def _add_stategraph(self,stategraph,flow: KStateGraph):
+        elif graph_type == "configurable_conditional_edge":
+            self._add_configurable_conditional_edge(stategraph,flow,path)
+
+        elif graph_type == "configurable_conditional_entry_point":
+            self._add_configurable_conditional_entry_point(stategraph,flow,path)
+
+    def _add_stategraph(self,stategraph,flow: KStateGraph,path:Tuple[str,...]=()):
         """
         Adds a sub-state graph to the main state graph.
+        The compiled sub-state graph is wrapped by node_metrics if it is given.
 
         Args:
             stategraph (StateGraph): The main state graph.
             flow (KStateGraph): The sub-state graph to add.
+            path (Tuple[str,...], optional): The names of the main state graph
+                and its enclosing state graphs.
         """
         flow_parameter = flow.get('flow_parameter',{})
         node_name = flow_parameter['name']
-        substategraph = self._gen_stategraph(flow)
-        stategraph.add_node(node_name,substategraph.compile())
-
-    def _add_node(self,stategraph,flow: KNode):
+        substategraph = self._gen_stategraph(flow,path)
+        with self.build_report.time("compile", (*path, node_name), node_name):
+            compiled = substategraph.compile()
+        if self.node_metrics is not None:
+            compiled = self.node_metrics.wrap(compiled, "/".join(path), node_name)
+        stategraph.add_node(node_name,compiled)
+
+    def _add_node(self,stategraph,flow: KNode,path:Tuple[str,...]=()):
         """
         Adds a node to the state graph.
+        Nodes with a `batch` setting are wrapped by batch_node,
+        nodes with a `timeout` or `max_concurrency` setting are wrapped by limit_node,
+        nodes with a `cache` setting are wrapped in a NodeOutputCache,
+        every node is wrapped by node_metrics if it is given,
+        and the `retry` setting is passed to LangGraph as the retry policy of the node.
+        The input schema annotated on the node is passed to LangGraph,
+        since the wrappers hide it from add_node.
 
         Args:
             stategraph (StateGraph): The state graph.
             flow (KNode): The node to add.
+            path (Tuple[str,...], optional): The names of the state graph
+                and its enclosing state graphs.
+
+        Raises:
+            ValueError: If the node has a `batch` setting but no batch method.
         """
         flow_parameter = flow.get('flow_parameter',{})
-        factory_parameter = flow.get('factory_parameter',{})
         node_name = flow_parameter['name']
+
+        if id(flow) in self._prebuilt_nodes:
+            node_func = self._prebuilt_nodes[id(flow)]
+        else:
+            node_func = self._create_node(flow,path)
+        input_schema = node_input_schema(node_func)
+
+        batch = flow_parameter.get('batch')
+        if batch:
+            node_func = batch_node(
+                node_func,
+                node_name,
+                max_size = batch.get('max_size', 16),
+                max_wait = batch.get('max_wait_ms', 10.0) / 1000,
+            )
+
+        timeout = flow_parameter.get('timeout')
+        max_concurrency = flow_parameter.get('max_concurrency')
+        if timeout is not None or max_concurrency is not None:
+            limiter = None
+            if max_concurrency is not None:
+                limiter = get_concurrency_limiter(
+                    (flow_parameter['factory'], node_name), max_concurrency)
+            node_func = limit_node(node_func, node_name, timeout, limiter)
+
+        cache = flow_parameter.get('cache')
+        if cache:
+            node_cache = NodeOutputCache(
+                keys = cache['keys'],
+                ttl = cache.get('ttl'),
+                maxsize = cache.get('maxsize', 128),
+            )
+            self.node_caches["/".join((*path, node_name))] = node_cache
+            node_func = node_cache.wrap(node_func)
+
+        if self.node_metrics is not None:
+            node_func = self.node_metrics.wrap(node_func, "/".join(path), node_name)
+
+        kwargs = {}
+        if input_schema is not None:
+            kwargs['input_schema'] = input_schema
+        retry = flow_parameter.get('retry')
+        if retry is not None:
+            kwargs['retry_policy'] = retry_policy(retry)
+        stategraph.add_node(node_name,node_func,**kwargs)
+
+    def _create_node(self,flow: KNode,path:Tuple[str,...]=()):
+        """
+        Creates the node callable of a `node` flow by calling its node factory,
+        or takes it from the node pool if the factory is shared.
+        Factories may be coroutine functions, in which case the coroutine is run to completion.
+        The wall time is recorded in build_report as a node_factory record.
+
+        Args:
+            flow (KNode): The node flow.
+            path (Tuple[str,...], optional): The names of the state graph
+                and its enclosing state graphs.
+
+        Returns:
+            Any: The node callable returned by the factory.
+        """
+        flow_parameter = flow.get('flow_parameter',{})
+        factory_parameter = flow.get('factory_parameter',{})
         factory = flow_parameter['factory']
 
         add_agent_function = self.node_factorys[factory]
 
+        with self.build_report.time("node_factory", path, flow_parameter['name'], factory=factory):
+            if factory in self.shared_node_factorys:
+                try:
+                    key = (factory, add_agent_function, settings_digest(factory_parameter))
+                    hash(key)
+                except TypeError:
+                    key = None
+                if key is not None:
+                    return self.node_pool.get_or_create(
+                        key,
+                        lambda: self._call_node_factory(add_agent_function, factory, flow),
+                        )
+
+            return self._call_node_factory(add_agent_function, factory, flow)
+
+    def _call_node_factory(self,add_agent_function,factory:str,flow: KNode):
+        """
+        Calls a node factory for a `node` flow.
+
+        Args:
+            add_agent_function (callable): The node factory function.
+            factory (str): The name of the node factory.
+            flow (KNode): The node flow.
+
+        Returns:
+            Any: The node callable returned by the factory.
+        """
+        flow_parameter = flow.get('flow_parameter',{})
+        factory_parameter = flow.get('factory_parameter',{})
+
         node_func = add_agent_function(
             factory_parameter = factory_parameter,
             flow_parameter = flow_parameter,
             )
 
-        stategraph.add_node(node_name,node_func)
+        if inspect.isawaitable(node_func):
+            node_func = _run_awaitable(node_func, factory)
+        return node_func
 
     def _add_edge(self,stategraph,flow: KEdge):
         """
@@ -216,13 +635,20 @@ class StateGraphBuilder():
                     end_key = end_key
                 )
 
-    def _add_configurable_conditional_edge(self,stategraph,flow:KConfigurableConditionalEdge):
+    def _add_configurable_conditional_edge(
+            self,
+            stategraph,
+            flow:KConfigurableConditionalEdge,
+            path:Tuple[str,...]=()
+            ):
         """
         Adds a configurable conditional edge to the state graph.
 
         Args:
             stategraph (StateGraph): The state graph.
             flow (KConfigurableConditionalEdge): The configurable conditional edge to add.
+            path (Tuple[str,...], optional): The names of the state graph
+                and its enclosing state graphs.
         """
         flow_parameter = flow.get('flow_parameter',{})
         start_key = flow_parameter['start_key']
@@ -230,7 +656,14 @@ class StateGraphBuilder():
 
         edge = ConfigurableConditionalHandler(
             conditions = conditions,
-            evaluate_functions = self.evaluete_functions
+            evaluate_functions = self.evaluete_functions,
+            match = flow_parameter.get('match', 'all'),
+            impure_functions = self.impure_evaluete_functions,
+            adaptive = flow_parameter.get('adaptive', False),
+            incremental = flow_parameter.get('incremental', False),
+            function_dependencies = self.evaluete_function_dependencies,
+            metrics = self.routing_metrics,
+            name = "/".join((*path, start_key)),
         )
 
         if 'path_map' in flow_parameter:
@@ -240,14 +673,15 @@ class StateGraphBuilder():
 
         stategraph.add_conditional_edges(
             source = start_key,
-            path = edge,
+            path = conditional_path(edge),
             path_map = return_types
         )
 
     def _add_configurable_conditional_entry_point(
             self,
             stategraph,
-            flow: KConfigurableConditionalEntryPoint
+            flow: KConfigurableConditionalEntryPoint,
+            path:Tuple[str,...]=()
             ):
         """
         Adds a configurable conditional entry point to the state graph.
@@ -256,13 +690,22 @@ class StateGraphBuilder():
             stategraph (StateGraph): The state graph.
             flow (KConfigurableConditionalEntryPoint):
                 The configurable conditional entry point to add.
+            path (Tuple[str,...], optional): The names of the state graph
+                and its enclosing state graphs.
         """
         flow_parameter = flow.get('flow_parameter',{})
         conditions = flow_parameter['conditions']
 
         edge = ConfigurableConditionalHandler(
             conditions = conditions,
-            evaluate_functions = self.evaluete_functions
+            evaluate_functions = self.evaluete_functions,
+            match = flow_parameter.get('match', 'all'),
+            impure_functions = self.impure_evaluete_functions,
+            adaptive = flow_parameter.get('adaptive', False),
+            incremental = flow_parameter.get('incremental', False),
+            function_dependencies = self.evaluete_function_dependencies,
+            metrics = self.routing_metrics,
+            name = "/".join((*path, "START")),
         )
 
         if 'path_map' in flow_parameter:
@@ -271,27 +714,87 @@ class StateGraphBuilder():
             return_types = extract_literals(conditions)
 
         stategraph.set_conditional_entry_point(
-            path = edge,
+            path = conditional_path(edge),
             path_map = return_types
         )
 
-def extract_literals(conditions: List[Dict[str, Union[Dict, str]]]) -> str:
+def conditional_path(edge:ConfigurableConditionalHandler):
+    """
+    Returns the path passed to LangGraph for a configurable conditional handler.
+
+    Handlers that call coroutine evaluation functions are wrapped in a runnable
+    exposing both the synchronous call and the asynchronous acall,
+    so that ainvoke/astream await them instead of blocking the event loop.
+
+    Args:
+        edge (ConfigurableConditionalHandler): The handler.
+
+    Returns:
+        Union[ConfigurableConditionalHandler, RunnableLambda]: The path.
+    """
+    if edge.is_async:
+        from langchain_core.runnables import RunnableLambda
+        return RunnableLambda(edge.__call__, afunc=edge.acall, name=type(edge).__name__)
+    return edge
+
+def iter_node_flows(stategraph_settings,parent_path:Tuple[str,...]=()):
     """
-    Extracts literals from the conditions.
+    Yields every `node` flow of the settings, including those in nested `stategraph` flows,
+    in declaration order.
 
     Args:
-        conditions (List[Dict[str, Union[Dict, str]]]): The conditions to extract literals from.
+        stategraph_settings (Dict): The settings for the state graph.
+        parent_path (Tuple[str,...], optional): The names of the enclosing state graphs.
+
+    Yields:
+        Tuple[Tuple[str,...], Dict]: The names of the state graphs enclosing each node flow,
+            from the root, and the node flow.
+    """
+    path = (*parent_path, stategraph_settings.get("flow_parameter",{}).get("name"))
+    for flow in stategraph_settings.get("flows",[]):
+        graph_type = flow.get('graph_type')
+        if graph_type == "node":
+            yield path, flow
+        elif graph_type == "stategraph":
+            yield from iter_node_flows(flow,path)
+
+def _state_graph_class():
+    """
+    Returns the LangGraph StateGraph class, importing LangGraph on first use.
 
     Returns:
-        List[str]: A list of extracted literals.
+        Type[StateGraph]: The StateGraph class.
     """
-    results = []
-    for condition in conditions:
-        if 'result' in condition:
-            results.extend(to_list_key(condition['result']))
-        elif 'default' in condition:
-            results.extend(to_list_key(condition['default']))
-    return results
+    from langgraph.graph import StateGraph
+    return StateGraph
+
+def _run_awaitable(awaitable, factory):
+    """
+    Runs the awaitable returned by a coroutine node factory.
+
+    Args:
+        awaitable (Awaitable): The awaitable to run.
+        factory (str): The name of the node factory, used in the error message.
+
+    Returns:
+        Any: The result of the awaitable.
+
+    Raises:
+        RuntimeError: If an event loop is already running in this thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        async def wait():
+            return await awaitable
+        return asyncio.run(wait())
+
+    if inspect.iscoroutine(awaitable):
+        awaitable.close()
+    raise RuntimeError(
+        f"The coroutine node factory {factory} cannot be run while an event loop is running "
+        "in this thread. Use gen_stategraph(parallel_factories=True) to run it on a thread pool."
+        )
 
 def validate_state_graph(values) -> bool :
     """
@@ -303,5 +806,6 @@ def validate_state_graph(values) -> bool :
     Returns:
         bool: True if the settings are valid, False otherwise.
     """
+    from kenkenpa.models.stategraph import KStateGraph
     KStateGraph(**values)
     return True
@@ -0,0 +1,483 @@
+"""
+This module provides a GraphCache class for reusing StateGraphs that were
+built from identical graph settings, a NodePool class for sharing node
+instances created by the same factory with the same factory_parameter,
+and a NodeOutputCache class for reusing the outputs of deterministic nodes.
+It includes functions to compute a canonical digest of graph settings and
+a key identifying the registered factories, evaluation functions, reducers and types.
+"""
+import hashlib
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from kenkenpa.common import KeyLocks, freeze, node_runnable
+
+def settings_digest(settings) -> str:
+    """
+    Computes a canonical digest of graph settings.
+    Dictionary key order does not affect the digest.
+
+    Args:
+        settings (Dict): The settings to digest. Must be JSON serializable.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest of the canonical JSON representation.
+
+    Raises:
+        TypeError: If the settings contain values that are not JSON serializable.
+    """
+    canonical = json.dumps(
+        settings,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def registry_key(*registries: Optional[Dict]) -> Tuple[Tuple[Tuple[str, int], ...], ...]:
+    """
+    Computes a key from the identities of the objects registered in each registry.
+
+    Args:
+        *registries (Optional[Dict]): Dictionaries mapping names to registered objects.
+
+    Returns:
+        Tuple: A hashable key made of sorted (name, id) pairs for each registry.
+    """
+    return tuple(
+        tuple(sorted((name, id(obj)) for name, obj in (registry or {}).items()))
+        for registry in registries
+    )
+
+class GraphCache:
+    """
+    GraphCache is a size-bounded LRU cache of built graphs.
+    It is safe to share between threads.
+
+    Entries keep strong references to the objects whose identities form the key,
+    so an identity cannot be reused by another object while the entry is cached.
+
+    Attributes:
+        maxsize (int): The maximum number of cached entries.
+        hits (int): The number of lookups that found a cached entry.
+        misses (int): The number of lookups that did not find a cached entry.
+        evictions (int): The number of entries evicted to respect maxsize.
+    """
+    def __init__(self, maxsize: int = 128):
+        """
+        Initializes the GraphCache.
+
+        Args:
+            maxsize (int, optional): The maximum number of cached entries. Defaults to 128.
+
+        Raises:
+            ValueError: If maxsize is less than 1.
+        """
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1: {maxsize}")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._validated = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Retrieves a cached value and marks it as recently used.
+
+        Args:
+            key (Hashable): The cache key.
+            default (Any, optional): The value returned when the key is not cached.
+
+        Returns:
+            Any: The cached value, or default.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, refs: Tuple = ()):
+        """
+        Stores a value, evicting the least recently used entries beyond maxsize.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to cache.
+            refs (Tuple, optional): Objects kept alive for as long as the entry is cached.
+        """
+        with self._lock:
+            self._entries[key] = (value, refs)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any], refs: Tuple = ()) -> Any:
+        """
+        Retrieves a cached value, building and storing it on a miss.
+
+        Args:
+            key (Hashable): The cache key.
+            build (Callable[[], Any]): A function that builds the value.
+            refs (Tuple, optional): Objects kept alive for as long as the entry is cached.
+
+        Returns:
+            Any: The cached or newly built value.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = build()
+            self.put(key, value, refs)
+        return value
+
+    def is_validated(self, digest: str) -> bool:
+        """
+        Checks whether settings with the given digest were already validated.
+
+        Args:
+            digest (str): The settings digest.
+
+        Returns:
+            bool: True if the settings were validated before.
+        """
+        with self._lock:
+            if digest in self._validated:
+                self._validated.move_to_end(digest)
+                return True
+            return False
+
+    def mark_validated(self, digest: str):
+        """
+        Records that settings with the given digest passed validation.
+
+        Args:
+            digest (str): The settings digest.
+        """
+        with self._lock:
+            self._validated[digest] = True
+            self._validated.move_to_end(digest)
+            while len(self._validated) > self.maxsize:
+                self._validated.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all cached entries and resets the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._validated.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache statistics.
+
+        Returns:
+            Dict[str, int]: The hits, misses, evictions, current size and maxsize.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+class NodePool:
+    """
+    NodePool shares node instances between graphs.
+    Instances are keyed by factory name, factory and a canonical digest of the
+    factory_parameter, and are held weakly: an instance is evicted once no graph uses it.
+    It is safe to share between threads, and concurrent requests for the same key
+    call the factory only once.
+
+    Instances of types without weak reference support (e.g. dicts, lists or tuples)
+    are returned without being pooled, since holding them strongly would keep them
+    alive after the last graph using them is gone.
+
+    Attributes:
+        hits (int): The number of requests served from the pool.
+        misses (int): The number of requests that called the factory.
+    """
+    def __init__(self):
+        """
+        Initializes the NodePool.
+        """
+        self.hits = 0
+        self.misses = 0
+        self._nodes = weakref.WeakValueDictionary()
+        self._key_locks = KeyLocks()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        """
+        Retrieves a pooled node instance, creating and pooling it if needed.
+
+        Args:
+            key (Hashable): The pool key.
+            create (Callable[[], Any]): A function that creates the node instance.
+
+        Returns:
+            Any: The pooled or newly created node instance.
+        """
+        with self._lock:
+            node = self._nodes.get(key)
+            if node is not None:
+                self.hits += 1
+                return node
+
+        with self._key_locks.hold(key):
+            with self._lock:
+                node = self._nodes.get(key)
+                if node is not None:
+                    self.hits += 1
+                    return node
+
+            node = create()
+            with self._lock:
+                self.misses += 1
+                try:
+                    self._nodes[key] = node
+                except TypeError:
+                    pass
+            return node
+
+    def clear(self):
+        """
+        Removes all pooled node instances and resets the statistics.
+        """
+        with self._lock:
+            self._nodes.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the pool statistics.
+
+        Returns:
+            Dict[str, int]: The hits, misses and current number of pooled instances.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._nodes),
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._nodes)
+
+shared_node_pool = NodePool()
+"""The process-wide NodePool used by StateGraphBuilder unless another pool is given."""
+
+class NodeOutputCache:
+    """
+    NodeOutputCache is a size-bounded LRU cache of the outputs of a node,
+    keyed by the values of some state keys.
+    It is safe to share between threads.
+
+    Values that are not hashable are converted: lists and tuples to tuples,
+    dictionaries to sorted item tuples, sets to frozensets and pydantic models
+    to their dumps. States with other unhashable values are not cached.
+
+    Attributes:
+        keys (Tuple[str, ...]): The state keys whose values form the cache key.
+        ttl (Optional[float]): The number of seconds an output stays cached, or None.
+        maxsize (int): The maximum number of cached outputs.
+        hits (int): The number of calls answered from the cache.
+        misses (int): The number of calls that ran the node.
+        evictions (int): The number of outputs evicted to respect maxsize.
+        expirations (int): The number of outputs dropped because their ttl elapsed.
+    """
+    def __init__(self, keys: List[str], ttl: Optional[float] = None, maxsize: int = 128):
+        """
+        Initializes the NodeOutputCache.
+
+        Args:
+            keys (List[str]): The state keys whose values form the cache key.
+            ttl (Optional[float], optional): The number of seconds an output stays cached.
+                Defaults to None, for no expiry.
+            maxsize (int, optional): The maximum number of cached outputs. Defaults to 128.
+
+        Raises:
+            ValueError: If maxsize is less than 1 or ttl is not positive.
+        """
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1: {maxsize}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be positive: {ttl}")
+
+        self.keys = tuple(keys)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, state: Any) -> Optional[Hashable]:
+        """
+        Computes the cache key of a state.
+
+        Args:
+            state (Any): The node input.
+
+        Returns:
+            Optional[Hashable]: The cache key, or None if the state cannot be cached.
+        """
+        try:
+            values = tuple(freeze(_state_get(state, key)) for key in self.keys)
+            hash(values)
+        except TypeError:
+            return None
+        return values
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Retrieves a cached output and marks it as recently used.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Tuple[bool, Any]: Whether the output was cached, and the output.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                output, expires = entry
+                if expires is None or time.monotonic() < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, output
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def store(self, key: Hashable, output: Any):
+        """
+        Stores an output, evicting the least recently used outputs beyond maxsize.
+
+        Args:
+            key (Hashable): The cache key.
+            output (Any): The node output.
+        """
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (output, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def wrap(self, node: Any) -> Any:
+        """
+        Wraps a node so that its outputs are cached.
+        The node may be a function, a coroutine function or a runnable,
+        and may take the config, runtime, store and writer like any LangGraph node.
+
+        Args:
+            node (Any): The node returned by a node factory.
+
+        Returns:
+            RunnableLambda: The node with sync and async entry points that use the cache.
+        """
+        from langchain_core.runnables import RunnableLambda
+
+        runnable = node_runnable(node)
+
+        def call(state, config):
+            key = self.key(state)
+            if key is None:
+                return runnable.invoke(state, config)
+            found, output = self.lookup(key)
+            if found:
+                return _copy_output(output)
+            output = runnable.invoke(state, config)
+            self.store(key, output)
+            return _copy_output(output)
+
+        async def acall(state, config):
+            key = self.key(state)
+            if key is None:
+                return await runnable.ainvoke(state, config)
+            found, output = self.lookup(key)
+            if found:
+                return _copy_output(output)
+            output = await runnable.ainvoke(state, config)
+            self.store(key, output)
+            return _copy_output(output)
+
+        return RunnableLambda(call, afunc=acall, name=getattr(runnable, "name", None))
+
+    def clear(self):
+        """
+        Removes all cached outputs and resets the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache statistics.
+
+        Returns:
+            Dict[str, int]: The hits, misses, evictions, expirations, current size and maxsize.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+def _state_get(state: Any, key: str) -> Any:
+    """
+    Returns the value of a state key, for dictionary and object states.
+    """
+    if isinstance(state, dict):
+        return state.get(key)
+    return getattr(state, key, None)
+
+def _copy_output(output: Any) -> Any:
+    """
+    Returns a shallow copy of a dictionary output, so that callers cannot modify the cached one.
+    """
+    if isinstance(output, dict):
+        return dict(output)
+    return output
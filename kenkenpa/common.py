@@ -1,11 +1,16 @@
 """
 This module provides utility functions for converting keys and generating lists of keys.
-It includes functions to convert specific string keys to predefined constants and to convert
-a dictionary of keys into a list of keys.
+It includes functions to convert specific string keys to predefined constants, to convert
+a dictionary of keys into a list of keys, to extract the literal results of conditions,
+to convert nodes into runnables for the wrappers applied to them,
+to freeze values into hashable keys, and to serialize work on the same key.
 """
-from typing import List, Dict, Union
+import inspect
+import threading
+from contextlib import contextmanager
+from typing import Any, Hashable, List, Dict, Optional, Union, get_type_hints
 
-from langgraph.graph import START,END
+from langgraph.constants import START,END
 
 def convert_key(key: str):
     """
@@ -42,3 +47,215 @@ def to_list_key(keys:Dict[str, Union[str, List[str]]]):
         key_list.append(convert_key(key))
 
     return key_list
+
+def extract_literals(conditions: List[Dict[str, Union[Dict, str]]]) -> str:
+    """
+    Extracts literals from the conditions.
+
+    Args:
+        conditions (List[Dict[str, Union[Dict, str]]]): The conditions to extract literals from.
+
+    Returns:
+        List[str]: A list of extracted literals.
+    """
+    results = []
+    for condition in conditions:
+        if 'result' in condition:
+            results.extend(to_list_key(condition['result']))
+        elif 'default' in condition:
+            results.extend(to_list_key(condition['default']))
+        elif 'switch' in condition:
+            for case in condition['cases']:
+                results.extend(to_list_key(case['result']))
+    return results
+
+INJECTED_PARAMETERS = ("config", "runtime", "store", "writer", "previous")
+"""The names of the node parameters LangGraph injects, besides the state."""
+
+def injected_parameters(func: Any) -> tuple:
+    """
+    Returns the names of the parameters of a node that LangGraph injects.
+
+    Args:
+        func (Any): The node function, or a callable object.
+
+    Returns:
+        tuple: The names, in INJECTED_PARAMETERS.
+    """
+    try:
+        parameters = list(inspect.signature(func).parameters.values())[1:]
+    except (TypeError, ValueError):
+        return ()
+    kinds = (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+    return tuple(
+        parameter.name for parameter in parameters
+        if parameter.name in INJECTED_PARAMETERS and parameter.kind in kinds
+    )
+
+def current_runtime() -> Any:
+    """
+    Returns the LangGraph runtime of the current graph run,
+    or a runtime without context, store or stream writer outside of a graph run.
+    Returns None with LangGraph versions without runtimes.
+
+    Returns:
+        Any: The runtime.
+    """
+    try:
+        from langgraph.runtime import Runtime, get_runtime
+    except ImportError:
+        return None
+    try:
+        runtime = get_runtime()
+    except RuntimeError:
+        runtime = None
+    return runtime if runtime is not None else Runtime()
+
+def injected_arguments(names: tuple, config: Any) -> Dict[str, Any]:
+    """
+    Returns the values LangGraph would inject into the parameters of a node.
+
+    Args:
+        names (tuple): The parameter names returned by injected_parameters.
+        config (Any): The runnable config of the call.
+
+    Returns:
+        Dict[str, Any]: The keyword arguments of the node call.
+    """
+    if not names:
+        return {}
+    runtime = current_runtime()
+    values = {
+        "config": config,
+        "runtime": runtime,
+        "store": getattr(runtime, "store", None),
+        "writer": getattr(runtime, "stream_writer", lambda chunk: None),
+        "previous": getattr(runtime, "previous", None),
+    }
+    return {name: values[name] for name in names}
+
+def node_runnable(node: Any, name: Optional[str] = None):
+    """
+    Converts a node into a runnable for the wrappers applied to it.
+    Function nodes get the config, runtime, store, writer and previous values
+    LangGraph injects into nodes, as long as wrappers call the runnable
+    with the config they received.
+
+    Args:
+        node (Any): The node. It may be a function, a coroutine function or a runnable.
+        name (Optional[str], optional): The name of the runnable. Defaults to None.
+
+    Returns:
+        Runnable: The node as a runnable.
+    """
+    from langchain_core.runnables import Runnable, RunnableLambda
+    from langchain_core.runnables.utils import is_async_callable
+
+    if isinstance(node, Runnable):
+        return node
+
+    names = injected_parameters(node)
+    if is_async_callable(node):
+        async def acall(state, config):
+            return await node(state, **injected_arguments(names, config))
+        return RunnableLambda(acall, name=name)
+
+    def call(state, config):
+        return node(state, **injected_arguments(names, config))
+    return RunnableLambda(call, name=name)
+
+def node_input_schema(node: Any) -> Optional[type]:
+    """
+    Returns the input schema StateGraph.add_node infers from the annotation
+    of the first parameter of a node, such as a private input TypedDict.
+    Wrappers hide the annotation, so it is taken from the node before wrapping.
+
+    Args:
+        node (Any): The node.
+
+    Returns:
+        Optional[type]: The input schema, or None if the node does not declare one.
+    """
+    try:
+        if not (
+            inspect.isfunction(node)
+            or inspect.ismethod(node)
+            or inspect.ismethod(getattr(node, "__call__", None))
+        ):
+            return None
+        hints = get_type_hints(getattr(node, "__call__")) or get_type_hints(node)
+        if not hints:
+            return None
+        first_parameter_name = next(iter(inspect.signature(node).parameters.keys()))
+        input_hint = hints.get(first_parameter_name)
+        if isinstance(input_hint, type) and get_type_hints(input_hint):
+            return input_hint
+    except (NameError, TypeError, StopIteration):
+        pass
+    return None
+
+def freeze(value: Any) -> Hashable:
+    """
+    Converts a value into a hashable equivalent, used for cache and memo keys.
+    Values of different types, e.g. 1, 1.0 and True or a list and a tuple,
+    give different keys. Pydantic models are frozen through model_dump.
+
+    Args:
+        value (Any): The value to convert.
+
+    Returns:
+        Hashable: The frozen value.
+
+    Raises:
+        TypeError: If the value contains unhashable objects that cannot be converted.
+    """
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((freeze(key), freeze(item)) for key, item in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(freeze(item) for item in value))
+    if isinstance(value, (set, frozenset)):
+        return (set, frozenset(freeze(item) for item in value))
+    if hasattr(value, "model_dump") and not isinstance(value, type):
+        return (type(value), freeze(value.model_dump()))
+    hash(value)
+    return (type(value), value)
+
+class KeyLocks:
+    """
+    KeyLocks hands out one lock per key, so that threads working on the same key,
+    e.g. building the same node or graph, run one after the other.
+    A lock is kept as long as a thread holds it or waits for it,
+    so a thread arriving later always waits for the same lock.
+    """
+    def __init__(self):
+        """
+        Initializes the KeyLocks.
+        """
+        self._locks: Dict[Hashable, list] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, key: Hashable):
+        """
+        Holds the lock of a key, waiting for the threads holding it or waiting before.
+
+        Args:
+            key (Hashable): The key.
+        """
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._locks)
@@ -3,9 +3,86 @@ This module provides functionality for generating and
 handling configurable conditional edges.
 It includes a function to generate a configurable conditional edge and
 a class to handle the evaluation of conditions.
+
+Conditions are compiled once, when the handler is constructed, into a tree of
+pre-bound callables. Each compiled expression and operand is a callable
+taking ``(state, config, memo)``, so a routing decision only pays for the
+comparisons themselves. ``memo`` is a dictionary created for each call, in which
+function operands that appear several times in one handler store their result,
+so each distinct operand runs once per routing decision.
+
+Conditions that compare one operand against many constants, whether written
+as a ``switch`` condition or as a list of ``eq`` expressions on the same
+operand, are compiled into a hash table so routing is a single lookup.
+
+Handlers also provide ``acall``, which awaits coroutine evaluation functions,
+runs synchronous ones in a thread pool, and evaluates independent function
+operands concurrently.
+
+In adaptive mode, the side-effect free children of ``and`` and ``or`` are
+reordered periodically from their observed cost and how often they decide
+the result, so cheap, selective children are evaluated first.
+
+In incremental mode, a handler whose read set, the state keys and config values
+its conditions depend on, is statically known remembers its last result for
+each conversation, identified by the ``thread_id`` of the config, and returns it
+again while none of those values changed.
+
+Handlers given a metrics collector record which conditions matched, whether the
+default was taken, how many evaluation functions were called and how long each
+routing decision took. Without a collector, no instrumentation is compiled in.
 """
+import asyncio
+import inspect
+import math
+import operator
+import threading
+import time
+from collections import OrderedDict
 from typing import List
-from kenkenpa.common import convert_key
+from kenkenpa.common import convert_key, freeze
+
+MATCH_MODES = ("all", "first")
+
+EQUALITY_OPERATORS = frozenset({"==", "equals", "eq"})
+
+OPERAND_TYPES = frozenset({"state_value", "config_value", "function"})
+
+COMPARISON_OPERATORS = {
+    "==": operator.eq,
+    "equals": operator.eq,
+    "eq": operator.eq,
+    "!=": operator.ne,
+    "not_equals": operator.ne,
+    "neq": operator.ne,
+    ">": operator.gt,
+    "greater_than": operator.gt,
+    "gt": operator.gt,
+    ">=": operator.ge,
+    "greater_than_or_equals": operator.ge,
+    "gte": operator.ge,
+    "<": operator.lt,
+    "less_than": operator.lt,
+    "lt": operator.lt,
+    "<=": operator.le,
+    "less_than_or_equals": operator.le,
+    "lte": operator.le,
+}
+
+ADAPTIVE_INTERVAL = 128
+"""The number of evaluations of an adaptive ``and``/``or`` between reorderings of its children."""
+
+INCREMENTAL_MAXSIZE = 1024
+"""The number of conversations whose last result an incremental handler remembers."""
+
+# Values of these types are compared by equality when checking whether the read set
+# changed; other values are compared by identity.
+IMMUTABLE_TYPES = frozenset({str, int, float, bool, bytes, type(None)})
+
+# memo keys of the matched condition indexes and the evaluation function call count,
+# used when a metrics collector is set.
+_MATCHED = object()
+_CALLS = object()
 
 class ConfigurableConditionalHandler:
     """
@@ -15,17 +92,100 @@ class ConfigurableConditionalHandler:
     Attributes:
         conditions (List[Dict]): A list of conditions to evaluate.
         evaluate_functions (Dict[str, callable]): A dictionary of evaluation functions.
+        match (str): "all" to collect the results of every matching condition,
+            or "first" to stop at the first matching condition.
+        impure_functions (FrozenSet[str]): Names of evaluation functions
+            that must be called every time they appear.
+        is_async (bool): True if the conditions call coroutine evaluation functions.
+        metrics (Optional[RoutingMetrics]): The collector of routing decision metrics, if any.
+        name (Optional[str]): The name of the edge in the metrics.
+        adaptive (bool): True if the children of ``and`` and ``or`` are reordered
+            from their observed cost and selectivity.
+        function_dependencies (Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]):
+            The state keys and config values read by evaluation functions, by name.
+        read_set (Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]): The state keys
+            and config values the conditions depend on, or None if a function operand
+            calls an impure evaluation function or one without declared dependencies.
+        incremental (bool): True if the last result is reused while the read set is unchanged.
     """
-    def __init__(self,conditions,evaluate_functions):
+    def __init__(
+        self,
+        conditions,
+        evaluate_functions,
+        match:str="all",
+        impure_functions=None,
+        metrics=None,
+        name:str=None,
+        adaptive:bool=False,
+        incremental:bool=False,
+        function_dependencies=None,
+        ):
         """
         Initializes the ConfigurableConditionalHandler with conditions and evaluation functions.
+        The conditions are compiled here, so malformed expressions are reported
+        when the handler is built rather than on the first routing call.
 
         Args:
             conditions (List[Dict]): A list of conditions to evaluate.
             evaluate_functions (Dict[str, callable]): A dictionary of evaluation functions.
+            match (str, optional): "all" to collect the results of every matching condition,
+                or "first" to stop at the first matching condition. Defaults to "all".
+            impure_functions (Iterable[str], optional): Names of evaluation functions
+                whose results must not be memoized within a call. Defaults to None.
+            metrics (Optional[RoutingMetrics], optional): A collector of routing decision
+                metrics, such as kenkenpa.instrumentation.RoutingMetrics, or any object
+                with a compatible record method. Defaults to None.
+            name (str, optional): The name of the edge in the metrics,
+                e.g. its start_key. Defaults to None.
+            adaptive (bool, optional): If True, the children of ``and`` and ``or``
+                that call no impure evaluation function are periodically reordered,
+                so that cheap children that often decide the result are evaluated first.
+                Impure children keep their position relative to the others.
+                acall evaluates expressions with function operands in declaration order.
+                Defaults to False.
+            incremental (bool, optional): If True and the read set is known, the result of
+                the last call of each conversation, identified by the ``thread_id`` config
+                value, is remembered and returned again, without evaluating the conditions,
+                while every state key and config value in the read set is unchanged.
+                The results of the INCREMENTAL_MAXSIZE most recent conversations are kept.
+                Strings, numbers, booleans and None are compared by equality, other values
+                by identity, so values mutated in place are not detected.
+                Reused results are not recorded in the metrics. Defaults to False.
+            function_dependencies (Dict[str, Tuple[Iterable[str], Iterable[str]]], optional):
+                The state keys and config values read by pure evaluation functions, by name.
+                Function operands calling other functions make the read set unknown.
+                Defaults to None.
+
+        Raises:
+            ValueError: If the match mode is unsupported.
         """
+        if match not in MATCH_MODES:
+            raise ValueError(f"Unsupported match mode: {match}")
+
         self.conditions = conditions
         self.evaluate_functions = evaluate_functions
+        self.match = match
+        self.impure_functions = frozenset(impure_functions or ())
+        self.metrics = metrics
+        self.name = name
+        self.adaptive = adaptive
+        self.incremental = incremental
+        self.function_dependencies = {
+            func_name: (tuple(state_keys), tuple(config_keys))
+            for func_name, (state_keys, config_keys) in (function_dependencies or {}).items()
+        }
+        self.read_set = _read_set(conditions, self.function_dependencies, self.impure_functions)
+        self._last_results = (
+            OrderedDict() if incremental and self.read_set is not None else None
+        )
+        self._last_results_lock = threading.Lock()
+        self.is_async = any(
+            _is_async_callable(evaluate_functions.get(operand["name"]))
+            for operand in _iter_operands(conditions)
+            if operand.get("type") == "function"
+        )
+        self._compiled = self._compile_conditions(conditions)
+        self._compiled_async = None
 
     def __call__(self, state,config):
         """
@@ -38,15 +198,44 @@ class ConfigurableConditionalHandler:
         Returns:
             List: The results of the evaluated conditions.
         """
-        results = self._evaluate_conditions(self.conditions, state, config)
+        if self._last_results is None:
+            return self._call(state, config)
+
+        values = self._read_values(state, config)
+        conversation = config.get("configurable",{}).get("thread_id")
+        results = self._reuse_results(conversation, values)
+        if results is None:
+            results = self._call(state, config)
+            self._store_results(conversation, values, results)
         return results
 
-    def _evaluate_conditions(self, conditions, state, config):
+    def _call(self, state, config):
         """
-        Evaluates the conditions and returns the results.
+        Evaluates the compiled conditions.
+
+        Args:
+            state (Dict): The current state.
+            config (Dict): The configuration.
+
+        Returns:
+            List: The results of the evaluated conditions.
+        """
+        matching, defaults, memo_keys = self._compiled
+        if self.metrics is not None:
+            return self._run_conditions_with_metrics(matching, defaults, state, config)
+        return self._run_conditions(matching, defaults, state, config, self._new_memo() if memo_keys else None)
+
+    async def acall(self, state, config):
+        """
+        Asynchronously calls the edge based on the current state and configuration.
+
+        Coroutine evaluation functions are awaited and synchronous ones are run
+        in a thread pool, so the event loop is never blocked. Both operands of a
+        comparison, and every condition in "all" match mode, are evaluated concurrently.
+        The operands of ``and`` and ``or`` are still evaluated in order, so that
+        they short-circuit as in ``__call__``.
 
         Args:
-            conditions (List[Dict]): The conditions to evaluate.
             state (Dict): The current state.
             config (Dict): The configuration.
 
@@ -56,70 +245,337 @@ class ConfigurableConditionalHandler:
         Raises:
             ValueError: If no matching conditions are found and no default function is provided.
         """
-        results = self._evaluate_matching_conditions(conditions, state, config)
+        if self._last_results is None:
+            return await self._acall(state, config)
+
+        values = self._read_values(state, config)
+        conversation = config.get("configurable",{}).get("thread_id")
+        results = self._reuse_results(conversation, values)
+        if results is None:
+            results = await self._acall(state, config)
+            self._store_results(conversation, values, results)
+        return results
+
+    async def _acall(self, state, config):
+        """
+        Asynchronously evaluates the compiled conditions.
+
+        Args:
+            state (Dict): The current state.
+            config (Dict): The configuration.
+
+        Returns:
+            List: The results of the evaluated conditions.
+        """
+        if self._compiled_async is None:
+            self._compiled_async = self._compile_async_conditions(self.conditions)
+        matching, defaults, memo_keys = self._compiled_async
+        if self.metrics is not None:
+            return await self._arun_conditions_with_metrics(matching, defaults, state, config)
+        memo = self._new_memo() if memo_keys else None
+
+        results = await self._aevaluate_matching_conditions(matching, state, config, memo)
         if results:
             return results
 
-        results = self._evaluate_default_conditions(conditions, state, config)
+        results = await self._aevaluate_default_conditions(defaults, state, config, memo)
         if results:
             return results
 
         raise ValueError("No matching conditions were found, and no default function was provided.")
 
-    def _evaluate_matching_conditions(self, conditions, state, config):
+    def _new_memo(self):
+        """
+        Creates the memo of a call. When a metrics collector is set, the memo is
+        seeded with the matched condition indexes and the function call count.
+
+        Returns:
+            Dict: The memo.
         """
-        Evaluates the conditions that match the given state and config.
+        if self.metrics is None:
+            return {}
+        return {_MATCHED: [], _CALLS: 0}
+
+    def _read_values(self, state, config):
+        """
+        Reads the values of the read set.
 
         Args:
-            conditions (List[Dict]): The conditions to evaluate.
             state (Dict): The current state.
             config (Dict): The configuration.
 
+        Returns:
+            Tuple: The values of the state keys followed by the values of the config values.
+        """
+        state_keys, config_keys = self.read_set
+        configurable = config.get("configurable",{})
+        return (
+            tuple(state.get(key) for key in state_keys)
+            + tuple(configurable.get(key) for key in config_keys)
+        )
+
+    def _reuse_results(self, conversation, values):
+        """
+        Returns the last results of a conversation if they were computed from the same values.
+
+        Args:
+            conversation (Hashable): The thread_id of the conversation, or None.
+            values (Tuple): The current values of the read set.
+
+        Returns:
+            Optional[List]: A copy of the last results, or None if the values changed.
+        """
+        with self._last_results_lock:
+            last = self._last_results.get(conversation)
+            if last is None:
+                return None
+            self._last_results.move_to_end(conversation)
+        last_values, results = last
+        for value, last_value in zip(values, last_values):
+            if value is last_value:
+                continue
+            if type(value) is type(last_value) and type(value) in IMMUTABLE_TYPES \
+                    and value == last_value:
+                continue
+            return None
+        return list(results)
+
+    def _store_results(self, conversation, values, results):
+        """
+        Remembers the last results of a conversation, forgetting the least recently
+        used conversations beyond INCREMENTAL_MAXSIZE.
+
+        Args:
+            conversation (Hashable): The thread_id of the conversation, or None.
+            values (Tuple): The values of the read set the results were computed from.
+            results (List): The results.
+        """
+        with self._last_results_lock:
+            self._last_results[conversation] = (values, list(results))
+            self._last_results.move_to_end(conversation)
+            while len(self._last_results) > INCREMENTAL_MAXSIZE:
+                self._last_results.popitem(last=False)
+
+    async def _aevaluate_matching_conditions(self, matching, state, config, memo):
+        """
+        Asynchronously evaluates the compiled conditions that match the given state and config.
+        In "all" match mode, the conditions are evaluated concurrently.
+
+        Args:
+            matching (List[callable]): The compiled asynchronous branches.
+            state (Dict): The current state.
+            config (Dict): The configuration.
+            memo (Optional[Dict]): The memo of function operand results for this call.
+
         Returns:
             List: The results of the evaluated conditions.
         """
+        if self.match == "first":
+            for branch in matching:
+                branch_results = await branch(state, config, memo)
+                if branch_results is not None:
+                    return list(branch_results)
+            return []
+
         results = []
-        for condition in conditions:
-            if ("expression" in condition and
-                self._evaluate_expr(condition["expression"], state, config)):
-                results.extend(self._process_result(condition["result"], state, config))
+        for branch_results in await _gather(
+            [branch(state, config, memo) for branch in matching]
+            ):
+            if branch_results is not None:
+                results.extend(branch_results)
         return results
 
-    def _evaluate_default_conditions(self, conditions, state, config):
+    async def _aevaluate_default_conditions(self, defaults, state, config, memo):
         """
-        Evaluates the default conditions if no matching conditions are found.
+        Asynchronously evaluates the default conditions.
 
         Args:
-            conditions (List[Dict]): The conditions to evaluate.
+            defaults (List[callable]): The compiled asynchronous default result getters.
             state (Dict): The current state.
             config (Dict): The configuration.
+            memo (Optional[Dict]): The memo of function operand results for this call.
 
         Returns:
             List: The results of the evaluated conditions.
         """
         results = []
-        for condition in conditions:
-            if "default" in condition:
-                results.extend(self._process_result(condition["default"], state, config))
+        for get_result in defaults:
+            results.extend(await get_result(state, config, memo))
         return results
 
-    def _process_result(self, result, state, config):
+    def _run_conditions_with_metrics(self, matching, defaults, state, config):
         """
-        Processes the result value and converts keys if necessary.
+        Runs compiled conditions and records the decision in the metrics collector.
 
         Args:
-            result: The result value to process.
+            matching (List[callable]): The compiled branches.
+            defaults (List[callable]): The compiled default result getters.
             state (Dict): The current state.
             config (Dict): The configuration.
 
         Returns:
-            List: The processed result values.
+            List: The results of the evaluated conditions.
+
+        Raises:
+            ValueError: If no matching conditions are found and no default function is provided.
+        """
+        memo = self._new_memo()
+        default_taken = False
+        error = True
+        start = time.perf_counter()
+        try:
+            results = self._evaluate_matching_conditions(matching, state, config, memo)
+            if not results:
+                results = self._evaluate_default_conditions(defaults, state, config, memo)
+                default_taken = bool(results)
+            if not results:
+                raise ValueError(
+                    "No matching conditions were found, and no default function was provided."
+                    )
+            error = False
+            return results
+        finally:
+            self.metrics.record(
+                self.name,
+                sorted(memo[_MATCHED]),
+                default_taken,
+                memo[_CALLS],
+                time.perf_counter() - start,
+                error=error,
+                )
+
+    async def _arun_conditions_with_metrics(self, matching, defaults, state, config):
         """
-        result_value = self._get_value(result, state, config)
-        if isinstance(result_value, List):
-            return [convert_key(wk) if isinstance(wk, str) else wk for wk in result_value]
+        Asynchronously runs compiled conditions and records the decision in the metrics collector.
+
+        Args:
+            matching (List[callable]): The compiled asynchronous branches.
+            defaults (List[callable]): The compiled asynchronous default result getters.
+            state (Dict): The current state.
+            config (Dict): The configuration.
 
-        return [convert_key(result_value) if isinstance(result_value, str) else result_value]
+        Returns:
+            List: The results of the evaluated conditions.
+
+        Raises:
+            ValueError: If no matching conditions are found and no default function is provided.
+        """
+        memo = self._new_memo()
+        default_taken = False
+        error = True
+        start = time.perf_counter()
+        try:
+            results = await self._aevaluate_matching_conditions(matching, state, config, memo)
+            if not results:
+                results = await self._aevaluate_default_conditions(defaults, state, config, memo)
+                default_taken = bool(results)
+            if not results:
+                raise ValueError(
+                    "No matching conditions were found, and no default function was provided."
+                    )
+            error = False
+            return results
+        finally:
+            self.metrics.record(
+                self.name,
+                sorted(memo[_MATCHED]),
+                default_taken,
+                memo[_CALLS],
+                time.perf_counter() - start,
+                error=error,
+                )
+
+    def _evaluate_conditions(self, conditions, state, config):
+        """
+        Evaluates the conditions and returns the results.
+
+        Args:
+            conditions (List[Dict]): The conditions to evaluate.
+            state (Dict): The current state.
+            config (Dict): The configuration.
+
+        Returns:
+            List: The results of the evaluated conditions.
+
+        Raises:
+            ValueError: If no matching conditions are found and no default function is provided.
+        """
+        matching, defaults, _ = self._compile_conditions(conditions)
+        return self._run_conditions(matching, defaults, state, config, self._new_memo())
+
+    def _run_conditions(self, matching, defaults, state, config, memo):
+        """
+        Runs compiled conditions and returns the results.
+
+        Args:
+            matching (List[callable]): The compiled branches.
+            defaults (List[callable]): The compiled default result getters.
+            state (Dict): The current state.
+            config (Dict): The configuration.
+            memo (Optional[Dict]): The memo of function operand results for this call.
+
+        Returns:
+            List: The results of the evaluated conditions.
+
+        Raises:
+            ValueError: If no matching conditions are found and no default function is provided.
+        """
+        results = self._evaluate_matching_conditions(matching, state, config, memo)
+        if results:
+            return results
+
+        results = self._evaluate_default_conditions(defaults, state, config, memo)
+        if results:
+            return results
+
+        raise ValueError("No matching conditions were found, and no default function was provided.")
+
+    def _evaluate_matching_conditions(self, matching, state, config, memo):
+        """
+        Evaluates the compiled conditions that match the given state and config.
+        In "first" match mode, evaluation stops at the first matching condition.
+
+        Args:
+            matching (List[callable]): The compiled branches. Each branch returns
+                its results when it matches, and None otherwise.
+            state (Dict): The current state.
+            config (Dict): The configuration.
+            memo (Optional[Dict]): The memo of function operand results for this call.
+
+        Returns:
+            List: The results of the evaluated conditions.
+        """
+        if self.match == "first":
+            for branch in matching:
+                branch_results = branch(state, config, memo)
+                if branch_results is not None:
+                    return list(branch_results)
+            return []
+
+        results = []
+        for branch in matching:
+            branch_results = branch(state, config, memo)
+            if branch_results is not None:
+                results.extend(branch_results)
+        return results
+
+    def _evaluate_default_conditions(self, defaults, state, config, memo):
+        """
+        Evaluates the default conditions if no matching conditions are found.
+
+        Args:
+            defaults (List[callable]): The compiled default result getters.
+            state (Dict): The current state.
+            config (Dict): The configuration.
+            memo (Optional[Dict]): The memo of function operand results for this call.
+
+        Returns:
+            List: The results of the evaluated conditions.
+        """
+        results = []
+        for get_result in defaults:
+            results.extend(get_result(state, config, memo))
+        return results
 
     def _evaluate_expr(self,expr, state, config):
         """
@@ -136,46 +592,1120 @@ class ConfigurableConditionalHandler:
         Raises:
             ValueError: If the expression is not a dictionary.
         """
+        return self._compile_expr(expr)(state, config, self._new_memo())
+
+    def _get_value(self,item, state, config):
+        """
+        Resolves an operand against the current state and configuration.
+
+        Args:
+            item: The operand to resolve.
+            state (Dict): The current state.
+            config (Dict): The configuration.
+
+        Returns:
+            Any: The value of the operand.
+        """
+        return self._compile_operand(item)(state, config, self._new_memo())
+
+    def _compile_conditions(self, conditions):
+        """
+        Compiles a list of conditions.
+
+        Args:
+            conditions (List[Dict]): The conditions to compile.
+
+        Returns:
+            Tuple[List, List, FrozenSet]: The compiled branches, the compiled default
+                result getters, and the keys of the function operands memoized
+                within a call, empty if the compiled conditions use no memo.
+        """
+        memo_keys = _repeated_function_keys(conditions, self.impure_functions)
+        matching = []
+        defaults = []
+        switch = _detect_switch(conditions, self.impure_functions)
+        if switch is not None:
+            operand, cases = switch
+            matching.append(self._compile_switch(operand, cases, _expression_indexes(conditions), memo_keys))
+
+        for index, condition in enumerate(conditions):
+            if "expression" in condition and switch is None:
+                branch = self._compile_branch(condition["expression"], condition["result"], memo_keys)
+                if self.metrics is not None:
+                    branch = _record_match(branch, (index,))
+                matching.append(branch)
+            if "switch" in condition:
+                matching.append(self._compile_switch(
+                    condition["switch"],
+                    [(case["value"], case["result"]) for case in condition["cases"]],
+                    [index] * len(condition["cases"]),
+                    memo_keys,
+                    ))
+            if "default" in condition:
+                defaults.append(self._compile_result(condition["default"], memo_keys))
+        return matching, defaults, memo_keys
+
+    def _compile_branch(self, expression, result, memo_keys=frozenset()):
+        """
+        Compiles an expression condition into a branch.
+
+        Args:
+            expression (Dict): The expression of the condition.
+            result: The result of the condition.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A function taking ``(state, config, memo)`` and returning
+                the results when the expression is true, or None otherwise.
+        """
+        evaluate = self._compile_expr(expression, memo_keys)
+        get_result = self._compile_result(result, memo_keys)
+
+        def branch(state, config, memo):
+            if evaluate(state, config, memo):
+                return get_result(state, config, memo)
+            return None
+        return branch
+
+    def _compile_switch(self, operand, cases, indexes, memo_keys=frozenset()):
+        """
+        Compiles a switch into a branch backed by a hash table from value to results.
+        Cases with equal values are combined in declaration order,
+        or reduced to the first one in "first" match mode.
+
+        Args:
+            operand: The operand whose value selects the case.
+            cases (List[Tuple[Any, Any]]): Pairs of case values and results.
+            indexes (List[int]): The index of the condition of each case, for the metrics.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A function taking ``(state, config, memo)`` and returning
+                the results of the selected case, or None if no case matches.
+        """
+        get_value = self._compile_operand(operand, memo_keys)
+
+        table = {}
+        for value, results in _group_cases(cases, self.match).items():
+            if any(isinstance(result, dict) for result in results):
+                table[value] = _compile_concat([self._compile_result(r, memo_keys) for r in results])
+            else:
+                converted = [item for result in results for item in _convert_result(result)]
+                table[value] = _constant(converted)
+        if self.metrics is not None:
+            grouped_indexes = _group_cases(zip([value for value, _ in cases], indexes), self.match)
+            for value, get_result in table.items():
+                table[value] = _record_match(get_result, grouped_indexes[value])
+
+        def branch(state, config, memo):
+            value = get_value(state, config, memo)
+            try:
+                get_result = table.get(value)
+            except TypeError:
+                # unhashable values match no case.
+                return None
+            if get_result is None:
+                return None
+            return get_result(state, config, memo)
+        return branch
+
+    def _compile_result(self, result, memo_keys=frozenset()):
+        """
+        Compiles a result value into a callable returning the list of next nodes.
+        Scalar results are converted once at compile time.
+
+        Args:
+            result: The result value to compile.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A function taking ``(state, config, memo)`` and returning a list.
+        """
+        if isinstance(result, dict):
+            get_value = self._compile_operand(result, memo_keys)
+
+            def get_result(state, config, memo):
+                return _convert_result(get_value(state, config, memo))
+            return get_result
+
+        return _constant(_convert_result(result))
+
+    def _compile_expr(self, expr, memo_keys=frozenset()):
+        """
+        Compiles an expression into a callable.
+
+        Args:
+            expr (Dict): The expression to compile.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A function taking ``(state, config, memo)`` and returning the evaluation result.
+
+        Raises:
+            ValueError: If the expression is not a dictionary or the operation is unsupported.
+        """
         if not isinstance(expr, dict):
             raise ValueError("The formula must be a dictionary.")
 
         for op, args in expr.items():
+            if op in ("and", "or") and self.adaptive and len(args) > 1:
+                return _AdaptiveJunction(
+                    [self._compile_expr(sub_expr, memo_keys) for sub_expr in args],
+                    [not self._calls_impure_function(sub_expr) for sub_expr in args],
+                    short_circuit=op == "or",
+                    )
             if op == "and":
-                return all(self._evaluate_expr(sub_expr, state, config) for sub_expr in args)
+                return _compile_and([self._compile_expr(sub_expr, memo_keys) for sub_expr in args])
             if op == "or":
-                return any(self._evaluate_expr(sub_expr, state, config) for sub_expr in args)
+                return _compile_or([self._compile_expr(sub_expr, memo_keys) for sub_expr in args])
             if op == "not":
-                return not self._evaluate_expr(args, state, config)
-            if op in {"==", "!=", ">", ">=", "<", "<=",
-                        "equals","not_equals","greater_than","greater_than_or_equals",
-                        "less_than","less_than_or_equals",
-                        "eq","neq","gt","gte","lt","lte",
-                        }:
-                left_item, right_item = args
-                left_value = self._get_value(left_item,state, config)
-                right_value = self._get_value(right_item,state, config)
-                return compare_values(op,left_value,right_value)
+                child = self._compile_expr(args, memo_keys)
+                return lambda state, config, memo: not child(state, config, memo)
+            if op in COMPARISON_OPERATORS:
+                return self._compile_comparison(op, args, memo_keys)
 
             raise ValueError(f"Unsupported operation: {op}")
 
-    def _get_value(self,item, state, config):
-        if isinstance(item, dict):
-            if item["type"] == "state_value":
-                return state.get(item["name"])
-            if item["type"] == "config_value":
-                return config.get("configurable",{}).get(item["name"])
-            if item["type"] == "function":
-                func_name = item["name"]
-                if func_name not in self.evaluate_functions:
-                    raise ValueError(
-                        f"The function {func_name} cannot be found in evaluate_functions."
+        return lambda state, config, memo: None
+
+    def _calls_impure_function(self, expr):
+        """
+        Checks whether an expression calls an impure evaluation function.
+
+        Args:
+            expr (Dict): The expression to inspect.
+
+        Returns:
+            bool: True if a function operand names an impure evaluation function.
+        """
+        return any(
+            operand.get("type") == "function" and operand.get("name") in self.impure_functions
+            for operand in _iter_operands(expr)
+        )
+
+    def _compile_comparison(self, op, args, memo_keys=frozenset()):
+        """
+        Compiles a comparison expression.
+
+        Args:
+            op (str): The comparison operator.
+            args (List): The left and right operands.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A function taking ``(state, config, memo)`` and returning the comparison result.
+        """
+        compare = COMPARISON_OPERATORS[op]
+        left_item, right_item = args
+        get_left = self._compile_operand(left_item, memo_keys)
+
+        if not isinstance(right_item, dict):
+            def evaluate_constant(state, config, memo):
+                return compare(get_left(state, config, memo), right_item)
+            return evaluate_constant
+
+        get_right = self._compile_operand(right_item, memo_keys)
+
+        def evaluate(state, config, memo):
+            return compare(get_left(state, config, memo), get_right(state, config, memo))
+        return evaluate
+
+    def _compile_operand(self, item, memo_keys=frozenset()):
+        """
+        Compiles an operand into a getter.
+
+        Args:
+            item: The operand to compile.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A function taking ``(state, config, memo)`` and returning the operand value.
+
+        Raises:
+            ValueError: If the operand type is unsupported.
+        """
+        if not isinstance(item, dict):
+            return lambda state, config, memo: item
+
+        if item["type"] == "state_value":
+            name = item["name"]
+            return lambda state, config, memo: state.get(name)
+        if item["type"] == "config_value":
+            name = item["name"]
+            return lambda state, config, memo: config.get("configurable",{}).get(name)
+        if item["type"] == "function":
+            return self._compile_function(item["name"], item.get("args", {}), memo_keys)
+
+        raise ValueError(f"Unsupported type: {item['type']}")
+
+    def _compile_function(self, func_name, args, memo_keys=frozenset()):
+        """
+        Compiles a function operand. The evaluation function is resolved at
+        compile time when it is already registered; otherwise it is looked up
+        on each call so that functions registered later are still found.
+        Operands that appear several times in the handler store their result in the memo.
+        When a metrics collector is set, each call is counted in the memo.
+
+        Args:
+            func_name (str): The name of the evaluation function.
+            args (Dict): Keyword arguments passed to the evaluation function.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A function taking ``(state, config, memo)`` and returning the function result.
+        """
+        function = self.evaluate_functions.get(func_name)
+        if function is not None and not _is_async_callable(function):
+            def call(state, config):
+                return function(state, config, **args)
+        else:
+            evaluate_functions = self.evaluate_functions
+
+            def call(state, config):
+                value = _lookup_function(evaluate_functions, func_name)(state, config, **args)
+                if inspect.isawaitable(value):
+                    return _run_sync(value, func_name)
+                return value
+
+        if self.metrics is None:
+            def invoke(state, config, memo):
+                return call(state, config)
+        else:
+            def invoke(state, config, memo):
+                memo[_CALLS] += 1
+                return call(state, config)
+
+        key = _function_key(func_name, args)
+        if key is None or key not in memo_keys:
+            return invoke
+
+        def call_memoized(state, config, memo):
+            if key in memo:
+                return memo[key]
+            value = memo[key] = invoke(state, config, memo)
+            return value
+        return call_memoized
+
+    def _compile_async_conditions(self, conditions):
+        """
+        Compiles a list of conditions for asynchronous evaluation.
+
+        Args:
+            conditions (List[Dict]): The conditions to compile.
+
+        Returns:
+            Tuple[List, List, FrozenSet]: The compiled branches, the compiled default
+                result getters, and the keys of the function operands memoized
+                within a call, empty if the compiled conditions use no memo.
+                Each compiled callable is a coroutine function.
+        """
+        memo_keys = _repeated_function_keys(conditions, self.impure_functions)
+        matching = []
+        defaults = []
+        switch = _detect_switch(conditions, self.impure_functions)
+        if switch is not None:
+            operand, cases = switch
+            matching.append(
+                self._compile_async_switch(operand, cases, _expression_indexes(conditions), memo_keys)
+                )
+
+        for index, condition in enumerate(conditions):
+            if "expression" in condition and switch is None:
+                branch = self._compile_async_branch(
+                    condition["expression"], condition["result"], memo_keys)
+                if self.metrics is not None:
+                    branch = _record_async_match(branch, (index,))
+                matching.append(branch)
+            if "switch" in condition:
+                matching.append(self._compile_async_switch(
+                    condition["switch"],
+                    [(case["value"], case["result"]) for case in condition["cases"]],
+                    [index] * len(condition["cases"]),
+                    memo_keys,
+                    ))
+            if "default" in condition:
+                defaults.append(self._compile_async_result(condition["default"], memo_keys))
+        return matching, defaults, memo_keys
+
+    def _compile_async_branch(self, expression, result, memo_keys=frozenset()):
+        """
+        Compiles an expression condition into an asynchronous branch.
+
+        Args:
+            expression (Dict): The expression of the condition.
+            result: The result of the condition.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A coroutine function taking ``(state, config, memo)`` and returning
+                the results when the expression is true, or None otherwise.
+        """
+        evaluate = self._compile_async_expr(expression, memo_keys)
+        get_result = self._compile_async_result(result, memo_keys)
+
+        async def branch(state, config, memo):
+            if await evaluate(state, config, memo):
+                return await get_result(state, config, memo)
+            return None
+        return branch
+
+    def _compile_async_switch(self, operand, cases, indexes, memo_keys=frozenset()):
+        """
+        Compiles a switch into an asynchronous branch backed by a hash table.
+
+        Args:
+            operand: The operand whose value selects the case.
+            cases (List[Tuple[Any, Any]]): Pairs of case values and results.
+            indexes (List[int]): The index of the condition of each case, for the metrics.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A coroutine function taking ``(state, config, memo)`` and returning
+                the results of the selected case, or None if no case matches.
+        """
+        get_value = self._compile_async_operand(operand, memo_keys)
+
+        table = {}
+        for value, results in _group_cases(cases, self.match).items():
+            table[value] = _compile_async_concat(
+                [self._compile_async_result(result, memo_keys) for result in results]
+                )
+        if self.metrics is not None:
+            grouped_indexes = _group_cases(zip([value for value, _ in cases], indexes), self.match)
+            for value, get_result in table.items():
+                table[value] = _record_async_match(get_result, grouped_indexes[value])
+
+        async def branch(state, config, memo):
+            value = await get_value(state, config, memo)
+            try:
+                get_result = table.get(value)
+            except TypeError:
+                return None
+            if get_result is None:
+                return None
+            return await get_result(state, config, memo)
+        return branch
+
+    def _compile_async_result(self, result, memo_keys=frozenset()):
+        """
+        Compiles a result value into a coroutine function returning the list of next nodes.
+
+        Args:
+            result: The result value to compile.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A coroutine function taking ``(state, config, memo)`` and returning a list.
+        """
+        if not _has_function_operand(result):
+            return _to_async(self._compile_result(result, memo_keys))
+
+        get_value = self._compile_async_operand(result, memo_keys)
+
+        async def get_result(state, config, memo):
+            return _convert_result(await get_value(state, config, memo))
+        return get_result
+
+    def _compile_async_expr(self, expr, memo_keys=frozenset()):
+        """
+        Compiles an expression into a coroutine function.
+        Expressions without function operands reuse the synchronous compiled expression.
+
+        Args:
+            expr (Dict): The expression to compile.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A coroutine function taking ``(state, config, memo)``
+                and returning the evaluation result.
+
+        Raises:
+            ValueError: If the expression is not a dictionary or the operation is unsupported.
+        """
+        if not _has_function_operand(expr):
+            return _to_async(self._compile_expr(expr, memo_keys))
+
+        for op, args in expr.items():
+            if op == "and":
+                children = tuple(self._compile_async_expr(sub_expr, memo_keys) for sub_expr in args)
+
+                async def evaluate_and(state, config, memo):
+                    for child in children:
+                        if not await child(state, config, memo):
+                            return False
+                    return True
+                return evaluate_and
+            if op == "or":
+                children = tuple(self._compile_async_expr(sub_expr, memo_keys) for sub_expr in args)
+
+                async def evaluate_or(state, config, memo):
+                    for child in children:
+                        if await child(state, config, memo):
+                            return True
+                    return False
+                return evaluate_or
+            if op == "not":
+                child = self._compile_async_expr(args, memo_keys)
+
+                async def evaluate_not(state, config, memo):
+                    return not await child(state, config, memo)
+                return evaluate_not
+            if op in COMPARISON_OPERATORS:
+                compare = COMPARISON_OPERATORS[op]
+                left_item, right_item = args
+                get_left = self._compile_async_operand(left_item, memo_keys)
+                get_right = self._compile_async_operand(right_item, memo_keys)
+
+                async def evaluate(state, config, memo):
+                    left_value, right_value = await _gather(
+                        [get_left(state, config, memo), get_right(state, config, memo)]
                         )
-                args = item.get("args", {})
-                return self.evaluate_functions[func_name](state, config, **args)
+                    return compare(left_value, right_value)
+                return evaluate
+
+            raise ValueError(f"Unsupported operation: {op}")
+
+        return _to_async(lambda state, config, memo: None)
+
+    def _compile_async_operand(self, item, memo_keys=frozenset()):
+        """
+        Compiles an operand into a coroutine function returning its value.
+
+        Args:
+            item: The operand to compile.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A coroutine function taking ``(state, config, memo)``
+                and returning the operand value.
+        """
+        if isinstance(item, dict) and item.get("type") == "function":
+            return self._compile_async_function(item["name"], item.get("args", {}), memo_keys)
+        return _to_async(self._compile_operand(item, memo_keys))
+
+    def _compile_async_function(self, func_name, args, memo_keys=frozenset()):
+        """
+        Compiles a function operand for asynchronous evaluation.
+        Coroutine functions are awaited, and synchronous functions are run in a thread pool.
+        Memoized operands store a task in the memo, so concurrent evaluations share one call.
+
+        Args:
+            func_name (str): The name of the evaluation function.
+            args (Dict): Keyword arguments passed to the evaluation function.
+            memo_keys (FrozenSet, optional): The keys of the function operands
+                memoized within a call. Defaults to an empty set.
+
+        Returns:
+            callable: A coroutine function taking ``(state, config, memo)``
+                and returning the function result.
+        """
+        evaluate_functions = self.evaluate_functions
+
+        async def call(state, config):
+            function = _lookup_function(evaluate_functions, func_name)
+            if _is_async_callable(function):
+                return await function(state, config, **args)
+            return await asyncio.to_thread(function, state, config, **args)
+
+        counted = self.metrics is not None
+        key = _function_key(func_name, args)
+        if key is None or key not in memo_keys:
+            async def call_once(state, config, memo):
+                if counted:
+                    memo[_CALLS] += 1
+                return await call(state, config)
+            return call_once
+
+        async def call_memoized(state, config, memo):
+            task = memo.get(key)
+            if task is None:
+                if counted:
+                    memo[_CALLS] += 1
+                task = memo[key] = asyncio.ensure_future(call(state, config))
+            return await task
+        return call_memoized
+
+async def _gather(awaitables):
+    """
+    Runs awaitables concurrently and returns their results in order.
+    If one raises, the others are cancelled and awaited before the exception is re-raised,
+    so that no evaluation keeps running after the call has failed.
+
+    Args:
+        awaitables (List[Awaitable]): The awaitables to run.
+
+    Returns:
+        List: The results.
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+def _compile_and(children):
+    """
+    Combines compiled sub-expressions with a short-circuiting logical AND.
+
+    Args:
+        children (List[callable]): The compiled sub-expressions.
+
+    Returns:
+        callable: A function taking ``(state, config, memo)`` and returning a bool.
+    """
+    children = tuple(children)
+
+    def evaluate(state, config, memo):
+        for child in children:
+            if not child(state, config, memo):
+                return False
+        return True
+    return evaluate
+
+def _compile_or(children):
+    """
+    Combines compiled sub-expressions with a short-circuiting logical OR.
+
+    Args:
+        children (List[callable]): The compiled sub-expressions.
+
+    Returns:
+        callable: A function taking ``(state, config, memo)`` and returning a bool.
+    """
+    children = tuple(children)
+
+    def evaluate(state, config, memo):
+        for child in children:
+            if child(state, config, memo):
+                return True
+        return False
+    return evaluate
+
+class _AdaptiveJunction:
+    """
+    A compiled ``and`` or ``or`` that reorders its children from observed statistics.
+
+    Children are split into runs of consecutive pure children; impure children
+    form runs of their own, so they are always evaluated in declaration order
+    relative to the other runs. Every ADAPTIVE_INTERVAL evaluations, the children of
+    each run are sorted by their mean cost divided by the rate at which they decide
+    the result, and the statistics are halved so that the ordering follows drift.
+
+    Reordering assumes that pure children return the same result in any order.
+    If a reordered run raises, e.g. because it relied on an earlier child as a guard,
+    the run is evaluated again in declaration order, which either returns
+    the declared result or raises the declared exception.
+
+    Statistics are updated without locking: concurrent updates may be lost,
+    which only affects the ordering, never the result.
+    """
+    def __init__(self, children, pure, short_circuit):
+        """
+        Initializes the junction.
+
+        Args:
+            children (List[callable]): The compiled children.
+            pure (List[bool]): Whether each child is side-effect free.
+            short_circuit (bool): The child result that decides the junction:
+                False for ``and``, True for ``or``.
+        """
+        self.children = tuple(children)
+        self.short_circuit = short_circuit
+        self.runs = _pure_runs(pure)
+        self.orders = list(self.runs)
+        self.costs = [0.0] * len(children)
+        self.calls = [0.0] * len(children)
+        self.decisions = [0.0] * len(children)
+        self.evaluations = 0
+
+    def __call__(self, state, config, memo):
+        short_circuit = self.short_circuit
+        orders = self.orders
+        for run, order in zip(self.runs, orders):
+            try:
+                decided = self._evaluate_measured(order, state, config, memo)
+            except Exception:
+                if order == run:
+                    raise
+                decided = self._evaluate(run, state, config, memo)
+            if decided:
+                result = short_circuit
+                break
+        else:
+            result = not short_circuit
+
+        self.evaluations += 1
+        if self.evaluations >= ADAPTIVE_INTERVAL:
+            self.evaluations = 0
+            self._reorder()
+        return result
+
+    def _evaluate(self, order, state, config, memo):
+        """
+        Evaluates children in order, returning True if one of them decided the result.
+        """
+        short_circuit = self.short_circuit
+        children = self.children
+        for index in order:
+            if bool(children[index](state, config, memo)) is short_circuit:
+                return True
+        return False
+
+    def _evaluate_measured(self, order, state, config, memo):
+        """
+        Evaluates children in order like _evaluate, recording their cost and decisions.
+        """
+        short_circuit = self.short_circuit
+        children = self.children
+        costs = self.costs
+        calls = self.calls
+        for index in order:
+            start = time.perf_counter()
+            value = children[index](state, config, memo)
+            costs[index] += time.perf_counter() - start
+            calls[index] += 1
+            if bool(value) is short_circuit:
+                self.decisions[index] += 1
+                return True
+        return False
+
+    def _reorder(self):
+        """
+        Sorts the children of each run by cost per decision and halves the statistics.
+        Children that were never evaluated are tried first, so that they get measured.
+        """
+        def score(index):
+            calls = self.calls[index]
+            if not calls:
+                return 0.0
+            if not self.decisions[index]:
+                return math.inf
+            return self.costs[index] / self.decisions[index]
+
+        self.orders = [tuple(sorted(run, key=score)) for run in self.runs]
+        for stats in (self.costs, self.calls, self.decisions):
+            for index, value in enumerate(stats):
+                stats[index] = value / 2
+
+def _pure_runs(pure):
+    """
+    Splits child indexes into runs of consecutive pure children.
+    Each impure child forms a run of its own.
+
+    Args:
+        pure (List[bool]): Whether each child is side-effect free.
+
+    Returns:
+        List[Tuple[int, ...]]: The runs, in declaration order.
+    """
+    runs = []
+    current = []
+    for index, is_pure in enumerate(pure):
+        if is_pure:
+            current.append(index)
+            continue
+        if current:
+            runs.append(tuple(current))
+            current = []
+        runs.append((index,))
+    if current:
+        runs.append(tuple(current))
+    return runs
+
+def _constant(value):
+    """
+    Creates a callable that ignores the state and configuration and returns a constant.
+
+    Args:
+        value: The constant to return.
 
-            raise ValueError(f"Unsupported type: {item['type']}")
+    Returns:
+        callable: A function taking ``(state, config, memo)`` and returning value.
+    """
+    return lambda state, config, memo: value
+
+def _compile_concat(getters):
+    """
+    Combines result getters into one getter returning their concatenated results.
+
+    Args:
+        getters (List[callable]): The result getters.
+
+    Returns:
+        callable: A function taking ``(state, config, memo)`` and returning a list.
+    """
+    def get_result(state, config, memo):
+        results = []
+        for getter in getters:
+            results.extend(getter(state, config, memo))
+        return results
+    return get_result
+
+def _record_match(branch, indexes):
+    """
+    Wraps a compiled branch so that the indexes of its conditions are recorded
+    in the memo when it matches.
+
+    Args:
+        branch (callable): A function taking ``(state, config, memo)`` and returning
+            results, or None when it does not match.
+        indexes (Iterable[int]): The indexes of the conditions of the branch.
+
+    Returns:
+        callable: The wrapped branch.
+    """
+    indexes = tuple(indexes)
+
+    def recorded(state, config, memo):
+        results = branch(state, config, memo)
+        if results is not None:
+            memo[_MATCHED].extend(indexes)
+        return results
+    return recorded
+
+def _record_async_match(branch, indexes):
+    """
+    Wraps a compiled asynchronous branch so that the indexes of its conditions
+    are recorded in the memo when it matches.
+
+    Args:
+        branch (callable): A coroutine function taking ``(state, config, memo)``
+            and returning results, or None when it does not match.
+        indexes (Iterable[int]): The indexes of the conditions of the branch.
+
+    Returns:
+        callable: The wrapped branch.
+    """
+    indexes = tuple(indexes)
+
+    async def recorded(state, config, memo):
+        results = await branch(state, config, memo)
+        if results is not None:
+            memo[_MATCHED].extend(indexes)
+        return results
+    return recorded
+
+def _expression_indexes(conditions):
+    """
+    Returns the indexes of the expression conditions, which are the cases of
+    a detected switch in order.
+
+    Args:
+        conditions (List[Dict]): The conditions.
+
+    Returns:
+        List[int]: The indexes of the conditions with an expression.
+    """
+    return [index for index, condition in enumerate(conditions) if "expression" in condition]
+
+def _is_async_callable(function):
+    """
+    Checks whether a function, or the __call__ method of an object, is a coroutine function.
+
+    Args:
+        function: The object to check.
+
+    Returns:
+        bool: True if calling the object returns a coroutine.
+    """
+    return (
+        inspect.iscoroutinefunction(function)
+        or inspect.iscoroutinefunction(getattr(function, "__call__", None))
+    )
+
+def _lookup_function(evaluate_functions, func_name):
+    """
+    Looks up an evaluation function by name.
+
+    Args:
+        evaluate_functions (Dict[str, callable]): A dictionary of evaluation functions.
+        func_name (str): The name of the evaluation function.
+
+    Returns:
+        callable: The evaluation function.
+
+    Raises:
+        ValueError: If the function is not registered.
+    """
+    if func_name not in evaluate_functions:
+        raise ValueError(
+            f"The function {func_name} cannot be found in evaluate_functions."
+            )
+    return evaluate_functions[func_name]
+
+def _run_sync(awaitable, func_name):
+    """
+    Runs the awaitable returned by a coroutine evaluation function from synchronous code.
+
+    Args:
+        awaitable (Awaitable): The awaitable to run.
+        func_name (str): The name of the evaluation function, used in the error message.
+
+    Returns:
+        Any: The result of the awaitable.
+
+    Raises:
+        RuntimeError: If an event loop is already running in this thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_await(awaitable))
+
+    if inspect.iscoroutine(awaitable):
+        awaitable.close()
+    raise RuntimeError(
+        f"The coroutine function {func_name} cannot be evaluated synchronously "
+        "while an event loop is running. Use the asynchronous API instead."
+        )
+
+async def _await(awaitable):
+    """
+    Awaits an awaitable, so that any awaitable can be passed to asyncio.run.
+    """
+    return await awaitable
+
+def _to_async(function):
+    """
+    Wraps a compiled synchronous callable into a coroutine function.
+
+    Args:
+        function (callable): A function taking ``(state, config, memo)``.
+
+    Returns:
+        callable: A coroutine function taking ``(state, config, memo)``.
+    """
+    async def evaluate(state, config, memo):
+        return function(state, config, memo)
+    return evaluate
+
+def _compile_async_concat(getters):
+    """
+    Combines asynchronous result getters into one getter returning their concatenated results.
+
+    Args:
+        getters (List[callable]): The asynchronous result getters.
+
+    Returns:
+        callable: A coroutine function taking ``(state, config, memo)`` and returning a list.
+    """
+    async def get_result(state, config, memo):
+        results = []
+        for getter in getters:
+            results.extend(await getter(state, config, memo))
+        return results
+    return get_result
+
+def _has_function_operand(value):
+    """
+    Checks whether a condition, expression or result contains a function operand.
+
+    Args:
+        value: The value to inspect.
+
+    Returns:
+        bool: True if a function operand is found.
+    """
+    return any(operand.get("type") == "function" for operand in _iter_operands(value))
+
+def _group_cases(cases, match):
+    """
+    Groups the results of switch cases by value, in declaration order.
+
+    Args:
+        cases (List[Tuple[Any, Any]]): Pairs of case values and results.
+        match (str): The match mode. In "first" mode, only the first result of each value is kept.
+
+    Returns:
+        Dict[Any, List]: The results of each value.
+    """
+    grouped = {}
+    for value, result in cases:
+        grouped.setdefault(value, []).append(result)
+    if match == "first":
+        return {value: results[:1] for value, results in grouped.items()}
+    return grouped
+
+def _function_key(func_name, args):
+    """
+    Computes the memo key of a function operand.
+
+    Args:
+        func_name (str): The name of the evaluation function.
+        args (Dict): Keyword arguments passed to the evaluation function.
+
+    Returns:
+        Optional[Tuple]: The memo key, or None if the arguments cannot be frozen.
+    """
+    try:
+        return (func_name, freeze(args or {}))
+    except TypeError:
+        return None
+
+def _iter_operands(value):
+    """
+    Yields every operand dictionary found in a condition, expression or result.
+
+    Args:
+        value: The value to inspect.
+
+    Yields:
+        Dict: The operand dictionaries.
+    """
+    if isinstance(value, dict):
+        if "type" in value and "name" in value:
+            yield value
+            return
+        for item in value.values():
+            yield from _iter_operands(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_operands(item)
+
+def _repeated_function_keys(conditions, impure_functions):
+    """
+    Finds the function operands that appear more than once in the conditions
+    and can be memoized.
+
+    Args:
+        conditions (List[Dict]): The conditions to inspect.
+        impure_functions (FrozenSet[str]): Names of functions that must not be memoized.
+
+    Returns:
+        FrozenSet[Tuple]: The memo keys of the repeated function operands.
+    """
+    seen = set()
+    repeated = set()
+    for operand in _iter_operands(conditions):
+        if operand.get("type") != "function" or operand["name"] in impure_functions:
+            continue
+        key = _function_key(operand["name"], operand.get("args", {}))
+        if key is None:
+            continue
+        if key in seen:
+            repeated.add(key)
+        seen.add(key)
+    return frozenset(repeated)
+
+def _read_set(conditions, function_dependencies, impure_functions):
+    """
+    Computes the state keys and config values that the conditions depend on.
+
+    Args:
+        conditions (List[Dict]): The conditions to inspect.
+        function_dependencies (Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]):
+            The state keys and config values read by evaluation functions, by name.
+        impure_functions (FrozenSet[str]): Names of impure evaluation functions.
+
+    Returns:
+        Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]: The sorted state keys and
+            config values, or None if a function operand calls an impure evaluation
+            function or one without declared dependencies.
+    """
+    state_keys = set()
+    config_keys = set()
+    for operand in _iter_operands(conditions):
+        operand_type = operand.get("type")
+        if operand_type == "state_value":
+            state_keys.add(operand["name"])
+        elif operand_type == "config_value":
+            config_keys.add(operand["name"])
+        elif operand_type == "function":
+            func_name = operand["name"]
+            if func_name in impure_functions or func_name not in function_dependencies:
+                return None
+            function_state_keys, function_config_keys = function_dependencies[func_name]
+            state_keys.update(function_state_keys)
+            config_keys.update(function_config_keys)
+        else:
+            return None
+    return tuple(sorted(state_keys)), tuple(sorted(config_keys))
+
+def _detect_switch(conditions, impure_functions=frozenset()):
+    """
+    Detects conditions that all compare the same operand for equality against
+    hashable constants, so that they can be compiled into a switch.
+    Operands calling impure functions are not detected, since a switch
+    evaluates its operand only once.
+
+    Args:
+        conditions (List[Dict]): The conditions to inspect.
+        impure_functions (FrozenSet[str], optional): Names of impure evaluation functions.
+
+    Returns:
+        Optional[Tuple[Dict, List[Tuple[Any, Any]]]]: The shared operand and
+            pairs of constants and results, or None if the conditions do not qualify.
+    """
+    operand = None
+    cases = []
+    for condition in conditions:
+        if "switch" in condition:
+            return None
+        if "expression" not in condition:
+            continue
+
+        expression = condition["expression"]
+        if not isinstance(expression, dict) or len(expression) != 1:
+            return None
+        op, args = next(iter(expression.items()))
+        if op not in EQUALITY_OPERATORS or not isinstance(args, list) or len(args) != 2:
+            return None
+
+        left_item, right_item = args
+        if isinstance(left_item, dict) and not isinstance(right_item, dict):
+            item, value = left_item, right_item
+        elif isinstance(right_item, dict) and not isinstance(left_item, dict):
+            item, value = right_item, left_item
+        else:
+            return None
+
+        if item.get("type") not in OPERAND_TYPES or (operand is not None and item != operand):
+            return None
+        if item["type"] == "function" and item.get("name") in impure_functions:
+            return None
+        try:
+            hash(value)
+        except TypeError:
+            return None
+        if value != value: # NaN never compares equal, but would be found by identity.
+            return None
+
+        operand = item
+        cases.append((value, condition["result"]))
+
+    if operand is None:
+        return None
+    return operand, cases
+
+def _convert_result(result_value):
+    """
+    Converts a result value into a list of next nodes, converting keys if necessary.
+
+    Args:
+        result_value: The result value to convert.
+
+    Returns:
+        List: The converted result values.
+    """
+    if isinstance(result_value, List):
+        return [convert_key(wk) if isinstance(wk, str) else wk for wk in result_value]
 
-        return item
+    return [convert_key(result_value) if isinstance(result_value, str) else result_value]
 
 def compare_values(op,left_value,right_value):
     """
@@ -192,27 +1722,7 @@ def compare_values(op,left_value,right_value):
     Raises:
     ValueError: If the operator is unsupported.
     """
-    comparison_operations = {
-        "==": lambda x, y: x == y,
-        "equals": lambda x, y: x == y,
-        "eq": lambda x, y: x == y,
-        "!=": lambda x, y: x != y,
-        "not_equals": lambda x, y: x != y,
-        "neq": lambda x, y: x != y,
-        ">": lambda x, y: x > y,
-        "greater_than": lambda x, y: x > y,
-        "gt": lambda x, y: x > y,
-        ">=": lambda x, y: x >= y,
-        "greater_than_or_equals": lambda x, y: x >= y,
-        "gte": lambda x, y: x >= y,
-        "<": lambda x, y: x < y,
-        "less_than": lambda x, y: x < y,
-        "lt": lambda x, y: x < y,
-        "<=": lambda x, y: x <= y,
-        "less_than_or_equals": lambda x, y: x <= y,
-        "lte": lambda x, y: x <= y
-    }
-    if op in comparison_operations:
-        return comparison_operations[op](left_value,right_value)
+    if op in COMPARISON_OPERATORS:
+        return COMPARISON_OPERATORS[op](left_value,right_value)
 
     raise ValueError(f"Unsupported comparison operator: {op}")
@@ -0,0 +1,516 @@
+"""
+This module provides a BuildReport class that records the wall time of
+the phases of building a state graph with StateGraphBuilder, a
+RoutingMetrics class that collects statistics of the routing decisions
+made by configurable conditional edges, and a NodeMetrics class that
+collects statistics of the calls of nodes and sub-state graphs.
+"""
+import abc
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BUILD_PHASES = (
+    "validate", "specialize", "analyze", "gen_state",
+    "node_factory", "gen_stategraph", "compile", "build",
+)
+
+class BuildReport:
+    """
+    BuildReport records the wall time of each build phase and of each flow.
+
+    Each record is a dictionary with the keys:
+        phase (str): One of BUILD_PHASES.
+        path (Tuple[str, ...]): The names of the state graphs enclosing the timed step,
+            from the root state graph.
+        name (str): The name of the node or state graph the step belongs to.
+        seconds (float): The wall time of the step.
+    Records may carry extra keys, e.g. `factory` for node_factory records
+    and `cached` for build records.
+
+    Records are appended in the order the steps finish, so nested steps are recorded
+    before the steps enclosing them. It is safe to record from several threads.
+
+    Attributes:
+        records (List[Dict]): The recorded steps.
+        hook (Optional[Callable[[Dict], None]]): Called with each record as it is added.
+    """
+    def __init__(self, hook: Optional[Callable[[Dict], None]] = None):
+        """
+        Initializes the BuildReport.
+
+        Args:
+            hook (Optional[Callable[[Dict], None]], optional):
+                Called with each record as it is added. It may be called from
+                worker threads when node factories run concurrently. Defaults to None.
+        """
+        self.records: List[Dict] = []
+        self.hook = hook
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, path: Tuple[str, ...], name: str, seconds: float, **extra: Any):
+        """
+        Adds a record.
+
+        Args:
+            phase (str): The build phase.
+            path (Tuple[str, ...]): The names of the enclosing state graphs.
+            name (str): The name of the node or state graph.
+            seconds (float): The wall time.
+            **extra (Any): Additional keys stored in the record.
+        """
+        entry = {"phase": phase, "path": tuple(path), "name": name, "seconds": seconds, **extra}
+        with self._lock:
+            self.records.append(entry)
+        if self.hook is not None:
+            self.hook(entry)
+
+    @contextmanager
+    def time(self, phase: str, path: Tuple[str, ...], name: str, **extra: Any):
+        """
+        Records the wall time of the enclosed block, including when it raises.
+
+        Args:
+            phase (str): The build phase.
+            path (Tuple[str, ...]): The names of the enclosing state graphs.
+            name (str): The name of the node or state graph.
+            **extra (Any): Additional keys stored in the record.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, path, name, time.perf_counter() - start, **extra)
+
+    def filter(self, phase: Optional[str] = None, path: Optional[Tuple[str, ...]] = None) -> List[Dict]:
+        """
+        Returns the records of a phase and/or of the state graphs under a path.
+
+        Args:
+            phase (Optional[str], optional): The build phase. Defaults to all phases.
+            path (Optional[Tuple[str, ...]], optional): A path prefix. Defaults to all paths.
+
+        Returns:
+            List[Dict]: The matching records.
+        """
+        with self._lock:
+            records = list(self.records)
+        if phase is not None:
+            records = [entry for entry in records if entry["phase"] == phase]
+        if path is not None:
+            path = tuple(path)
+            records = [entry for entry in records if entry["path"][:len(path)] == path]
+        return records
+
+    def totals(self) -> Dict[str, float]:
+        """
+        Returns the total wall time of each phase.
+        Nested gen_stategraph and compile steps are included in the steps enclosing them,
+        so the totals of different phases overlap.
+
+        Returns:
+            Dict[str, float]: The total seconds keyed by phase.
+        """
+        totals = {}
+        for entry in self.filter():
+            totals[entry["phase"]] = totals.get(entry["phase"], 0.0) + entry["seconds"]
+        return totals
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the report as a JSON serializable dictionary.
+
+        Returns:
+            Dict: The records, with paths as lists, and the totals.
+        """
+        return {
+            "records": [{**entry, "path": list(entry["path"])} for entry in self.filter()],
+            "totals": self.totals(),
+        }
+
+    def clear(self):
+        """
+        Removes all records.
+        """
+        with self._lock:
+            self.records.clear()
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+"""The default upper bounds, in seconds, of the latency histogram buckets."""
+
+class MetricsExporter(abc.ABC):
+    """
+    MetricsExporter is the interface for sending the snapshots of RoutingMetrics
+    and NodeMetrics elsewhere, e.g. to a monitoring system. Subclasses implement export.
+    """
+    @abc.abstractmethod
+    def export(self, snapshot: Dict[str, Dict]):
+        """
+        Exports a snapshot of metrics.
+
+        Args:
+            snapshot (Dict[str, Dict]): The output of the snapshot method of the metrics.
+        """
+
+RoutingMetricsExporter = MetricsExporter
+"""The exporter interface of RoutingMetrics, an alias of MetricsExporter."""
+
+NodeMetricsExporter = MetricsExporter
+"""The exporter interface of NodeMetrics, an alias of MetricsExporter."""
+
+class _LatencyMetrics(abc.ABC):
+    """
+    The latency histograms and the export shared by RoutingMetrics and NodeMetrics.
+    Subclasses keep the statistics of each edge or node in _stats, guarded by _lock.
+    """
+    def __init__(self, buckets: Tuple[float, ...], exporter: Optional[MetricsExporter]):
+        """
+        Checks the buckets and initializes the shared attributes.
+
+        Raises:
+            ValueError: If buckets is empty or not sorted in increasing order.
+        """
+        buckets = tuple(buckets)
+        if not buckets or any(low >= high for low, high in zip(buckets, buckets[1:])):
+            raise ValueError(f"buckets must be non-empty and increasing: {buckets}")
+
+        self.buckets = buckets
+        self.exporter = exporter
+        self._stats: Dict[Any, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _new_latency(self) -> Dict:
+        """
+        Returns the empty latency statistics of an edge or node.
+        """
+        return {"latency_counts": [0] * (len(self.buckets) + 1), "latency_sum": 0.0}
+
+    def _add_latency(self, stats: Dict, seconds: float):
+        """
+        Adds a latency to the statistics of an edge or node. Called with _lock held.
+        """
+        stats["latency_counts"][bisect.bisect_left(self.buckets, seconds)] += 1
+        stats["latency_sum"] += seconds
+
+    def _latency(self, stats: Dict, count: int) -> Dict:
+        """
+        Returns the latency histogram of the statistics of an edge or node, for snapshot.
+        """
+        return {
+            "buckets": list(self.buckets),
+            "counts": list(stats["latency_counts"]),
+            "sum": stats["latency_sum"],
+            "count": count,
+        }
+
+    @abc.abstractmethod
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Returns a copy of the collected metrics.
+        """
+
+    def export(self, exporter: Optional[MetricsExporter] = None):
+        """
+        Exports a snapshot of the collected metrics.
+
+        Args:
+            exporter (Optional[MetricsExporter], optional):
+                The exporter to use. Defaults to the exporter given at construction.
+
+        Raises:
+            ValueError: If no exporter is given.
+        """
+        exporter = exporter if exporter is not None else self.exporter
+        if exporter is None:
+            raise ValueError("No exporter was provided.")
+        exporter.export(self.snapshot())
+
+    def reset(self):
+        """
+        Removes all collected metrics.
+        """
+        with self._lock:
+            self._stats.clear()
+
+class RoutingMetrics(_LatencyMetrics):
+    """
+    RoutingMetrics collects statistics of routing decisions in memory.
+    It is safe to share between threads and between handlers.
+
+    For each edge it counts the decisions, the matches of each condition index,
+    the decisions that fell back to the default, the evaluation function calls
+    and the errors, and it keeps a histogram of the decision latency.
+
+    Attributes:
+        buckets (Tuple[float, ...]): The upper bounds of the latency histogram buckets,
+            in seconds. Latencies above the last bound fall into an overflow bucket.
+        exporter (Optional[MetricsExporter]): The exporter used by export by default.
+    """
+    def __init__(
+        self,
+        buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+        exporter: Optional[MetricsExporter] = None,
+        ):
+        """
+        Initializes the RoutingMetrics.
+
+        Args:
+            buckets (Tuple[float, ...], optional): The upper bounds of the latency
+                histogram buckets, in seconds. Defaults to DEFAULT_LATENCY_BUCKETS.
+            exporter (Optional[MetricsExporter], optional):
+                The exporter used by export by default. Defaults to None.
+
+        Raises:
+            ValueError: If buckets is empty or not sorted in increasing order.
+        """
+        super().__init__(buckets, exporter)
+
+    def record(
+        self,
+        edge: str,
+        matched: List[int],
+        default_taken: bool,
+        function_calls: int,
+        seconds: float,
+        error: bool = False,
+        ):
+        """
+        Records one routing decision.
+
+        Args:
+            edge (str): The name of the edge.
+            matched (List[int]): The indexes of the conditions that matched.
+            default_taken (bool): True if no condition matched and the default was used.
+            function_calls (int): The number of evaluation function calls.
+            seconds (float): The wall time of the decision.
+            error (bool, optional): True if the decision raised an exception. Defaults to False.
+        """
+        with self._lock:
+            stats = self._stats.get(edge)
+            if stats is None:
+                stats = self._stats[edge] = {
+                    "decisions": 0,
+                    "matches": {},
+                    "default_taken": 0,
+                    "function_calls": 0,
+                    "errors": 0,
+                    **self._new_latency(),
+                }
+            stats["decisions"] += 1
+            matches = stats["matches"]
+            for index in matched:
+                matches[index] = matches.get(index, 0) + 1
+            stats["default_taken"] += default_taken
+            stats["function_calls"] += function_calls
+            stats["errors"] += error
+            self._add_latency(stats, seconds)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Returns a copy of the collected metrics.
+
+        Returns:
+            Dict[str, Dict]: The metrics keyed by edge name. Each entry holds
+                decisions, matches (keyed by condition index), default_taken,
+                function_calls, errors and latency (buckets, counts, sum and count).
+                counts has one more item than buckets, for the overflow bucket.
+        """
+        with self._lock:
+            return {
+                edge: {
+                    "decisions": stats["decisions"],
+                    "matches": dict(sorted(stats["matches"].items())),
+                    "default_taken": stats["default_taken"],
+                    "function_calls": stats["function_calls"],
+                    "errors": stats["errors"],
+                    "latency": self._latency(stats, stats["decisions"]),
+                }
+                for edge, stats in self._stats.items()
+            }
+
+def output_size(output: Any) -> Optional[int]:
+    """
+    Measures a node output by its number of items, e.g. the number of state keys it updates.
+
+    Args:
+        output (Any): The node output.
+
+    Returns:
+        Optional[int]: The length of the output, or None if it has no length.
+    """
+    try:
+        return len(output)
+    except TypeError:
+        return None
+
+class NodeMetrics(_LatencyMetrics):
+    """
+    NodeMetrics collects statistics of node calls in memory.
+    It is safe to share between threads and between graphs.
+
+    For each node it counts the calls and the exceptions by type, keeps a histogram
+    of the call latency, and sums the sizes of the outputs. Exceptions LangGraph uses
+    for control flow, such as interrupts, are counted as interrupts, not as exceptions.
+
+    Attributes:
+        buckets (Tuple[float, ...]): The upper bounds of the latency histogram buckets,
+            in seconds. Latencies above the last bound fall into an overflow bucket.
+        sizer (Callable[[Any], Optional[int]]): Returns the size of a node output,
+            or None if it has no size.
+        exporter (Optional[MetricsExporter]): The exporter used by export by default.
+    """
+    def __init__(
+        self,
+        buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+        sizer: Callable[[Any], Optional[int]] = output_size,
+        exporter: Optional[MetricsExporter] = None,
+        ):
+        """
+        Initializes the NodeMetrics.
+
+        Args:
+            buckets (Tuple[float, ...], optional): The upper bounds of the latency
+                histogram buckets, in seconds. Defaults to DEFAULT_LATENCY_BUCKETS.
+            sizer (Callable[[Any], Optional[int]], optional): Returns the size of
+                a node output. Defaults to output_size.
+            exporter (Optional[MetricsExporter], optional):
+                The exporter used by export by default. Defaults to None.
+
+        Raises:
+            ValueError: If buckets is empty or not sorted in increasing order.
+        """
+        super().__init__(buckets, exporter)
+        self.sizer = sizer
+
+    def record(
+        self,
+        graph: str,
+        node: str,
+        seconds: float,
+        exception: Optional[str] = None,
+        size: Optional[int] = None,
+        interrupted: bool = False,
+        ):
+        """
+        Records one node call.
+
+        Args:
+            graph (str): The name of the state graph, with the names of its enclosing
+                state graphs separated by `/`.
+            node (str): The name of the node.
+            seconds (float): The wall time of the call.
+            exception (Optional[str], optional): The type name of the exception raised
+                by the call, if any. Defaults to None.
+            size (Optional[int], optional): The size of the output, if measured. Defaults to None.
+            interrupted (bool, optional): True if the call was interrupted. Defaults to False.
+        """
+        with self._lock:
+            stats = self._stats.get((graph, node))
+            if stats is None:
+                stats = self._stats[(graph, node)] = {
+                    "calls": 0,
+                    "exceptions": {},
+                    "interrupts": 0,
+                    **self._new_latency(),
+                    "output_size_sum": 0,
+                    "output_size_count": 0,
+                    "output_size_max": 0,
+                }
+            stats["calls"] += 1
+            if exception is not None:
+                exceptions = stats["exceptions"]
+                exceptions[exception] = exceptions.get(exception, 0) + 1
+            stats["interrupts"] += interrupted
+            self._add_latency(stats, seconds)
+            if size is not None:
+                stats["output_size_sum"] += size
+                stats["output_size_count"] += 1
+                stats["output_size_max"] = max(stats["output_size_max"], size)
+
+    def wrap(self, node: Any, graph: str, name: str) -> Any:
+        """
+        Wraps a node, or a compiled sub-state graph, so that its calls are recorded.
+        The config is passed through, so that streaming, sub-state graphs and
+        the parameters LangGraph injects into nodes keep working.
+
+        Args:
+            node (Any): The node. It may be a function, a coroutine function or a runnable,
+                and may take the config, runtime, store or writer.
+            graph (str): The name of the state graph the node belongs to.
+            name (str): The name of the node.
+
+        Returns:
+            RunnableLambda: The node with sync and async entry points recording each call.
+        """
+        from langchain_core.runnables import RunnableLambda
+        from langgraph.errors import GraphBubbleUp
+        from kenkenpa.common import node_runnable
+
+        runnable = node_runnable(node, name)
+
+        def finish(start, output, error):
+            seconds = time.perf_counter() - start
+            if error is None:
+                self.record(graph, name, seconds, size=self.sizer(output))
+            elif isinstance(error, GraphBubbleUp):
+                self.record(graph, name, seconds, interrupted=True)
+            else:
+                self.record(graph, name, seconds, exception=type(error).__name__)
+
+        def call(state, config):
+            start = time.perf_counter()
+            try:
+                output = runnable.invoke(state, config)
+            except BaseException as e:
+                finish(start, None, e)
+                raise
+            finish(start, output, None)
+            return output
+
+        async def acall(state, config):
+            start = time.perf_counter()
+            try:
+                output = await runnable.ainvoke(state, config)
+            except BaseException as e:
+                finish(start, None, e)
+                raise
+            finish(start, output, None)
+            return output
+
+        return RunnableLambda(call, afunc=acall, name=name)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Returns a copy of the collected metrics.
+
+        Returns:
+            Dict[str, Dict]: The metrics keyed by `graph/node`. Each entry holds graph, node,
+                calls, exceptions (keyed by type name), errors (the number of exceptions),
+                interrupts, latency (buckets, counts, sum and count) and output_size
+                (sum, count and max). counts has one more item than buckets,
+                for the overflow bucket.
+        """
+        with self._lock:
+            return {
+                f"{graph}/{node}": {
+                    "graph": graph,
+                    "node": node,
+                    "calls": stats["calls"],
+                    "exceptions": dict(sorted(stats["exceptions"].items())),
+                    "errors": sum(stats["exceptions"].values()),
+                    "interrupts": stats["interrupts"],
+                    "latency": self._latency(stats, stats["calls"]),
+                    "output_size": {
+                        "sum": stats["output_size_sum"],
+                        "count": stats["output_size_count"],
+                        "max": stats["output_size_max"],
+                    },
+                }
+                for (graph, node), stats in self._stats.items()
+            }
+
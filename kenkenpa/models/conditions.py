@@ -2,7 +2,7 @@
 This module defines data models for various types of operands,
 expressions, and conditions using Pydantic for validation.
 It includes models for operand functions, state values,
-config values, scalar values, logical expressions, and conditions.
+config values, scalar values, logical expressions, switches, and conditions.
 """
 from typing import List, Union, Dict, Any, Optional
 from pydantic import BaseModel, Field, ConfigDict
@@ -170,16 +170,48 @@ class KConditionDefaultV1(BaseModel):
 
 KConditionDefault = Union[KConditionDefaultV1]
 
+class KSwitchCaseV1(BaseModel):
+    """
+    KSwitchCaseV1 represents a case of a switch condition.
+
+    Attributes:
+        value (KOperandScalar): The value compared with the switch operand.
+        result (Union[KConcitionResult,KConcitionResultList]):
+            The result when the switch operand equals value.
+    """
+    value: KOperandScalar
+    result: Union[KConcitionResult,KConcitionResultList]
+
+    model_config = ConfigDict(extra='forbid')
+
+KSwitchCase = Union[KSwitchCaseV1]
+
+class KConditionSwitchV1(BaseModel):
+    """
+    KConditionSwitchV1 represents a switch condition,
+    which selects the result of the case whose value equals the operand.
+
+    Attributes:
+        switch (Union[KOperandFunction,KOperandStateValue,KOperandConfigValue]):
+            The operand whose value selects the case.
+        cases (List[KSwitchCase]): The cases of the switch.
+    """
+    switch: Union[KOperandFunction,KOperandStateValue,KOperandConfigValue]
+    cases: List[KSwitchCase]
+
+    model_config = ConfigDict(extra='forbid')
+
+KConditionSwitch = Union[KConditionSwitchV1]
 
 class KConditionsV1(BaseModel):
     """
     KConditionsV1 represents a collection of conditions.
 
     Attributes:
-        conditions (List[Union[KConditionExpression, KConditionDefault]]):
-            A list of condition expressions and default conditions.
+        conditions (List[Union[KConditionExpression, KConditionDefault, KConditionSwitch]]):
+            A list of condition expressions, default conditions and switch conditions.
     """
-    conditions:List[Union[KConditionExpression,KConditionDefault]]
+    conditions:List[Union[KConditionExpression,KConditionDefault,KConditionSwitch]]
 
     model_config = ConfigDict(extra='forbid')
 
@@ -12,11 +12,12 @@ Type Aliases:
     KConditionalEdgeFlowParam: Alias for KConditionalEdgeFlowParamV1.
     KConfigurableConditionalEdge: Alias for KConfigurableConditionalEdgeV1.
 """
-from typing import List, Union, Optional
+from typing import List, Literal, Union, Optional
 from pydantic import BaseModel, ConfigDict
 
 from kenkenpa.models.conditions import KConditionExpression
 from kenkenpa.models.conditions import KConditionDefault
+from kenkenpa.models.conditions import KConditionSwitch
 
 class KConditionalEdgeFlowParamV1(BaseModel):
     """
@@ -25,12 +26,22 @@ class KConditionalEdgeFlowParamV1(BaseModel):
     Attributes:
         start_key (str): The starting key for the edge.
         path_map (Optional[List[str]]): An optional list of path mappings.
-        conditions (List[Union[KConditionExpression, KConditionDefault]]):
+        conditions (List[Union[KConditionExpression, KConditionDefault, KConditionSwitch]]):
             A list of conditions for the edge.
+        match (Literal['all', 'first']): "all" routes to the results of every
+            matching condition, "first" stops at the first matching condition.
+            Defaults to "all".
+        adaptive (bool): True to reorder the side-effect free operands of `and` and `or`
+            from their observed cost and selectivity. Defaults to False.
+        incremental (bool): True to reuse the last result while the state keys and
+            config values the conditions read are unchanged. Defaults to False.
     """
     start_key:str
     path_map:Optional[List[str]] = None
-    conditions:List[Union[KConditionExpression,KConditionDefault]]
+    conditions:List[Union[KConditionExpression,KConditionDefault,KConditionSwitch]]
+    match:Literal['all','first'] = 'all'
+    adaptive:bool = False
+    incremental:bool = False
 
     model_config = ConfigDict(extra='forbid')
 
@@ -41,10 +52,11 @@ class KConfigurableConditionalEdgeV1(BaseModel):
     KConfigurableConditionalEdgeV1 represents a configurable conditional edge in a graph.
 
     Attributes:
-        graph_type (str): The type of the graph.
+        graph_type (Literal['configurable_conditional_edge']):
+            The type of the graph. Fixed to `configurable_conditional_edge`.
         flow_parameter (KConditionalEdgeFlowParam): The flow parameters for the conditional edge.
     """
-    graph_type:str
+    graph_type:Literal['configurable_conditional_edge']
     flow_parameter:KConditionalEdgeFlowParam
 
     model_config = ConfigDict(extra='forbid')
@@ -14,11 +14,12 @@ Type Aliases:
     KConditionalEntryPointFlowParam: Alias for KConditionalEntryPointFlowParamV1.
     KConfigurableConditionalEntryPoint: Alias for KConfigurableConditionalEntryPointV1.
 """
-from typing import List, Union, Optional
+from typing import List, Literal, Union, Optional
 from pydantic import BaseModel, ConfigDict
 
 from kenkenpa.models.conditions import KConditionExpression
 from kenkenpa.models.conditions import KConditionDefault
+from kenkenpa.models.conditions import KConditionSwitch
 
 
 class KConditionalEntryPointFlowParamV1(BaseModel):
@@ -28,11 +29,21 @@ class KConditionalEntryPointFlowParamV1(BaseModel):
 
     Attributes:
         path_map (Optional[List[str]]): An optional list of path mappings.
-        conditions (List[Union[KConditionExpression, KConditionDefault]]):
+        conditions (List[Union[KConditionExpression, KConditionDefault, KConditionSwitch]]):
             A list of conditions for the entry point.
+        match (Literal['all', 'first']): "all" routes to the results of every
+            matching condition, "first" stops at the first matching condition.
+            Defaults to "all".
+        adaptive (bool): True to reorder the side-effect free operands of `and` and `or`
+            from their observed cost and selectivity. Defaults to False.
+        incremental (bool): True to reuse the last result while the state keys and
+            config values the conditions read are unchanged. Defaults to False.
     """
     path_map:Optional[List[str]] = None
-    conditions:List[Union[KConditionExpression,KConditionDefault]]
+    conditions:List[Union[KConditionExpression,KConditionDefault,KConditionSwitch]]
+    match:Literal['all','first'] = 'all'
+    adaptive:bool = False
+    incremental:bool = False
 
     model_config = ConfigDict(extra='forbid')
 
@@ -44,11 +55,12 @@ class KConfigurableConditionalEntryPointV1(BaseModel):
     a configurable conditional entry point in a graph.
 
     Attributes:
-        graph_type (str): The type of the graph.
+        graph_type (Literal['configurable_conditional_entry_point']):
+            The type of the graph. Fixed to `configurable_conditional_entry_point`.
         flow_parameter (KConditionalEntryPointFlowParam):
             The flow parameters for the conditional entry point.
     """
-    graph_type:str
+    graph_type:Literal['configurable_conditional_entry_point']
     flow_parameter:KConditionalEntryPointFlowParam
 
     model_config = ConfigDict(extra='forbid')
@@ -3,7 +3,7 @@ This module defines data models for graph edges using Pydantic for validation.
 It includes models for edge parameters and edges themselves, ensuring that
 certain constraints are met.
 """
-from typing import List, Union
+from typing import List, Literal, Union
 from pydantic import BaseModel, ConfigDict,field_validator
 
 class KEdgeParamV1(BaseModel):
@@ -46,10 +46,10 @@ class KEdgeV1(BaseModel):
     KEdgeV1 represents an edge in a graph, including the type of graph and flow parameters.
 
     Attributes:
-        graph_type (str): The type of the graph.
+        graph_type (Literal['edge']): The type of the graph. Fixed to `edge`.
         flow_parameter (KEdgeParam): The parameters for the edge.
     """
-    graph_type: str
+    graph_type: Literal['edge']
     flow_parameter: KEdgeParam
 
     model_config = ConfigDict(extra='forbid')
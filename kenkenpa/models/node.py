@@ -3,8 +3,63 @@ This module defines data models for graph nodes using Pydantic for validation.
 It includes models for node parameters and nodes themselves, ensuring that
 certain constraints are met.
 """
-from typing import Optional, Union, Dict
-from pydantic import BaseModel, ConfigDict
+from typing import List, Literal, Optional, Union, Dict
+from pydantic import BaseModel, ConfigDict, Field
+
+class KNodeCacheV1(BaseModel):
+    """
+    KNodeCacheV1 represents the output cache settings of a graph node.
+
+    Attributes:
+        keys (List[str]): The state keys whose values form the cache key.
+        ttl (Optional[float]): The number of seconds an output stays cached.
+            None keeps outputs until they are evicted.
+        maxsize (int): The maximum number of cached outputs.
+    """
+    keys:List[str]
+    ttl:Optional[float] = Field(None,gt=0)
+    maxsize:int = Field(128,ge=1)
+
+    model_config = ConfigDict(extra='forbid')
+
+KNodeCache = Union[KNodeCacheV1]
+
+class KNodeRetryV1(BaseModel):
+    """
+    KNodeRetryV1 represents the retry policy of a graph node.
+
+    Attributes:
+        attempts (int): The maximum number of attempts, including the first.
+        backoff (float): The number of seconds before the first retry.
+        backoff_factor (float): The multiplier of the interval after each retry.
+        max_backoff (float): The maximum number of seconds between retries.
+        jitter (bool): Whether to add random jitter to the intervals.
+    """
+    attempts:int = Field(3,ge=1)
+    backoff:float = Field(0.5,ge=0)
+    backoff_factor:float = Field(2.0,ge=1)
+    max_backoff:float = Field(128.0,ge=0)
+    jitter:bool = True
+
+    model_config = ConfigDict(extra='forbid')
+
+KNodeRetry = Union[KNodeRetryV1]
+
+class KNodeBatchV1(BaseModel):
+    """
+    KNodeBatchV1 represents the micro-batching settings of a graph node.
+
+    Attributes:
+        max_size (int): The maximum number of calls coalesced into one batch call.
+        max_wait_ms (float): The maximum number of milliseconds the first call
+            of a batch waits for other calls.
+    """
+    max_size:int = Field(16,ge=1)
+    max_wait_ms:float = Field(10.0,ge=0)
+
+    model_config = ConfigDict(extra='forbid')
+
+KNodeBatch = Union[KNodeBatchV1]
 
 class KNodeParamV1(BaseModel):
     """
@@ -13,9 +68,20 @@ class KNodeParamV1(BaseModel):
     Attributes:
         name (str): The name of the node.
         factory (str): The factory associated with the node.
+        cache (Optional[KNodeCache]): Optional output cache settings of the node.
+        timeout (Optional[float]): The maximum number of seconds of each call of the node.
+        retry (Optional[KNodeRetry]): Optional retry policy of the node.
+        max_concurrency (Optional[int]): The maximum number of concurrent calls of the node,
+            shared by every graph in the process that uses the same node name and factory.
+        batch (Optional[KNodeBatch]): Optional micro-batching settings of the node.
     """
     name:str
     factory:str
+    cache:Optional[KNodeCache] = None
+    timeout:Optional[float] = Field(None,gt=0)
+    retry:Optional[KNodeRetry] = None
+    max_concurrency:Optional[int] = Field(None,ge=1)
+    batch:Optional[KNodeBatch] = None
 
     model_config = ConfigDict(extra='forbid')
 
@@ -26,11 +92,11 @@ class KNodeV1(BaseModel):
     KNodeV1 represents a node in a graph, including the type of graph and flow parameters.
 
     Attributes:
-        graph_type (str): The type of the graph.
+        graph_type (Literal['node']): The type of the graph. Fixed to `node`.
         flow_parameter (KNodeParam): The parameters for the node.
         factory_parameter (Optional[Dict]): Optional factory parameters for the node.
     """
-    graph_type: str
+    graph_type: Literal['node']
     flow_parameter: KNodeParam
     factory_parameter: Optional[Dict] = None
 
@@ -3,8 +3,8 @@ This module defines data models for state graphs using Pydantic for validation.
 It includes models for state definitions, state graph parameters,
 and state graphs themselves, ensuring that certain constraints are met.
 """
-from typing import List, Optional, Union
-from pydantic import BaseModel, ConfigDict
+from typing import Annotated, Dict, List, Literal, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from kenkenpa.models.edge import KEdge
 from kenkenpa.models.node import KNode
@@ -20,13 +20,27 @@ class KStateV1(BaseModel):
         field_name (str): The name of the field.
         type (str): The type of the state.
         reducer (Optional[str]): An optional reducer for the state.
+        reducer_args (Optional[Dict]): Optional arguments of a built-in reducer.
     """
     field_name:str
     type:str
     reducer:Optional[Union[str,None]] = None
+    reducer_args:Optional[Dict] = None
 
     model_config = ConfigDict(extra='forbid')
 
+    @model_validator(mode='after')
+    def check_reducer_args(self):
+        """
+        Checks that reducer_args are only given with a reducer.
+
+        Raises:
+            ValueError: If reducer_args are given without a reducer.
+        """
+        if self.reducer_args is not None and self.reducer is None:
+            raise ValueError(f"reducer_args require a reducer: {self.field_name}")
+        return self
+
 KState = Union[KStateV1]
 
 class KStateGraphParamV1(BaseModel):
@@ -46,21 +60,29 @@ class KStateGraphV1(BaseModel):
     """
     KStateGraphV1 represents a state graph with a type, flow parameters, and flows.
 
+    Each flow is validated against the single model selected by its `graph_type`,
+    instead of trying every member of the union in turn.
+
     Attributes:
-        graph_type (str): The type of the graph.
+        graph_type (Literal['stategraph']): The type of the graph. Fixed to `stategraph`.
         flow_parameter (KStateGraphParam): The parameters for the state graph.
-        flows (List[Union[KEdge, KNode, KConfigurableConditionalEdge,
-            KConfigurableConditionalEntryPoint, 'KStateGraph']]):
-            A list of flows in the graph.
+        flows (List[KFlow]): A list of flows in the graph.
     """
-    graph_type:str
+    graph_type:Literal['stategraph']
     flow_parameter:KStateGraphParam
-    flows:List[Union[
+    flows:List['KFlow']
+
+KStateGraph = Union[KStateGraphV1]
+
+KFlow = Annotated[
+    Union[
         KEdge,
         KNode,
         KConfigurableConditionalEdge,
         KConfigurableConditionalEntryPoint,
-        'KStateGraph'
-    ]]
+        KStateGraph,
+    ],
+    Field(discriminator='graph_type'),
+]
 
-KStateGraph = Union[KStateGraphV1]
+KStateGraphV1.model_rebuild()
@@ -31,6 +31,25 @@ param['node'] = {
     "factory_parameter" : {},
 }
 
+param['node_cache'] = {
+    "keys": [],
+    "ttl": None,
+    "maxsize": 128,
+}
+
+param['node_retry'] = {
+    "attempts": 3,
+    "backoff": 0.5,
+    "backoff_factor": 2.0,
+    "max_backoff": 128.0,
+    "jitter": True,
+}
+
+param['node_batch'] = {
+    "max_size": 16,
+    "max_wait_ms": 10.0,
+}
+
 param['edge'] = {
     "graph_type":"edge",
     "flow_parameter":{
@@ -44,7 +63,10 @@ param['conditional_edge'] = {
     "flow_parameter":{
         "start_key":"start_key",
         "path_map":[],
-        "conditions":[]
+        "conditions":[],
+        "match":"all",
+        "adaptive":False,
+        "incremental":False
     },
 }
 
@@ -52,7 +74,10 @@ param['conditional_entry_point'] = {
     "graph_type":"configurable_conditional_entry_point",
     "flow_parameter":{
         "path_map":[],
-        "conditions":[]
+        "conditions":[],
+        "match":"all",
+        "adaptive":False,
+        "incremental":False
     },
 }
 
@@ -63,6 +88,13 @@ param['condition_expression'] = {
 
 param['condition_default'] = {"default": "next_node"}
 
+param['condition_switch'] = {
+    "switch": {"type":"state_value", "name":"test_state_key"},
+    "cases": [
+        {"value": "case_value", "result": "node_name"},
+    ]
+}
+
 param['operater_and'] = {"and": []}
 param['operater_or'] = {"or":[]}
 param['operater_not'] = {"not":{}}
@@ -93,11 +125,15 @@ def create_parameter(param_type:str) -> Dict:
             - stategraph
             - state
             - node
+            - node_cache
+            - node_retry
+            - node_batch
             - edge
             - conditional_edge
             - conditional_entry_point
             - condition_expression
             - condition_default
+            - condition_switch
             - operater_and
             - operater_or
             - operater_not
@@ -0,0 +1,228 @@
+"""
+This module provides functions for generating, saving and loading build plans.
+
+A build plan is a validated and normalized copy of graph settings that
+StateGraphBuilder can build from without validating the settings again:
+comparison operator aliases are replaced by their canonical names, START and END
+are resolved in edges and results, the path maps of conditional edges are
+precomputed, and optional parameters are filled in with their defaults.
+The state spec is kept as the type and reducer names: the objects they resolve
+to are registered on each builder, and are looked up when the graph is built.
+The plan records its format version and digests, so that a plan written by
+another version or for other settings is rejected when it is loaded.
+"""
+import json
+from typing import Dict, Optional
+
+from kenkenpa.cache import settings_digest
+from kenkenpa.common import convert_key, to_list_key, extract_literals
+
+PLAN_FORMAT = "kenkenpa.build_plan"
+PLAN_VERSION = 1
+"""The version of the build plan format. Plans of other versions are rejected."""
+
+CANONICAL_OPERATORS = {
+    "==": "eq",
+    "equals": "eq",
+    "!=": "neq",
+    "not_equals": "neq",
+    ">": "gt",
+    "greater_than": "gt",
+    ">=": "gte",
+    "greater_than_or_equals": "gte",
+    "<": "lt",
+    "less_than": "lt",
+    "<=": "lte",
+    "less_than_or_equals": "lte",
+}
+"""The canonical names of the comparison operator aliases."""
+
+def gen_build_plan(graph_settings:Dict) -> Dict:
+    """
+    Validates graph settings and generates their build plan.
+
+    Args:
+        graph_settings (Dict): The settings for the state graph. Must be JSON serializable.
+
+    Returns:
+        Dict: The build plan. It is JSON serializable.
+
+    Raises:
+        pydantic.ValidationError: If the settings are invalid.
+    """
+    from kenkenpa.models.stategraph import KStateGraph
+    KStateGraph(**graph_settings)
+    normalized = normalize_settings(graph_settings)
+    return {
+        "format": PLAN_FORMAT,
+        "version": PLAN_VERSION,
+        "settings_digest": settings_digest(graph_settings),
+        "digest": settings_digest(normalized),
+        "graph_settings": normalized,
+    }
+
+def check_build_plan(plan:Dict, graph_settings:Optional[Dict]=None):
+    """
+    Checks that a build plan can be used.
+
+    Args:
+        plan (Dict): The build plan.
+        graph_settings (Optional[Dict], optional): The settings the plan must have been
+            generated from. Defaults to None, in which case the source is not checked.
+
+    Raises:
+        ValueError: If the plan has another format or version, if it was modified
+            after it was generated, or if it was generated from other settings.
+    """
+    if not isinstance(plan, dict) or plan.get("format") != PLAN_FORMAT:
+        raise ValueError("Not a build plan.")
+    if plan.get("version") != PLAN_VERSION:
+        raise ValueError(f"Unsupported build plan version: {plan.get('version')}")
+    if settings_digest(plan.get("graph_settings")) != plan.get("digest"):
+        raise ValueError("The build plan does not match its digest.")
+    if graph_settings is not None and settings_digest(graph_settings) != plan.get("settings_digest"):
+        raise ValueError("The build plan was generated from other settings.")
+
+def save_build_plan(plan:Dict, path:str):
+    """
+    Writes a build plan to a JSON file.
+
+    Args:
+        plan (Dict): The build plan.
+        path (str): The path of the file.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(plan, file, ensure_ascii=False, sort_keys=True)
+
+def load_build_plan(path:str, graph_settings:Optional[Dict]=None) -> Dict:
+    """
+    Reads a build plan from a JSON file and checks it.
+
+    Args:
+        path (str): The path of the file.
+        graph_settings (Optional[Dict], optional): The settings the plan must have been
+            generated from. Defaults to None, in which case the source is not checked.
+
+    Returns:
+        Dict: The build plan.
+
+    Raises:
+        ValueError: If the plan cannot be used. See check_build_plan.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        plan = json.load(file)
+    check_build_plan(plan, graph_settings)
+    return plan
+
+def normalize_settings(graph_settings:Dict) -> Dict:
+    """
+    Normalizes valid graph settings. The settings are not modified.
+
+    Args:
+        graph_settings (Dict): The settings for the state graph.
+
+    Returns:
+        Dict: The normalized settings, which build the same graph.
+    """
+    flow_parameter = graph_settings.get("flow_parameter",{})
+    state = [dict(field) for field in flow_parameter.get("state") or []]
+    return {
+        **graph_settings,
+        "flow_parameter": {**flow_parameter, "state": state},
+        "flows": [_normalize_flow(flow) for flow in graph_settings.get("flows",[])],
+    }
+
+def normalize_expression(expr):
+    """
+    Replaces the comparison operator aliases of an expression by their canonical names.
+
+    Args:
+        expr (Dict): The expression.
+
+    Returns:
+        Dict: The normalized expression.
+    """
+    if not isinstance(expr, dict):
+        return expr
+
+    normalized = {}
+    for op, args in expr.items():
+        if op in ("and", "or"):
+            normalized[op] = [normalize_expression(sub_expr) for sub_expr in args]
+        elif op == "not":
+            normalized[op] = normalize_expression(args)
+        else:
+            normalized[CANONICAL_OPERATORS.get(op, op)] = args
+    return normalized
+
+def _normalize_flow(flow:Dict) -> Dict:
+    """
+    Normalizes one flow.
+    """
+    graph_type = flow.get("graph_type")
+    flow_parameter = flow.get("flow_parameter",{})
+
+    if graph_type == "stategraph":
+        return normalize_settings(flow)
+
+    if graph_type == "node":
+        return {**flow, "factory_parameter": flow.get("factory_parameter",{})}
+
+    if graph_type == "edge":
+        return {
+            **flow,
+            "flow_parameter": {
+                **flow_parameter,
+                "start_key": to_list_key(flow_parameter["start_key"]),
+                "end_key": to_list_key(flow_parameter["end_key"]),
+            },
+        }
+
+    if graph_type in ("configurable_conditional_edge", "configurable_conditional_entry_point"):
+        conditions = [_normalize_condition(condition) for condition in flow_parameter["conditions"]]
+        if "path_map" in flow_parameter:
+            path_map = to_list_key(flow_parameter["path_map"])
+        else:
+            path_map = extract_literals(conditions)
+        return {
+            **flow,
+            "flow_parameter": {
+                **flow_parameter,
+                "match": flow_parameter.get("match","all"),
+                "adaptive": flow_parameter.get("adaptive",False),
+                "incremental": flow_parameter.get("incremental",False),
+                "conditions": conditions,
+                "path_map": path_map,
+            },
+        }
+
+    return flow
+
+def _normalize_condition(condition:Dict) -> Dict:
+    """
+    Normalizes one condition.
+    """
+    if "expression" in condition:
+        return {
+            **condition,
+            "expression": normalize_expression(condition["expression"]),
+            "result": _normalize_result(condition["result"]),
+        }
+    if "switch" in condition:
+        return {
+            **condition,
+            "cases": [{**case, "result": _normalize_result(case["result"])} for case in condition["cases"]],
+        }
+    if "default" in condition:
+        return {**condition, "default": _normalize_result(condition["default"])}
+    return condition
+
+def _normalize_result(result):
+    """
+    Resolves START and END in a literal result.
+    """
+    if isinstance(result, str):
+        return convert_key(result)
+    if isinstance(result, list):
+        return [convert_key(item) if isinstance(item, str) else item for item in result]
+    return result
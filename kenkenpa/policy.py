@@ -0,0 +1,276 @@
+"""
+This module provides the execution policies of nodes declared in graph settings:
+a timeout for each call, a retry policy, and a limit on the number of concurrent
+calls shared by every graph in the process.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Optional
+
+from kenkenpa.common import node_runnable
+
+# asyncio.TimeoutError and concurrent.futures.TimeoutError are aliases
+# of TimeoutError since Python 3.11 only.
+_TIMEOUT_ERRORS = (TimeoutError, concurrent.futures.TimeoutError, asyncio.TimeoutError)
+
+TIMEOUT_MAX_WORKERS = 32
+"""The number of threads shared by synchronous calls of nodes with a timeout."""
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the executor running synchronous calls of nodes with a timeout, creating it if needed.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(TIMEOUT_MAX_WORKERS, thread_name_prefix="kenkenpa-node")
+        return _executor
+
+class ConcurrencyLimiter:
+    """
+    ConcurrencyLimiter limits the number of concurrent calls, like a semaphore
+    that threads and coroutines of any event loop can share.
+    Waiters are granted in arrival order.
+
+    Attributes:
+        limit (int): The maximum number of concurrent holders.
+    """
+    def __init__(self, limit: int):
+        """
+        Initializes the ConcurrencyLimiter.
+
+        Args:
+            limit (int): The maximum number of concurrent holders.
+
+        Raises:
+            ValueError: If limit is less than 1.
+        """
+        if limit < 1:
+            raise ValueError(f"limit must be at least 1: {limit}")
+
+        self.limit = limit
+        self._active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        """
+        Returns the number of current holders.
+        """
+        with self._lock:
+            return self._active
+
+    def acquire(self):
+        """
+        Waits until a slot is free and takes it.
+        """
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        # the slot is handed over by release.
+        event.wait()
+
+    async def aacquire(self):
+        """
+        Waits until a slot is free and takes it, without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        future = waiter[1]
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            # the slot was granted before the task was cancelled. If the future
+            # was cancelled instead, _grant hands the slot over when it runs.
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """
+        Frees a slot, handing it over to the first waiter if any.
+        """
+        with self._lock:
+            if not self._waiters:
+                self._active -= 1
+                return
+            waiter = self._waiters.popleft()
+
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            try:
+                loop.call_soon_threadsafe(self._grant, future)
+            except RuntimeError:
+                # the event loop of the waiter is closed.
+                self.release()
+
+    def _grant(self, future: asyncio.Future):
+        """
+        Hands a slot over to a coroutine waiter, or to the next waiter if it was cancelled.
+        """
+        if future.done():
+            self.release()
+        else:
+            future.set_result(None)
+
+_limiters: Dict[Hashable, ConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_concurrency_limiter(key: Hashable, limit: int) -> ConcurrencyLimiter:
+    """
+    Returns the process-wide ConcurrencyLimiter of a key, creating it if needed.
+
+    Args:
+        key (Hashable): The key of the limited resource, e.g. the factory and name of a node.
+        limit (int): The maximum number of concurrent calls.
+
+    Returns:
+        ConcurrencyLimiter: The limiter shared by every caller with the same key.
+
+    Raises:
+        ValueError: If the limiter of the key already exists with another limit.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = ConcurrencyLimiter(limit)
+        elif limiter.limit != limit:
+            raise ValueError(
+                f"The concurrency limit of {key} is already {limiter.limit}, not {limit}.")
+        return limiter
+
+def limit_node(
+    node: Any,
+    name: str,
+    timeout: Optional[float] = None,
+    limiter: Optional[ConcurrencyLimiter] = None,
+    ) -> Any:
+    """
+    Wraps a node with a timeout and a concurrency limit.
+
+    Synchronous calls with a timeout run on a shared pool of TIMEOUT_MAX_WORKERS threads.
+    A synchronous call that times out cannot be interrupted: it keeps running
+    on its worker thread, and holds its concurrency slot until it returns.
+    A TimeoutError raised by the node itself is raised unchanged.
+
+    Args:
+        node (Any): The node returned by a node factory. It may be a function,
+            a coroutine function or a runnable, and may take the config,
+            runtime, store and writer.
+        name (str): The node name, used in the timeout error message.
+        timeout (Optional[float], optional): The maximum number of seconds of each call.
+            Defaults to None, for no timeout.
+        limiter (Optional[ConcurrencyLimiter], optional): The limiter of concurrent calls.
+            Defaults to None, for no limit.
+
+    Returns:
+        RunnableLambda: The node with sync and async entry points applying the limits.
+    """
+    from langchain_core.runnables import RunnableLambda
+
+    runnable = node_runnable(node, name)
+
+    def call(state, config):
+        if limiter is not None:
+            limiter.acquire()
+        if timeout is None:
+            try:
+                return runnable.invoke(state, config)
+            finally:
+                if limiter is not None:
+                    limiter.release()
+
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                return context.run(runnable.invoke, state, config)
+            finally:
+                if limiter is not None:
+                    limiter.release()
+
+        try:
+            future = _get_executor().submit(run)
+        except BaseException:
+            if limiter is not None:
+                limiter.release()
+            raise
+        try:
+            return future.result(timeout)
+        except _TIMEOUT_ERRORS as e:
+            if future.done() and not future.cancelled():
+                raise
+            if future.cancel() and limiter is not None:
+                # the call was still queued, so run never releases its slot.
+                limiter.release()
+            raise TimeoutError(f"Node {name} timed out after {timeout} seconds") from e
+
+    async def acall(state, config):
+        if limiter is not None:
+            await limiter.aacquire()
+        try:
+            if timeout is None:
+                return await runnable.ainvoke(state, config)
+            task = asyncio.ensure_future(runnable.ainvoke(state, config))
+            try:
+                done, _ = await asyncio.wait((task,), timeout=timeout)
+            except BaseException:
+                task.cancel()
+                raise
+            if task in done:
+                return task.result()
+            task.cancel()
+            await asyncio.wait((task,))
+            raise TimeoutError(f"Node {name} timed out after {timeout} seconds")
+        finally:
+            if limiter is not None:
+                limiter.release()
+
+    return RunnableLambda(call, afunc=acall, name=name)
+
+def retry_policy(retry: Dict) -> Any:
+    """
+    Converts the `retry` setting of a node into a LangGraph RetryPolicy.
+    Every exception is retried, except those LangGraph uses for control flow, such as interrupts.
+
+    Args:
+        retry (Dict): The retry setting, with attempts, backoff, backoff_factor,
+            max_backoff and jitter.
+
+    Returns:
+        RetryPolicy: The retry policy.
+    """
+    from langgraph.types import RetryPolicy
+
+    return RetryPolicy(
+        initial_interval=retry.get("backoff", 0.5),
+        backoff_factor=retry.get("backoff_factor", 2.0),
+        max_interval=retry.get("max_backoff", 128.0),
+        max_attempts=retry.get("attempts", 3),
+        jitter=retry.get("jitter", True),
+        retry_on=Exception,
+    )
@@ -0,0 +1,190 @@
+"""
+This module provides the built-in reducers that state fields can use by name,
+without registering them: keep_last, append, merge, union, max and min.
+Each built-in reducer is a factory taking the `reducer_args` of the field
+and returning the reducer function.
+"""
+import threading
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_COLLECTIONS = (list, tuple, deque, set, frozenset)
+
+def _items(value: Any) -> Any:
+    """
+    Returns the items of an update, wrapping a single item in a tuple.
+    """
+    if value is None:
+        return ()
+    if isinstance(value, _COLLECTIONS):
+        return value
+    return (value,)
+
+def _last(items: Any, count: int) -> list:
+    """
+    Returns the last count items as a list, copying only those items
+    of lists, tuples and deques. Sets are returned in iteration order.
+    """
+    if count <= 0:
+        return []
+    if isinstance(items, (list, tuple)):
+        return list(items[-count:])
+    if isinstance(items, deque):
+        return list(islice(reversed(items), count))[::-1]
+    return list(items)[-count:]
+
+def keep_last(n: int) -> Callable[[Any, Any], list]:
+    """
+    Creates a reducer that appends the update to the list and keeps its last n items.
+    Only the kept items are copied, so each update costs O(n) whatever the history length.
+
+    Args:
+        n (int): The number of items kept.
+
+    Returns:
+        Callable[[Any, Any], list]: The reducer.
+
+    Raises:
+        ValueError: If n is less than 1.
+    """
+    if n < 1:
+        raise ValueError(f"n must be at least 1: {n}")
+
+    def reduce_keep_last(left, right):
+        right = _last(_items(right), n)
+        return _last(_items(left), n - len(right)) + right
+    return reduce_keep_last
+
+def append(maxlen: int) -> Callable[[Any, Any], deque]:
+    """
+    Creates a reducer that appends the update to a deque of at most maxlen items,
+    dropping the oldest items. Each update copies at most maxlen items.
+    The previous value is not modified, so states held by nodes and checkpoints stay intact.
+
+    Args:
+        maxlen (int): The maximum number of items kept.
+
+    Returns:
+        Callable[[Any, Any], deque]: The reducer.
+
+    Raises:
+        ValueError: If maxlen is less than 1.
+    """
+    if maxlen < 1:
+        raise ValueError(f"maxlen must be at least 1: {maxlen}")
+
+    def reduce_append(left, right):
+        right = _items(right)
+        merged = deque(_last(_items(left), maxlen - len(right)), maxlen)
+        merged.extend(right)
+        return merged
+    return reduce_append
+
+def merge() -> Callable[[Any, Any], dict]:
+    """
+    Creates a reducer that merges the update into the dictionary, the update taking precedence.
+
+    Returns:
+        Callable[[Any, Any], dict]: The reducer.
+    """
+    def reduce_merge(left, right):
+        if not right:
+            return dict(left or {})
+        if not left:
+            return dict(right)
+        return {**left, **right}
+    return reduce_merge
+
+def union() -> Callable[[Any, Any], Any]:
+    """
+    Creates a reducer that adds the update items to the set.
+    A frozenset stays a frozenset.
+
+    Returns:
+        Callable[[Any, Any], Any]: The reducer.
+    """
+    def reduce_union(left, right):
+        result_type = frozenset if isinstance(left, frozenset) else set
+        return result_type(_items(left)).union(_items(right))
+    return reduce_union
+
+def maximum() -> Callable[[Any, Any], Any]:
+    """
+    Creates a reducer that keeps the greater of the value and the update, ignoring None.
+
+    Returns:
+        Callable[[Any, Any], Any]: The reducer.
+    """
+    def reduce_max(left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        return max(left, right)
+    return reduce_max
+
+def minimum() -> Callable[[Any, Any], Any]:
+    """
+    Creates a reducer that keeps the lesser of the value and the update, ignoring None.
+
+    Returns:
+        Callable[[Any, Any], Any]: The reducer.
+    """
+    def reduce_min(left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        return min(left, right)
+    return reduce_min
+
+BUILTIN_REDUCERS: Dict[str, Callable[..., Callable[[Any, Any], Any]]] = {
+    "keep_last": keep_last,
+    "append": append,
+    "merge": merge,
+    "union": union,
+    "max": maximum,
+    "min": minimum,
+}
+"""The built-in reducer factories, keyed by reducer name."""
+
+_reducers: Dict[Tuple[str, Hashable], Callable[[Any, Any], Any]] = {}
+_reducers_lock = threading.Lock()
+
+def get_builtin_reducer(name: str, reducer_args: Optional[Dict] = None) -> Callable[[Any, Any], Any]:
+    """
+    Returns the built-in reducer of a name and arguments, creating it if needed.
+    The same reducer is returned for the same name and arguments,
+    so that identical state specifications share one state class.
+
+    Args:
+        name (str): The name of the built-in reducer.
+        reducer_args (Optional[Dict], optional): The arguments of the reducer factory.
+            Defaults to None.
+
+    Returns:
+        Callable[[Any, Any], Any]: The reducer.
+
+    Raises:
+        ValueError: If the name is not a built-in reducer or the arguments are invalid.
+    """
+    if name not in BUILTIN_REDUCERS:
+        raise ValueError(f"Unregistered function: {name}")
+
+    reducer_args = reducer_args or {}
+    try:
+        key = (name, tuple(sorted(reducer_args.items())))
+        hash(key)
+    except TypeError as e:
+        raise ValueError(f"Invalid reducer_args of {name}: {reducer_args}") from e
+
+    with _reducers_lock:
+        reducer = _reducers.get(key)
+        if reducer is None:
+            try:
+                reducer = BUILTIN_REDUCERS[name](**reducer_args)
+            except TypeError as e:
+                raise ValueError(f"Invalid reducer_args of {name}: {reducer_args}") from e
+            _reducers[key] = reducer
+        return reducer
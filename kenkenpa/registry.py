@@ -0,0 +1,295 @@
+"""
+This module provides a GraphRegistry class that keeps one compiled graph per key,
+e.g. per tenant or per room, built from the graph settings registered for the key.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from kenkenpa.builder import StateGraphBuilder
+from kenkenpa.common import KeyLocks
+
+def count_nodes(key:Hashable, graph:Any) -> int:
+    """
+    Weighs a compiled graph by its number of nodes, as an estimate of its memory footprint.
+
+    Args:
+        key (Hashable): The registry key of the graph.
+        graph (Any): The compiled graph.
+
+    Returns:
+        int: The number of nodes of the graph, including START.
+    """
+    return max(len(getattr(graph, "nodes", ())), 1)
+
+class GraphRegistry:
+    """
+    GraphRegistry maps keys to graph settings and keeps the compiled graphs
+    of recently used keys. It is safe to share between threads and coroutines.
+
+    A graph is built and compiled on the first access to its key. Concurrent first
+    accesses to the same key wait for a single build. Compiled graphs are evicted
+    in least recently used order when there are more than maxsize of them, or when
+    their total weight exceeds max_weight. They are built again on their next access.
+
+    Attributes:
+        maxsize (int): The maximum number of compiled graphs kept.
+        max_weight (Optional[float]): The maximum total weight of the compiled graphs kept.
+        weigher (Callable[[Hashable, Any], float]): Returns the weight of a compiled graph.
+        hits (int): The number of accesses that found a compiled graph.
+        misses (int): The number of accesses that did not find a compiled graph.
+        builds (int): The number of graphs built.
+        build_errors (int): The number of builds that raised an exception.
+        evictions (int): The number of compiled graphs evicted to respect the budgets.
+        build_seconds (float): The total wall time of the builds.
+    """
+    def __init__(
+        self,
+        builder_factory:Optional[Callable[[Hashable, Dict], StateGraphBuilder]] = None,
+        maxsize:int = 128,
+        max_weight:Optional[float] = None,
+        weigher:Callable[[Hashable, Any], float] = count_nodes,
+        compile_kwargs:Optional[Dict] = None,
+        **builder_kwargs:Any,
+        ):
+        """
+        Initializes the GraphRegistry.
+
+        Args:
+            builder_factory (Optional[Callable[[Hashable, Dict], StateGraphBuilder]], optional):
+                Creates the builder of a key from the key and its graph settings, with its
+                node factories, evaluation functions, reducers and types registered.
+                Defaults to creating a StateGraphBuilder with builder_kwargs.
+            maxsize (int, optional): The maximum number of compiled graphs kept. Defaults to 128.
+            max_weight (Optional[float], optional): The maximum total weight of the compiled
+                graphs kept. A graph heavier than max_weight is returned but not kept.
+                Defaults to None, for no limit.
+            weigher (Callable[[Hashable, Any], float], optional): Returns the weight of
+                a compiled graph. Defaults to count_nodes.
+            compile_kwargs (Optional[Dict], optional): The arguments of StateGraph.compile,
+                e.g. checkpointer. Defaults to None.
+            **builder_kwargs (Any): The arguments of StateGraphBuilder other than graph_settings,
+                used when builder_factory is not given.
+
+        Raises:
+            ValueError: If maxsize is less than 1 or max_weight is not positive.
+        """
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1: {maxsize}")
+        if max_weight is not None and max_weight <= 0:
+            raise ValueError(f"max_weight must be positive: {max_weight}")
+
+        self.maxsize = maxsize
+        self.max_weight = max_weight
+        self.weigher = weigher
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.build_errors = 0
+        self.evictions = 0
+        self.build_seconds = 0.0
+        self._builder_factory = builder_factory
+        self._builder_kwargs = builder_kwargs
+        self._compile_kwargs = compile_kwargs or {}
+        self._settings: Dict[Hashable, Dict] = {}
+        # the version of each key is incremented when its settings change,
+        # so that a build started with the old settings is not kept.
+        self._versions: Dict[Hashable, int] = {}
+        self._graphs = OrderedDict()
+        self._weight = 0.0
+        self._key_locks = KeyLocks()
+        self._lock = threading.Lock()
+
+    def register(self, key:Hashable, graph_settings:Dict):
+        """
+        Registers the graph settings of a key, replacing its previous settings
+        and discarding its compiled graph. The settings are validated on the first build.
+
+        Args:
+            key (Hashable): The registry key.
+            graph_settings (Dict): The settings for the state graph.
+        """
+        with self._lock:
+            self._settings[key] = graph_settings
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._discard(key)
+
+    def unregister(self, key:Hashable):
+        """
+        Removes a key, its settings and its compiled graph.
+
+        Args:
+            key (Hashable): The registry key.
+        """
+        with self._lock:
+            self._settings.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._discard(key)
+
+    def get(self, key:Hashable) -> Any:
+        """
+        Returns the compiled graph of a key, building it if it is not kept.
+
+        Args:
+            key (Hashable): The registry key.
+
+        Returns:
+            Any: The compiled graph.
+
+        Raises:
+            ValueError: If the key is not registered.
+        """
+        with self._lock:
+            graph = self._lookup(key)
+        if graph is not None:
+            return graph
+        return self._get_missing(key)
+
+    async def aget(self, key:Hashable) -> Any:
+        """
+        Returns the compiled graph of a key, building it on a worker thread if it is not kept,
+        so that the event loop is not blocked.
+
+        Args:
+            key (Hashable): The registry key.
+
+        Returns:
+            Any: The compiled graph.
+
+        Raises:
+            ValueError: If the key is not registered.
+        """
+        with self._lock:
+            graph = self._lookup(key)
+        if graph is not None:
+            return graph
+        return await asyncio.to_thread(self._get_missing, key)
+
+    def clear(self):
+        """
+        Discards every compiled graph and resets the statistics. Registered settings are kept.
+        """
+        with self._lock:
+            self._graphs.clear()
+            self._weight = 0.0
+            self.hits = 0
+            self.misses = 0
+            self.builds = 0
+            self.build_errors = 0
+            self.evictions = 0
+            self.build_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the registry statistics.
+
+        Returns:
+            Dict[str, Any]: The hits, misses, builds, build errors, evictions,
+                total build seconds, number of registered keys, number and total
+                weight of the compiled graphs kept, maxsize and max_weight.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "builds": self.builds,
+                "build_errors": self.build_errors,
+                "evictions": self.evictions,
+                "build_seconds": self.build_seconds,
+                "registered": len(self._settings),
+                "size": len(self._graphs),
+                "weight": self._weight,
+                "maxsize": self.maxsize,
+                "max_weight": self.max_weight,
+            }
+
+    def __contains__(self, key:Hashable) -> bool:
+        with self._lock:
+            return key in self._settings
+
+    def __len__(self):
+        with self._lock:
+            return len(self._settings)
+
+    def _lookup(self, key:Hashable, count:bool=True) -> Any:
+        """
+        Returns the kept graph of a key and marks it as recently used. The lock must be held.
+        """
+        entry = self._graphs.get(key)
+        if entry is None:
+            if count:
+                self.misses += 1
+            return None
+        self._graphs.move_to_end(key)
+        if count:
+            self.hits += 1
+        return entry[0]
+
+    def _get_missing(self, key:Hashable) -> Any:
+        """
+        Returns the compiled graph of a key that was not found, building it
+        unless a concurrent access built it in the meantime.
+        """
+        with self._key_locks.hold(key):
+            with self._lock:
+                graph = self._lookup(key, count=False)
+                if graph is not None:
+                    return graph
+                if key not in self._settings:
+                    raise ValueError(f"Unregistered graph: {key}")
+                graph_settings = self._settings[key]
+                version = self._versions[key]
+
+            graph = self._build(key, graph_settings)
+            with self._lock:
+                if self._versions.get(key) == version:
+                    self._keep(key, graph)
+            return graph
+
+    def _build(self, key:Hashable, graph_settings:Dict) -> Any:
+        """
+        Builds and compiles the graph of a key.
+        """
+        start = time.perf_counter()
+        try:
+            if self._builder_factory is not None:
+                builder = self._builder_factory(key, graph_settings)
+            else:
+                builder = StateGraphBuilder(graph_settings, **self._builder_kwargs)
+            graph = builder.gen_stategraph().compile(**self._compile_kwargs)
+        except Exception:
+            with self._lock:
+                self.build_errors += 1
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.builds += 1
+                self.build_seconds += seconds
+        return graph
+
+    def _keep(self, key:Hashable, graph:Any):
+        """
+        Keeps the graph of a key and evicts graphs beyond the budgets. The lock must be held.
+        """
+        weight = self.weigher(key, graph)
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+        self._discard(key)
+        self._graphs[key] = (graph, weight)
+        self._weight += weight
+        while len(self._graphs) > self.maxsize or (
+                self.max_weight is not None and self._weight > self.max_weight):
+            _, (_, evicted_weight) = self._graphs.popitem(last=False)
+            self._weight -= evicted_weight
+            self.evictions += 1
+
+    def _discard(self, key:Hashable):
+        """
+        Discards the kept graph of a key. The lock must be held.
+        """
+        entry = self._graphs.pop(key, None)
+        if entry is not None:
+            self._weight -= entry[1]
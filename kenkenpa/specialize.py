@@ -0,0 +1,261 @@
+"""
+This module provides functions for specializing graph settings for config values
+that are fixed for the lifetime of a graph.
+
+Specialization is a transformation of graph settings into equivalent graph settings:
+`config_value` operands with a fixed value and comparisons between constants are
+folded at build time, conditions that can never match are dropped, conditional
+edges whose result no longer depends on the state are replaced with plain edges,
+and nodes that can no longer be reached from START are pruned.
+
+Folding keeps the evaluation order, so specialized graphs raise the same errors
+as the original ones: operands of `and` and `or` are only folded away when
+no operand evaluated before them is left to the runtime.
+"""
+from typing import Any, Dict, List, Optional
+
+from kenkenpa.analysis import CONDITIONAL_GRAPH_TYPES, prune_unreachable_flows
+from kenkenpa.edges import COMPARISON_OPERATORS
+
+SCALAR_TYPES = (int, float, complex, bool, str, bytes, type(None))
+"""The types of config values that can be folded into comparisons."""
+
+def specialize_settings(graph_settings:Dict, config_values:Dict[str, Any], prune:bool=True) -> Dict:
+    """
+    Specializes graph settings for fixed config values.
+    The settings must be valid; they are not modified.
+
+    Args:
+        graph_settings (Dict): The settings for the state graph.
+        config_values (Dict[str, Any]): The fixed values of `config_value` operands, by name.
+            Operands whose name is not given are still read from the config on each call.
+        prune (bool, optional): If True, nodes that cannot be reached from START through
+            edges, conditional edges and entry points are removed. Nodes reached only through
+            `Command` or `Send` objects that are not visible in the settings must not be pruned.
+            Defaults to True.
+
+    Returns:
+        Dict: The specialized graph settings.
+    """
+    flows = []
+    for flow in graph_settings.get("flows",[]):
+        graph_type = flow.get("graph_type")
+        if graph_type == "stategraph":
+            flows.append(specialize_settings(flow, config_values, prune))
+        elif graph_type in CONDITIONAL_GRAPH_TYPES:
+            flows.append(specialize_conditional_flow(flow, config_values))
+        else:
+            flows.append(flow)
+
+    if prune:
+        flows = prune_unreachable_flows(flows)
+    return {**graph_settings, "flows": flows}
+
+def specialize_conditional_flow(flow:Dict, config_values:Dict[str, Any]) -> Dict:
+    """
+    Specializes a configurable conditional edge or entry point.
+    If its result no longer depends on the state, it is replaced with a plain edge.
+
+    Args:
+        flow (Dict): The conditional edge or entry point flow.
+        config_values (Dict[str, Any]): The fixed values of `config_value` operands.
+
+    Returns:
+        Dict: The specialized flow.
+    """
+    flow_parameter = flow.get("flow_parameter",{})
+    conditions = fold_conditions(
+        flow_parameter["conditions"],
+        config_values,
+        flow_parameter.get("match","all"),
+        )
+
+    results = static_results(conditions)
+    if results is not None:
+        return {
+            "graph_type":"edge",
+            "flow_parameter":{
+                "start_key":flow_parameter.get("start_key","START"),
+                "end_key":results,
+            },
+        }
+    return {**flow, "flow_parameter": {**flow_parameter, "conditions": conditions}}
+
+def fold_conditions(conditions:List[Dict], config_values:Dict[str, Any], match:str="all") -> List[Dict]:
+    """
+    Folds fixed config values and constant comparisons in conditions.
+    Conditions that can never match are dropped, and conditions that always match
+    get the expression `{"and": []}`. In "first" match mode, the conditions after
+    the first one that always matches are dropped, including the defaults.
+
+    Args:
+        conditions (List[Dict]): The conditions to fold.
+        config_values (Dict[str, Any]): The fixed values of `config_value` operands.
+        match (str, optional): The match mode of the conditions. Defaults to "all".
+
+    Returns:
+        List[Dict]: The folded conditions.
+    """
+    folded = []
+    for condition in conditions:
+        if "expression" in condition:
+            expression = fold_expression(condition["expression"], config_values)
+            if expression is False:
+                continue
+            result = _fold_result(condition["result"], config_values)
+            if expression is True:
+                folded.append({**condition, "expression": {"and": []}, "result": result})
+                if match == "first":
+                    return folded
+            else:
+                folded.append({**condition, "expression": expression, "result": result})
+
+        elif "switch" in condition:
+            operand = _fold_operand(condition["switch"], config_values)
+            cases = [
+                {**case, "result": _fold_result(case["result"], config_values)}
+                for case in condition["cases"]
+            ]
+            if isinstance(operand, dict):
+                folded.append({**condition, "cases": cases})
+                continue
+
+            selected = [case for case in cases if _case_matches(case["value"], operand)]
+            if match == "first":
+                selected = selected[:1]
+            for case in selected:
+                folded.append({"expression": {"and": []}, "result": case["result"]})
+            if selected and match == "first":
+                return folded
+
+        elif "default" in condition:
+            folded.append({**condition, "default": _fold_result(condition["default"], config_values)})
+
+        else:
+            folded.append(condition)
+    return folded
+
+def fold_expression(expr, config_values:Dict[str, Any]):
+    """
+    Folds fixed config values and constant comparisons in an expression.
+    An operand of `and` or `or` that decides the result folds the whole operator
+    only if it is the first operand left; otherwise the operands before it are kept,
+    since they are evaluated first and may raise, and the ones after it are dropped.
+
+    Args:
+        expr (Dict): The expression to fold.
+        config_values (Dict[str, Any]): The fixed values of `config_value` operands.
+
+    Returns:
+        Union[bool, Dict]: True or False if the expression is constant,
+            otherwise the folded expression.
+    """
+    if not isinstance(expr, dict):
+        return expr
+
+    for op, args in expr.items():
+        if op in ("and", "or"):
+            # the value that decides the result of the operator.
+            decisive = op == "or"
+            children = []
+            for sub_expr in args:
+                child = fold_expression(sub_expr, config_values)
+                if child is decisive:
+                    if not children:
+                        return decisive
+                    children.append(_constant_expression(decisive))
+                    break
+                if child is not (not decisive):
+                    children.append(child)
+            if not children:
+                return not decisive
+            return {op: children}
+
+        if op == "not":
+            child = fold_expression(args, config_values)
+            if isinstance(child, bool):
+                return not child
+            return {op: child}
+
+        if op in COMPARISON_OPERATORS:
+            left_item, right_item = (_fold_operand(item, config_values) for item in args)
+            if not isinstance(left_item, dict) and not isinstance(right_item, dict):
+                try:
+                    return bool(COMPARISON_OPERATORS[op](left_item, right_item))
+                except TypeError:
+                    # raised again on each call, as without specialization.
+                    pass
+            return {op: [left_item, right_item]}
+
+        return expr
+    return expr
+
+def static_results(conditions:List[Dict]) -> Optional[List[str]]:
+    """
+    Returns the results of folded conditions if they do not depend on the state.
+
+    Args:
+        conditions (List[Dict]): The folded conditions.
+
+    Returns:
+        Optional[List[str]]: The next nodes, without duplicates, or None if the results
+            depend on the state or no condition would match.
+    """
+    matching = []
+    defaults = []
+    for condition in conditions:
+        if "expression" in condition:
+            if condition["expression"] != {"and": []}:
+                return None
+            matching.append(condition["result"])
+        elif "default" in condition:
+            defaults.append(condition["default"])
+        else:
+            return None
+
+    results = []
+    for result in matching or defaults:
+        if isinstance(result, str):
+            result = [result]
+        if not isinstance(result, list) or not all(isinstance(item, str) for item in result):
+            return None
+        results.extend(item for item in result if item not in results)
+    return results or None
+
+def _constant_expression(value:bool) -> Dict:
+    """
+    Returns the expression that always evaluates to a boolean constant.
+    """
+    return {"and": []} if value else {"or": []}
+
+def _fold_operand(item, config_values:Dict[str, Any]):
+    """
+    Replaces a `config_value` operand with its fixed value if the value is a scalar.
+    """
+    if isinstance(item, dict) and item.get("type") == "config_value":
+        name = item.get("name")
+        if name in config_values and isinstance(config_values[name], SCALAR_TYPES):
+            return config_values[name]
+    return item
+
+def _fold_result(result, config_values:Dict[str, Any]):
+    """
+    Replaces a `config_value` result with its fixed value if the value is a key or a list of keys.
+    """
+    if isinstance(result, dict) and result.get("type") == "config_value":
+        name = result.get("name")
+        value = config_values.get(name)
+        if isinstance(value, str) or (
+                isinstance(value, list) and all(isinstance(item, str) for item in value)):
+            return value
+    return result
+
+def _case_matches(case_value, value) -> bool:
+    """
+    Checks whether a switch case is selected by a constant value, like the switch table lookup.
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return case_value == value and hash(case_value) == hash(value)
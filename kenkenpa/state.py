@@ -1,11 +1,24 @@
 """
 This module provides a StateBuilder class for
 dynamically creating state classes with specified types and reducers.
+Identical state specifications share one interned state class.
 """
+import threading
 import types
+import weakref
 from typing import Annotated, Dict
 from typing_extensions import TypedDict
 
+from kenkenpa.reducers import get_builtin_reducer
+
+# Interned state classes keyed by (field_name, id(type), id(reducer)) tuples.
+# Values are held weakly, so classes no longer used by any graph are evicted.
+# A live class keeps its types and reducers alive through its annotations,
+# so the ids in a key cannot be reused while the entry exists.
+_state_classes = weakref.WeakValueDictionary()
+_state_classes_lock = threading.Lock()
+_NO_REDUCER = object()
+
 class StateBuilder():
     """
     StateBuilder is a class that helps in creating dynamic state classes with
@@ -85,53 +98,60 @@ class StateBuilder():
 
     def gen_state(self,params):
         """
-        Generates a new state class based on the provided parameters.
+        Generates a state class based on the provided parameters.
+
+        State classes are interned: parameters that resolve to the same field names,
+        types and reducers return the same class, across all StateBuilder instances.
 
         Args:
             params (List[Dict[str, Union[str, Optional[str]]]]):
-                A list of dictionaries containing field names, types, and optional reducers.
+                A list of dictionaries containing field names, types, and optional reducers
+                and reducer_args.
 
         Returns:
-            Type[TypedDict]: A new state class with the specified annotations.
+            Type[TypedDict]: A state class with the specified annotations.
         """
-        annotations = {
-            param['field_name']: (
-                Annotated[
-                    self._get_type(param['type']),
-                    self._get_reducer(param['reducer'])
-                    ]
-                if 'reducer' in param else
-                self._get_type(param['type'])
+        fields = [
+            (
+                param['field_name'],
+                self._get_type(param['type']),
+                self._get_reducer(param['reducer'], param.get('reducer_args'))
+                if 'reducer' in param else _NO_REDUCER,
             )
             for param in params
-        }
-
-        new_class = types.new_class(
-            'State',
-            (TypedDict,),
-            exec_body=lambda ns: ns.update({
-                '__annotations__': annotations,
-            })
-        )
-        return new_class
+        ]
+        key = tuple((field_name, id(type_), id(reducer)) for field_name, type_, reducer in fields)
 
-    def _get_reducer(self,name:str):
+        with _state_classes_lock:
+            state_class = _state_classes.get(key)
+            if state_class is None:
+                state_class = _new_state_class(fields)
+                _state_classes[key] = state_class
+        return state_class
+
+    def _get_reducer(self,name:str,reducer_args:Dict=None):
         """
         Retrieves a reducer function by name.
+        Registered reducers take precedence over built-in reducers of the same name.
 
         Args:
             name (str): The name of the reducer function.
+            reducer_args (Dict, optional): The arguments of a built-in reducer.
 
         Returns:
             callable: The reducer function.
 
         Raises:
-            ValueError: If the reducer function name is not registered.
+            ValueError: If the reducer function name is not registered and is not
+                a built-in reducer, if reducer_args are given for a registered reducer,
+                or if reducer_args are invalid.
         """
         if name in self.reducer_list:
+            if reducer_args:
+                raise ValueError(f"reducer_args are only supported by built-in reducers: {name}")
             return self.reducer_list[name]
 
-        raise ValueError(f"Unregistered function: {name}")
+        return get_builtin_reducer(name, reducer_args)
 
     def _get_type(self,name:str):
         """
@@ -153,3 +173,29 @@ class StateBuilder():
             return self.type_list[name]
 
         raise ValueError(f"Unregistered type: {name}")
+
+def _new_state_class(fields):
+    """
+    Creates a new state class.
+
+    Args:
+        fields (List[Tuple[str, type, callable]]):
+            Field names, types, and reducers (or _NO_REDUCER).
+
+    Returns:
+        Type[TypedDict]: A new state class with the specified annotations.
+    """
+    annotations = {
+        field_name: (
+            type_ if reducer is _NO_REDUCER else Annotated[type_, reducer]
+        )
+        for field_name, type_, reducer in fields
+    }
+
+    return types.new_class(
+        'State',
+        (TypedDict,),
+        exec_body=lambda ns: ns.update({
+            '__annotations__': annotations,
+        })
+    )
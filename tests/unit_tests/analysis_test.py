@@ -0,0 +1,93 @@
+from kenkenpa.analysis import analyze_reachability, prune_settings, prune_unreachable_flows
+
+def test_prune_unreachable_flows():
+    flows = [
+        {"graph_type": "node", "flow_parameter": {"name": "a", "factory": "f"}},
+        {"graph_type": "node", "flow_parameter": {"name": "b", "factory": "f"}},
+        {"graph_type": "node", "flow_parameter": {"name": "c", "factory": "f"}},
+        {"graph_type": "edge", "flow_parameter": {"start_key": "START", "end_key": "a"}},
+        {"graph_type": "edge", "flow_parameter": {"start_key": ["a", "b"], "end_key": "END"}},
+        {"graph_type": "edge", "flow_parameter": {"start_key": "b", "end_key": "c"}},
+    ]
+    pruned = prune_unreachable_flows(flows)
+    assert [flow["flow_parameter"].get("name") for flow in pruned if flow["graph_type"] == "node"] == ["a"]
+    assert pruned[2]["flow_parameter"]["start_key"] == ["a"]
+    assert len(pruned) == 3
+
+    dynamic = {
+        "graph_type": "configurable_conditional_edge",
+        "flow_parameter": {
+            "start_key": "a",
+            "conditions": [{"default": {"type": "state_value", "name": "next"}}],
+        },
+    }
+    assert prune_unreachable_flows([*flows, dynamic]) == [*flows, dynamic]
+    with_path_map = {**dynamic, "flow_parameter": {**dynamic["flow_parameter"], "path_map": ["b"]}}
+    assert prune_unreachable_flows([*flows, with_path_map]) == [*flows, with_path_map]
+
+graph_settings = {
+    "graph_type": "stategraph",
+    "flow_parameter": {"name": "root", "state": []},
+    "flows": [
+        {"graph_type": "node", "flow_parameter": {"name": "a", "factory": "f"}},
+        {"graph_type": "node", "flow_parameter": {"name": "dead", "factory": "f"}},
+        {
+            "graph_type": "stategraph",
+            "flow_parameter": {"name": "sub", "state": []},
+            "flows": [
+                {"graph_type": "node", "flow_parameter": {"name": "sub_a", "factory": "f"}},
+                {"graph_type": "node", "flow_parameter": {"name": "sub_dead", "factory": "f"}},
+                {"graph_type": "edge", "flow_parameter": {"start_key": "START", "end_key": "sub_a"}},
+                {"graph_type": "edge", "flow_parameter": {"start_key": "sub_a", "end_key": "END"}},
+            ],
+        },
+        {
+            "graph_type": "stategraph",
+            "flow_parameter": {"name": "dead_sub", "state": []},
+            "flows": [],
+        },
+        {"graph_type": "edge", "flow_parameter": {"start_key": "START", "end_key": "a"}},
+        {
+            "graph_type": "configurable_conditional_edge",
+            "flow_parameter": {
+                "start_key": "a",
+                "conditions": [
+                    {
+                        "switch": {"type": "state_value", "name": "next"},
+                        "cases": [{"value": 1, "result": "sub"}],
+                    },
+                    {"default": "missing"},
+                ],
+            },
+        },
+        {"graph_type": "edge", "flow_parameter": {"start_key": "dead", "end_key": "END"}},
+    ],
+}
+
+def test_analyze_reachability():
+    report = analyze_reachability(graph_settings)
+    assert report.unreachable_nodes == [(("root",), "dead"), (("root", "sub"), "sub_dead")]
+    assert report.unreachable_stategraphs == [(("root",), "dead_sub")]
+    assert report.unknown_targets == [(("root",), "a", "missing")]
+    assert report.dynamic_edges == []
+    assert report.to_dict()["unreachable_stategraphs"] == [[["root"], "dead_sub"]]
+
+def test_analyze_reachability_dynamic_edge():
+    flows = [dict(flow) for flow in graph_settings["flows"]]
+    flows[5] = {
+        "graph_type": "configurable_conditional_edge",
+        "flow_parameter": {
+            "start_key": "a",
+            "conditions": [{"default": {"type": "state_value", "name": "next"}}],
+        },
+    }
+    report = analyze_reachability({**graph_settings, "flows": flows})
+    assert report.unreachable == [(("root", "sub"), "sub_dead")]
+    assert report.dynamic_edges == [(("root",), "a")]
+
+def test_prune_settings():
+    pruned = prune_settings(graph_settings)
+    assert [flow["flow_parameter"].get("name") for flow in pruned["flows"]] == ["a", "sub", None, None]
+    sub = pruned["flows"][1]
+    assert [flow["flow_parameter"].get("name") for flow in sub["flows"]] == ["sub_a", None, None]
+    assert len(graph_settings["flows"]) == 7
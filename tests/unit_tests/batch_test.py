@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import pytest
+from langchain_core.runnables import RunnableLambda
+from kenkenpa.batch import MicroBatcher, batch_node
+
+def run_threads(func, inputs):
+    results = [None] * len(inputs)
+    errors = [None] * len(inputs)
+    barrier = threading.Barrier(len(inputs))
+
+    def work(index):
+        barrier.wait()
+        try:
+            results[index] = func(inputs[index])
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(len(inputs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+def test_micro_batcher_coalesces_calls():
+    batches = []
+
+    def batch_func(states, configs):
+        batches.append(list(states))
+        return [state * 2 for state in states]
+
+    batcher = MicroBatcher(batch_func, max_size=4, max_wait=1.0)
+    results, errors = run_threads(batcher, list(range(8)))
+
+    assert results == [i * 2 for i in range(8)]
+    assert errors == [None] * 8
+    assert sorted(len(batch) for batch in batches) == [4, 4]
+    assert batcher.batches == 2
+    assert batcher.calls == 8
+
+def test_micro_batcher_max_wait():
+    batcher = MicroBatcher(lambda states, configs: states, max_size=8, max_wait=0)
+    assert batcher(1) == 1
+    assert batcher(2) == 2
+    assert batcher.batches == 2
+
+def test_micro_batcher_errors():
+    def failing(states, configs):
+        raise ConnectionError("unavailable")
+
+    batcher = MicroBatcher(failing, max_size=3, max_wait=1.0)
+    _, errors = run_threads(batcher, [1, 2, 3])
+    assert all(isinstance(e, ConnectionError) for e in errors)
+
+    batcher = MicroBatcher(lambda states, configs: states[:1], max_size=2, max_wait=1.0)
+    _, errors = run_threads(batcher, [1, 2])
+    assert all(isinstance(e, ValueError) for e in errors)
+
+    with pytest.raises(ValueError):
+        MicroBatcher(failing, max_size=0)
+    with pytest.raises(ValueError):
+        MicroBatcher(failing, max_wait=-1)
+
+def test_batch_node():
+    class Embedder:
+        def __init__(self):
+            self.batches = []
+
+        def __call__(self, state):
+            return {"vector": [state["text"]]}
+
+        def batch(self, states):
+            self.batches.append(len(states))
+            return [{"vector": [state["text"]]} for state in states]
+
+    embedder = Embedder()
+    node = batch_node(embedder, "embed", max_size=3, max_wait=1.0)
+    results, _ = run_threads(node.invoke, [{"text": str(i)} for i in range(3)])
+    assert results == [{"vector": [str(i)]} for i in range(3)]
+    assert embedder.batches == [3]
+
+    async def gather():
+        return await asyncio.gather(*(node.ainvoke({"text": str(i)}) for i in range(3)))
+    assert asyncio.run(gather()) == [{"vector": [str(i)]} for i in range(3)]
+    assert embedder.batches == [3, 3]
+
+def test_batch_node_runnable():
+    runnable = RunnableLambda(lambda state: state + 1)
+    node = batch_node(runnable, "increment", max_size=2, max_wait=1.0)
+    results, _ = run_threads(node.invoke, [1, 2])
+    assert results == [2, 3]
+
+    with pytest.raises(ValueError):
+        batch_node(lambda state: state, "plain")
+
+def test_micro_batcher_async_callers_do_not_hold_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    batches = []
+
+    def batch_func(states, configs):
+        batches.append(len(states))
+        return states
+
+    batcher = MicroBatcher(batch_func, max_size=8, max_wait=1.0)
+
+    async def gather():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            asyncio.get_running_loop().set_default_executor(executor)
+            return await asyncio.gather(*(batcher.acall(i) for i in range(8)))
+
+    assert asyncio.run(gather()) == list(range(8))
+    assert batches == [8]
+
+def test_batch_node_configs_and_runtimes():
+    from typing import TypedDict
+    from langgraph.graph import StateGraph, START, END
+
+    class State(TypedDict):
+        text: str
+        answer: str
+
+    class Context(TypedDict):
+        user: str
+
+    class Classifier:
+        def __init__(self):
+            self.users = []
+            self.tags = []
+
+        def batch(self, states, configs, runtimes):
+            self.tags.extend(config["tags"] for config in configs)
+            self.users.extend(runtime.context["user"] for runtime in runtimes)
+            return [{"answer": state["text"].upper()} for state in states]
+
+    classifier = Classifier()
+    graph = StateGraph(State, context_schema=Context)
+    graph.add_node("classify", batch_node(classifier, "classify", max_size=2, max_wait=0))
+    graph.add_edge(START, "classify")
+    graph.add_edge("classify", END)
+    app = graph.compile()
+
+    result = app.invoke({"text": "hi"}, {"tags": ["batch"]}, context={"user": "alice"})
+    assert result["answer"] == "HI"
+    assert classifier.users == ["alice"]
+    assert "batch" in classifier.tags[0]
+
+    def states_only(states):
+        return states
+    assert batch_node(type("Node", (), {"batch": staticmethod(states_only)})(), "echo").invoke(1) == 1
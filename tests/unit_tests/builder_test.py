@@ -1,3 +1,6 @@
+import asyncio
+import subprocess
+import sys
 from typing_extensions import TypedDict
 from pydantic import BaseModel
 from kenkenpa.builder import StateGraphBuilder
@@ -600,4 +603,867 @@ def test_state_state_graph_graph_types_extract_literals():
     stategraph = test_builder.gen_stategraph()
 
     graph = stategraph.compile() 
-    graph.get_graph().print_ascii()
\ No newline at end of file
+    graph.get_graph().print_ascii()
+
+def test_state_state_graph_match_first():
+    def gen_append_node(factory_parameter,flow_parameter):
+        name = flow_parameter['name']
+        def append_node(state):
+            return {"visited": [name]}
+        return append_node
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"match_first",
+            "state" : [
+                {
+                    "field_name": "visited",
+                    "type": "list",
+                    "reducer":"reducer_a_key"
+                },
+            ],
+        },
+        "flows": [
+            {
+                "graph_type":"node",
+                "flow_parameter": {"name":"node_a","factory":"append_node"},
+            },
+            {
+                "graph_type":"node",
+                "flow_parameter": {"name":"node_b","factory":"append_node"},
+            },
+            {
+                "graph_type":"configurable_conditional_entry_point",
+                "flow_parameter":{
+                    "match":"first",
+                    "conditions":[
+                        {"expression": {"eq": [True, True]}, "result": "node_a"},
+                        {"expression": {"eq": [True, True]}, "result": "node_b"},
+                        {"default": "END"}
+                    ]
+                },
+            },
+            {
+                "graph_type":"configurable_conditional_edge",
+                "flow_parameter":{
+                    "start_key":"node_a",
+                    "match":"first",
+                    "conditions":[
+                        {"expression": {"eq": [True, True]}, "result": "END"},
+                        {"expression": {"eq": [True, True]}, "result": "node_b"},
+                        {"default": "node_b"}
+                    ]
+                },
+            },
+            {
+                "graph_type":"edge",
+                "flow_parameter": {"start_key":"node_b","end_key":"END"},
+            },
+        ]
+    }
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("append_node", gen_append_node)
+    test_builder.add_reducer("reducer_a_key", reducer_a)
+
+    graph = test_builder.gen_stategraph().compile()
+    assert graph.invoke({"visited": []}) == {"visited": ["node_a"]}
+
+def test_state_state_graph_add_impure_evaluete_function():
+    test_builder = StateGraphBuilder({
+        "graph_type":"stategraph",
+        "flow_parameter":{"name":"impure"},
+        "flows": [],
+    })
+
+    test_builder.add_evaluete_function("evaluate_fanc_a_key", evaluate_fanc_a)
+    test_builder.add_evaluete_function("evaluate_fanc_b_key", evaluate_fanc_b, pure=False)
+    assert test_builder.impure_evaluete_functions == {"evaluate_fanc_b_key"}
+
+    test_builder.add_evaluete_function("evaluate_fanc_b_key", evaluate_fanc_b)
+    assert test_builder.impure_evaluete_functions == set()
+
+def test_state_state_graph_async_evaluete_function():
+    import asyncio
+
+    def gen_append_node(factory_parameter,flow_parameter):
+        name = flow_parameter['name']
+        def append_node(state):
+            return {"visited": [name]}
+        return append_node
+
+    async def is_node_b(state, config, **kwargs):
+        await asyncio.sleep(0)
+        return config["configurable"].get("route") == "node_b"
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"async_evaluete_function",
+            "state" : [
+                {
+                    "field_name": "visited",
+                    "type": "list",
+                    "reducer":"reducer_a_key"
+                },
+            ],
+        },
+        "flows": [
+            {
+                "graph_type":"node",
+                "flow_parameter": {"name":"node_a","factory":"append_node"},
+            },
+            {
+                "graph_type":"node",
+                "flow_parameter": {"name":"node_b","factory":"append_node"},
+            },
+            {
+                "graph_type":"configurable_conditional_entry_point",
+                "flow_parameter":{
+                    "conditions":[
+                        {
+                            "expression": {"eq": [{"type": "function", "name": "is_node_b"}, True]},
+                            "result": "node_b"
+                        },
+                        {"default": "node_a"}
+                    ]
+                },
+            },
+            {
+                "graph_type":"edge",
+                "flow_parameter": {"start_key":["node_a","node_b"],"end_key":"END"},
+            },
+        ]
+    }
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("append_node", gen_append_node)
+    test_builder.add_reducer("reducer_a_key", reducer_a)
+    test_builder.add_evaluete_function("is_node_b", is_node_b)
+
+    graph = test_builder.gen_stategraph().compile()
+    config = {"configurable": {"route": "node_b"}}
+    assert asyncio.run(graph.ainvoke({"visited": []}, config)) == {"visited": ["node_b"]}
+    assert graph.invoke({"visited": []}, config) == {"visited": ["node_b"]}
+    assert graph.invoke({"visited": []}) == {"visited": ["node_a"]}
+
+def test_state_state_graph_parallel_factories():
+    import asyncio
+    import threading
+
+    barrier = threading.Barrier(4, timeout=5)
+
+    def gen_append_node(factory_parameter,flow_parameter):
+        # Every factory waits for the others, so this only completes when they run concurrently.
+        barrier.wait()
+        name = flow_parameter['name']
+        def append_node(state):
+            return {"visited": [name]}
+        return append_node
+
+    async def agen_append_node(factory_parameter,flow_parameter):
+        await asyncio.sleep(0)
+        return gen_append_node(factory_parameter,flow_parameter)
+
+    def node_flow(name, factory="append_node"):
+        return {
+            "graph_type":"node",
+            "flow_parameter": {"name":name,"factory":factory},
+        }
+
+    state = [{"field_name": "visited", "type": "list", "reducer":"reducer_a_key"}]
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{"name":"parallel_factories","state" : state},
+        "flows": [
+            node_flow("node_a"),
+            node_flow("node_b", "async_append_node"),
+            {
+                "graph_type":"stategraph",
+                "flow_parameter":{"name":"subgraph","state" : state},
+                "flows": [
+                    node_flow("node_c"),
+                    node_flow("node_d"),
+                    {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"node_c"}},
+                    {"graph_type":"edge","flow_parameter": {"start_key":"node_c","end_key":"node_d"}},
+                    {"graph_type":"edge","flow_parameter": {"start_key":"node_d","end_key":"END"}},
+                ]
+            },
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"node_a"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"node_a","end_key":"node_b"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"node_b","end_key":"subgraph"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"subgraph","end_key":"END"}},
+        ]
+    }
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("append_node", gen_append_node)
+    test_builder.add_node_factory("async_append_node", agen_append_node)
+    test_builder.add_reducer("reducer_a_key", reducer_a)
+
+    stategraph = test_builder.gen_stategraph(parallel_factories=True, max_workers=4)
+    assert list(stategraph.nodes) == ["node_a", "node_b", "subgraph"]
+    assert test_builder._prebuilt_nodes == {}
+
+    graph = stategraph.compile()
+    # The subgraph returns its whole state, which the parent reducer appends.
+    assert graph.invoke({"visited": []}) == {
+        "visited": ["node_a", "node_b", "node_a", "node_b", "node_c", "node_d"]
+        }
+
+def test_state_state_graph_parallel_factories_error():
+    import pytest
+
+    def gen_error_node(factory_parameter,flow_parameter):
+        raise RuntimeError(flow_parameter['name'])
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{"name":"parallel_factories_error"},
+        "flows": [
+            {"graph_type":"node","flow_parameter": {"name":"node_a","factory":"node_factory_a_key"}},
+            {"graph_type":"node","flow_parameter": {"name":"node_b","factory":"error_node"}},
+        ]
+    }
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("node_factory_a_key", node_factory_a)
+    test_builder.add_node_factory("error_node", gen_error_node)
+
+    with pytest.raises(RuntimeError, match="node_b"):
+        test_builder.gen_stategraph(parallel_factories=True)
+
+def test_state_state_graph_build_report():
+    def node_flow(name):
+        return {
+            "graph_type":"node",
+            "flow_parameter": {"name":name,"factory":"node_factory_a_key"},
+        }
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{"name":"build_report"},
+        "flows": [
+            node_flow("node_a"),
+            {
+                "graph_type":"stategraph",
+                "flow_parameter":{"name":"subgraph"},
+                "flows": [
+                    node_flow("node_b"),
+                    {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"node_b"}},
+                ]
+            },
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"node_a"}},
+        ]
+    }
+
+    for parallel_factories in (False, True):
+        hooked = []
+        test_builder = StateGraphBuilder(graph_settings, build_hook=hooked.append)
+        test_builder.add_node_factory("node_factory_a_key", node_factory_a)
+        test_builder.gen_stategraph(parallel_factories=parallel_factories)
+
+        report = test_builder.build_report
+        assert hooked == report.records
+        assert all(entry["seconds"] >= 0 for entry in report.records)
+
+        records = sorted(
+            (entry["phase"], entry["path"], entry["name"]) for entry in report.records
+        )
+        assert records == sorted([
+            ("validate", ("build_report",), "build_report"),
+            ("gen_state", ("build_report",), "build_report"),
+            ("gen_state", ("build_report", "subgraph"), "subgraph"),
+            ("node_factory", ("build_report",), "node_a"),
+            ("node_factory", ("build_report", "subgraph"), "node_b"),
+            ("gen_stategraph", ("build_report",), "build_report"),
+            ("gen_stategraph", ("build_report", "subgraph"), "subgraph"),
+            ("compile", ("build_report", "subgraph"), "subgraph"),
+            ("build", ("build_report",), "build_report"),
+        ])
+        assert report.filter("node_factory")[0]["factory"] == "node_factory_a_key"
+        assert report.filter("build")[0]["cached"] is False
+        assert sorted(entry["name"] for entry in report.filter(path=("build_report", "subgraph"))) \
+            == ["node_b", "subgraph", "subgraph", "subgraph"]
+
+def test_state_state_graph_routing_metrics():
+    from kenkenpa.instrumentation import RoutingMetrics
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"routing_metrics",
+            "state":[{"field_name": "value", "type": "int"}],
+        },
+        "flows": [
+            {"graph_type":"node","flow_parameter": {"name":"node_a","factory":"node_factory_a_key"}},
+            {
+                "graph_type":"configurable_conditional_entry_point",
+                "flow_parameter":{
+                    "conditions":[
+                        {
+                            "expression": {"eq": [{"type": "state_value", "name": "value"}, 1]},
+                            "result": "node_a"
+                        },
+                        {"default": "END"}
+                    ]
+                },
+            },
+            {
+                "graph_type":"configurable_conditional_edge",
+                "flow_parameter":{
+                    "start_key":"node_a",
+                    "conditions":[{"default": "END"}]
+                },
+            },
+        ]
+    }
+
+    metrics = RoutingMetrics()
+    test_builder = StateGraphBuilder(graph_settings, routing_metrics=metrics)
+    test_builder.add_node_factory("node_factory_a_key", node_factory_a)
+    graph = test_builder.gen_stategraph().compile()
+
+    graph.invoke({"value": 1})
+    graph.invoke({"value": 2})
+
+    snapshot = metrics.snapshot()
+    assert snapshot["routing_metrics/START"]["decisions"] == 2
+    assert snapshot["routing_metrics/START"]["matches"] == {0: 1}
+    assert snapshot["routing_metrics/START"]["default_taken"] == 1
+    assert snapshot["routing_metrics/node_a"]["default_taken"] == 1
+
+def test_state_state_graph_incremental_edge():
+    calls = []
+
+    def has_messages(state, config, **kwargs):
+        calls.append(1)
+        return bool(state["messages"])
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"incremental",
+            "state":[
+                {"field_name": "messages", "type": "list"},
+                {"field_name": "count", "type": "int"},
+            ],
+        },
+        "flows": [
+            {"graph_type":"node","flow_parameter": {"name":"node_a","factory":"count_node"}},
+            {"graph_type":"node","flow_parameter": {"name":"node_b","factory":"count_node"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"node_a"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"node_b","end_key":"END"}},
+            {
+                "graph_type":"configurable_conditional_edge",
+                "flow_parameter":{
+                    "start_key":"node_a",
+                    "incremental":True,
+                    "conditions":[
+                        {
+                            "expression": {"eq": [{"type": "function", "name": "has_messages"}, True]},
+                            "result": "node_b"
+                        },
+                        {"default": "END"}
+                    ]
+                },
+            },
+        ]
+    }
+
+    def gen_count_node(factory_parameter,flow_parameter):
+        def count_node(state):
+            return {"count": state["count"] + 1}
+        return count_node
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("count_node", gen_count_node)
+    test_builder.add_evaluete_function("has_messages", has_messages, state_keys=["messages"])
+    graph = test_builder.gen_stategraph().compile()
+
+    messages = ["a"]
+    assert graph.invoke({"messages": messages, "count": 0})["count"] == 2
+    assert graph.invoke({"messages": messages, "count": 5})["count"] == 7
+    assert len(calls) == 1
+    assert graph.invoke({"messages": [], "count": 0})["count"] == 1
+    assert len(calls) == 2
+
+def test_state_state_graph_specialize_config():
+    calls = []
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"specialize",
+            "state":[
+                {"field_name": "visited", "type": "list", "reducer": "add"},
+            ],
+        },
+        "flows": [
+            {"graph_type":"node","flow_parameter": {"name":"fast_node","factory":"visit_node"}},
+            {"graph_type":"node","flow_parameter": {"name":"slow_node","factory":"visit_node"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":["fast_node","slow_node"],"end_key":"END"}},
+            {
+                "graph_type":"configurable_conditional_entry_point",
+                "flow_parameter":{
+                    "conditions":[
+                        {
+                            "expression": {"eq": [{"type": "config_value", "name": "mode"}, "fast"]},
+                            "result": "fast_node"
+                        },
+                        {"default": "slow_node"}
+                    ]
+                },
+            },
+        ]
+    }
+
+    def gen_visit_node(factory_parameter,flow_parameter):
+        calls.append(flow_parameter["name"])
+        def visit_node(state):
+            return {"visited": [flow_parameter["name"]]}
+        return visit_node
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("visit_node", gen_visit_node)
+    test_builder.add_reducer("add", lambda left, right: (left or []) + right)
+    graph = test_builder.gen_stategraph(specialize_config={"mode": "fast"}).compile()
+
+    assert calls == ["fast_node"]
+    assert set(graph.get_graph().nodes) == {"__start__", "fast_node", "__end__"}
+    assert graph.invoke({"visited": []}, {"configurable": {"mode": "slow"}})["visited"] == ["fast_node"]
+    assert test_builder.build_report.filter(phase="specialize")
+
+    graph = test_builder.gen_stategraph(specialize_config={"mode": "slow"}, prune_unreachable=False).compile()
+    assert set(graph.get_graph().nodes) == {"__start__", "fast_node", "slow_node", "__end__"}
+    assert graph.invoke({"visited": []})["visited"] == ["slow_node"]
+
+def test_state_state_graph_skip_unreachable():
+    calls = []
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"skip_unreachable",
+            "state":[
+                {"field_name": "messages", "type": "list"},
+            ],
+        },
+        "flows": [
+            {"graph_type":"node","flow_parameter": {"name":"node_a","factory":"record_node"}},
+            {"graph_type":"node","flow_parameter": {"name":"node_dead","factory":"record_node"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"node_a"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":["node_a","node_dead"],"end_key":"END"}},
+        ]
+    }
+
+    def gen_record_node(factory_parameter,flow_parameter):
+        calls.append(flow_parameter["name"])
+        def record_node(state):
+            return
+        return record_node
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("record_node", gen_record_node)
+    assert test_builder.analyze_reachability().unreachable_nodes == [(("skip_unreachable",), "node_dead")]
+
+    graph = test_builder.gen_stategraph(skip_unreachable=True).compile()
+    assert calls == ["node_a"]
+    assert set(graph.get_graph().nodes) == {"__start__", "node_a", "__end__"}
+
+    calls.clear()
+    test_builder.gen_stategraph()
+    assert calls == ["node_a", "node_dead"]
+
+def test_import_is_lazy():
+    code = (
+        "import sys, kenkenpa.builder, kenkenpa.param;"
+        "print(sorted(m for m in sys.modules if m.startswith(("
+        "'pydantic', 'langgraph.graph', 'langchain_core', 'kenkenpa.models'))))"
+    )
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == "[]"
+
+def test_state_state_graph_node_cache():
+    calls = []
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"node_cache",
+            "state":[
+                {"field_name": "query", "type": "str"},
+                {"field_name": "answer", "type": "str"},
+            ],
+        },
+        "flows": [
+            {
+                "graph_type":"node",
+                "flow_parameter": {
+                    "name":"retriever",
+                    "factory":"retriever",
+                    "cache": {"keys": ["query"], "ttl": 60, "maxsize": 8},
+                },
+            },
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"retriever"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"retriever","end_key":"END"}},
+        ]
+    }
+
+    def gen_retriever(factory_parameter,flow_parameter):
+        def retriever(state, config):
+            calls.append(state["query"])
+            return {"answer": state["query"] * 2}
+        return retriever
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("retriever", gen_retriever)
+    graph = test_builder.gen_stategraph().compile()
+
+    assert graph.invoke({"query": "a"})["answer"] == "aa"
+    assert graph.invoke({"query": "a", "answer": "old"})["answer"] == "aa"
+    assert graph.invoke({"query": "b"})["answer"] == "bb"
+    assert calls == ["a", "b"]
+    stats = test_builder.node_cache_stats()["node_cache/retriever"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+def test_state_state_graph_node_policies():
+    attempts = []
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"node_policies",
+            "state":[
+                {"field_name": "count", "type": "int"},
+            ],
+        },
+        "flows": [
+            {
+                "graph_type":"node",
+                "flow_parameter": {
+                    "name":"flaky",
+                    "factory":"flaky",
+                    "timeout": 1,
+                    "max_concurrency": 1,
+                    "retry": {"attempts": 3, "backoff": 0, "jitter": False},
+                },
+            },
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"flaky"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"flaky","end_key":"END"}},
+        ]
+    }
+
+    def gen_flaky(factory_parameter,flow_parameter):
+        def flaky(state):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("unavailable")
+            return {"count": state["count"] + 1}
+        return flaky
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("flaky", gen_flaky)
+    graph = test_builder.gen_stategraph().compile()
+
+    assert graph.invoke({"count": 0})["count"] == 1
+    assert len(attempts) == 3
+
+    attempts.clear()
+    attempts.extend([1, 1])
+    assert asyncio.run(graph.ainvoke({"count": 1}))["count"] == 2
+
+def test_state_state_graph_node_batch():
+    import pytest
+
+    batches = []
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"node_batch",
+            "state":[
+                {"field_name": "text", "type": "str"},
+                {"field_name": "length", "type": "int"},
+            ],
+        },
+        "flows": [
+            {
+                "graph_type":"node",
+                "flow_parameter": {
+                    "name":"measure",
+                    "factory":"measure",
+                    "batch": {"max_size": 4, "max_wait_ms": 1000},
+                },
+            },
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"measure"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"measure","end_key":"END"}},
+        ]
+    }
+
+    class Measure:
+        def __call__(self, state):
+            return {"length": len(state["text"])}
+
+        def batch(self, states):
+            batches.append(len(states))
+            return [{"length": len(state["text"])} for state in states]
+
+    def gen_measure(factory_parameter,flow_parameter):
+        return Measure()
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("measure", gen_measure)
+    graph = test_builder.gen_stategraph().compile()
+
+    inputs = [{"text": "a" * i} for i in range(4)]
+    outputs = graph.batch(inputs)
+    assert [output["length"] for output in outputs] == [0, 1, 2, 3]
+    assert batches == [4]
+
+    def gen_plain(factory_parameter,flow_parameter):
+        return lambda state: state
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("measure", gen_plain)
+    with pytest.raises(ValueError, match="measure"):
+        test_builder.gen_stategraph()
+
+def test_state_state_graph_node_metrics():
+    import pytest
+    from kenkenpa.instrumentation import NodeMetrics
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"node_metrics",
+            "state":[
+                {"field_name": "count", "type": "int"},
+            ],
+        },
+        "flows": [
+            {"graph_type":"node","flow_parameter": {"name":"increment","factory":"increment"}},
+            {
+                "graph_type":"stategraph",
+                "flow_parameter":{
+                    "name":"sub",
+                    "state":[
+                        {"field_name": "count", "type": "int"},
+                    ],
+                },
+                "flows":[
+                    {"graph_type":"node","flow_parameter": {"name":"double","factory":"double"}},
+                    {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"double"}},
+                    {"graph_type":"edge","flow_parameter": {"start_key":"double","end_key":"END"}},
+                ]
+            },
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"increment"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"increment","end_key":"sub"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"sub","end_key":"END"}},
+        ]
+    }
+
+    def gen_increment(factory_parameter,flow_parameter):
+        def increment(state):
+            if state["count"] < 0:
+                raise ValueError("negative")
+            return {"count": state["count"] + 1}
+        return increment
+
+    def gen_double(factory_parameter,flow_parameter):
+        async def double(state):
+            return {"count": state["count"] * 2}
+        return double
+
+    metrics = NodeMetrics()
+    test_builder = StateGraphBuilder(graph_settings, node_metrics=metrics)
+    test_builder.add_node_factory("increment", gen_increment)
+    test_builder.add_node_factory("double", gen_double)
+    graph = test_builder.gen_stategraph().compile()
+    assert [name for name, _ in graph.get_subgraphs()] == ["sub"]
+
+    assert asyncio.run(graph.ainvoke({"count": 1}))["count"] == 4
+
+    async def stream():
+        return [chunk async for chunk in graph.astream({"count": 2}, subgraphs=True)]
+    chunks = asyncio.run(stream())
+    assert any(namespace for namespace, _ in chunks)
+    assert chunks[-1][1]["sub"]["count"] == 6
+    with pytest.raises(ValueError):
+        asyncio.run(graph.ainvoke({"count": -1}))
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot) == {"node_metrics/increment", "node_metrics/sub", "node_metrics/sub/double"}
+    assert snapshot["node_metrics/increment"]["calls"] == 3
+    assert snapshot["node_metrics/increment"]["exceptions"] == {"ValueError": 1}
+    assert snapshot["node_metrics/sub"]["calls"] == 2
+    assert snapshot["node_metrics/sub"]["graph"] == "node_metrics"
+    assert snapshot["node_metrics/sub/double"]["calls"] == 2
+    assert snapshot["node_metrics/sub/double"]["output_size"]["sum"] == 2
+
+def test_state_state_graph_builtin_reducers():
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"builtin_reducers",
+            "state":[
+                {"field_name": "history", "type": "list", "reducer": "keep_last", "reducer_args": {"n": 3}},
+                {"field_name": "peak", "type": "int", "reducer": "max"},
+                {"field_name": "turn", "type": "int"},
+            ],
+        },
+        "flows": [
+            {"graph_type":"node","flow_parameter": {"name":"talk","factory":"talk"}},
+            {
+                "graph_type":"configurable_conditional_edge",
+                "flow_parameter":{
+                    "start_key":"talk",
+                    "conditions":[
+                        {
+                            "expression": {"lt": [{"type": "state_value", "name": "turn"}, 5]},
+                            "result": "talk",
+                        },
+                        {"default": "END"},
+                    ],
+                },
+            },
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"talk"}},
+        ]
+    }
+
+    def gen_talk(factory_parameter,flow_parameter):
+        def talk(state):
+            turn = state.get("turn", 0) + 1
+            return {"history": f"message {turn}", "peak": turn % 3, "turn": turn}
+        return talk
+
+    test_builder = StateGraphBuilder(graph_settings)
+    test_builder.add_node_factory("talk", gen_talk)
+    graph = test_builder.gen_stategraph().compile()
+
+    result = graph.invoke({"turn": 0})
+    assert result["history"] == ["message 3", "message 4", "message 5"]
+    assert result["peak"] == 2
+
+def run_injected_node(node_settings, make_node=None, **builder_kwargs):
+    from typing_extensions import TypedDict
+    from langgraph.runtime import Runtime
+    from langgraph.types import StreamWriter
+
+    class Context(TypedDict):
+        user: str
+
+    def inject(state, runtime: Runtime[Context], writer: StreamWriter):
+        writer({"user": runtime.context["user"]})
+        return {"answer": f"{state['query']} for {runtime.context['user']}"}
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"injected",
+            "state":[
+                {"field_name": "query", "type": "str"},
+                {"field_name": "answer", "type": "str"},
+            ],
+        },
+        "flows": [
+            {
+                "graph_type":"node",
+                "flow_parameter": {"name":"inject", "factory":"inject", **node_settings},
+            },
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"inject"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"inject","end_key":"END"}},
+        ]
+    }
+
+    def gen_inject(factory_parameter,flow_parameter):
+        return make_node(inject) if make_node else inject
+
+    test_builder = StateGraphBuilder(graph_settings, config_schema=Context, **builder_kwargs)
+    test_builder.add_node_factory("inject", gen_inject)
+    graph = test_builder.gen_stategraph().compile()
+
+    chunks = list(graph.stream(
+        {"query": "q"}, context={"user": "alice"}, stream_mode=["custom", "values"]))
+    custom = [chunk for mode, chunk in chunks if mode == "custom"]
+    return chunks[-1][1]["answer"], custom
+
+def test_state_state_graph_node_cache_injection():
+    answer, custom = run_injected_node({"cache": {"keys": ["query"]}})
+    assert answer == "q for alice"
+    assert custom == [{"user": "alice"}]
+
+def test_state_state_graph_node_policies_injection():
+    answer, custom = run_injected_node({"timeout": 5, "max_concurrency": 2, "retry": {"attempts": 2}})
+    assert answer == "q for alice"
+    assert custom == [{"user": "alice"}]
+
+def test_state_state_graph_node_metrics_injection():
+    from kenkenpa.instrumentation import NodeMetrics
+
+    node_metrics = NodeMetrics()
+    answer, custom = run_injected_node({}, node_metrics=node_metrics)
+    assert answer == "q for alice"
+    assert custom == [{"user": "alice"}]
+    assert node_metrics.snapshot()["injected/inject"]["calls"] == 1
+
+def run_private_input_node(node_settings, make_node=None, **builder_kwargs):
+    from typing_extensions import TypedDict
+
+    class Private(TypedDict):
+        secret: str
+
+    def write(state):
+        return {"secret": "s"}
+
+    def reader(state: Private):
+        return {"answer": f"got {state['secret']}"}
+
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"private",
+            "state":[
+                {"field_name": "query", "type": "str"},
+                {"field_name": "answer", "type": "str"},
+            ],
+        },
+        "flows": [
+            {"graph_type":"node","flow_parameter": {"name":"write", "factory":"write"}},
+            {
+                "graph_type":"node",
+                "flow_parameter": {"name":"reader", "factory":"reader", **node_settings},
+            },
+            {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"write"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"write","end_key":"reader"}},
+            {"graph_type":"edge","flow_parameter": {"start_key":"reader","end_key":"END"}},
+        ]
+    }
+
+    test_builder = StateGraphBuilder(graph_settings, **builder_kwargs)
+    test_builder.add_node_factory("write", lambda factory_parameter,flow_parameter: write)
+    test_builder.add_node_factory(
+        "reader", lambda factory_parameter,flow_parameter: make_node(reader) if make_node else reader)
+    graph = test_builder.gen_stategraph().compile()
+    return graph.invoke({"query": "q"})["answer"]
+
+def test_state_state_graph_node_metrics_private_input():
+    from kenkenpa.instrumentation import NodeMetrics
+
+    assert run_private_input_node({}) == "got s"
+    assert run_private_input_node({}, node_metrics=NodeMetrics()) == "got s"
+
+def test_state_state_graph_node_cache_private_input():
+    assert run_private_input_node({"cache": {"keys": ["query"]}}) == "got s"
+
+def test_state_state_graph_node_policies_private_input():
+    assert run_private_input_node({"timeout": 5}) == "got s"
+    assert run_private_input_node({"max_concurrency": 2}) == "got s"
+
+def test_state_state_graph_node_batch_private_input():
+    def make_node(reader):
+        reader.batch = lambda states: [reader(state) for state in states]
+        return reader
+    assert run_private_input_node({"batch": {"max_size": 2, "max_wait_ms": 0}}, make_node) == "got s"
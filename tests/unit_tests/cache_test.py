@@ -0,0 +1,354 @@
+import pytest
+from kenkenpa.builder import StateGraphBuilder
+import gc
+import threading
+import time
+from kenkenpa.cache import GraphCache, NodeOutputCache, NodePool, settings_digest, registry_key
+
+def node_factory_a(factory_parameter,flow_parameter):
+    def node_a(state):
+        return
+    return node_a
+
+def node_factory_b(factory_parameter,flow_parameter):
+    def node_b(state):
+        return
+    return node_b
+
+graph_settings = {
+    "graph_type":"stategraph",
+    "flow_parameter":{
+        "name":"cache_test",
+        "state" : [
+            {
+                "field_name": "test_field",
+                "type": "str",
+            },
+        ],
+    },
+    "flows": [
+        {
+            "graph_type":"node",
+            "flow_parameter": {
+                "name":"test_node_a",
+                "factory":"node_factory_key",
+            },
+            "factory_parameter" : {"node_secret":"I'm A"},
+        },
+        {
+            "graph_type":"edge",
+            "flow_parameter":{
+                "start_key":"START",
+                "end_key":"test_node_a"
+            },
+        },
+        {
+            "graph_type":"edge",
+            "flow_parameter": {
+                "start_key":"test_node_a",
+                "end_key":"END"
+            },
+        },
+    ]
+}
+
+def test_settings_digest():
+    settings_a = {"a": 1, "b": [1, 2, {"c": None}]}
+    settings_b = {"b": [1, 2, {"c": None}], "a": 1}
+    assert settings_digest(settings_a) == settings_digest(settings_b)
+    assert settings_digest(settings_a) != settings_digest({"a": 2, "b": [1, 2, {"c": None}]})
+
+    with pytest.raises(TypeError):
+        settings_digest({"a": object()})
+
+def test_registry_key():
+    assert registry_key({"a": node_factory_a}, None) == registry_key({"a": node_factory_a}, {})
+    assert registry_key({"a": node_factory_a}) != registry_key({"a": node_factory_b})
+    assert registry_key({"a": node_factory_a}) != registry_key({"b": node_factory_a})
+
+def test_graph_cache_lru():
+    cache = GraphCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "size": 2, "maxsize": 2}
+
+    assert cache.get_or_build("d", lambda: 4) == 4
+    assert cache.get_or_build("d", lambda: 5) == 4
+    assert len(cache) == 2
+
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "maxsize": 2}
+
+    with pytest.raises(ValueError):
+        GraphCache(maxsize=0)
+
+def test_builder_with_graph_cache():
+    cache = GraphCache()
+
+    builder_a = StateGraphBuilder(graph_settings, graph_cache=cache)
+    builder_a.add_node_factory("node_factory_key", node_factory_a)
+    stategraph_a = builder_a.gen_stategraph()
+
+    builder_b = StateGraphBuilder(graph_settings, graph_cache=cache)
+    builder_b.add_node_factory("node_factory_key", node_factory_a)
+    stategraph_b = builder_b.gen_stategraph()
+
+    assert stategraph_a is stategraph_b
+    assert builder_a.custom_state is builder_b.custom_state
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # A different factory produces a different graph.
+    builder_c = StateGraphBuilder(graph_settings, graph_cache=cache)
+    builder_c.add_node_factory("node_factory_key", node_factory_b)
+    stategraph_c = builder_c.gen_stategraph()
+
+    assert stategraph_c is not stategraph_a
+    assert cache.stats()["misses"] == 2
+
+    stategraph_c.compile()
+
+def test_builder_with_graph_cache_node_pool():
+    cache = GraphCache()
+
+    def build(node_pool, shared):
+        builder = StateGraphBuilder(graph_settings, graph_cache=cache, node_pool=node_pool)
+        builder.add_node_factory("node_factory_key", node_factory_a, shared=shared)
+        return builder.gen_stategraph()
+
+    pool_a = NodePool()
+    pool_b = NodePool()
+    stategraph = build(pool_a, True)
+    assert build(pool_a, True) is stategraph
+    assert build(pool_b, True) is not stategraph
+    assert build(pool_a, False) is not stategraph
+    assert cache.stats()["misses"] == 3
+
+def test_builder_with_graph_cache_skips_validation(monkeypatch):
+    cache = GraphCache()
+    StateGraphBuilder(graph_settings, graph_cache=cache)
+
+    def fail_validation(values):
+        raise AssertionError("validated twice")
+
+    monkeypatch.setattr("kenkenpa.builder.validate_state_graph", fail_validation)
+    StateGraphBuilder(graph_settings, graph_cache=cache)
+
+class Node:
+    def __init__(self,secret):
+        self.secret = secret
+
+    def __call__(self,state):
+        return
+
+def test_node_pool():
+    pool = NodePool()
+    calls = []
+
+    def create():
+        calls.append(1)
+        return Node("a")
+
+    node_1 = pool.get_or_create("key", create)
+    node_2 = pool.get_or_create("key", create)
+    assert node_1 is node_2
+    assert len(calls) == 1
+    assert pool.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    # evicted once no longer referenced
+    del node_1, node_2
+    gc.collect()
+    assert len(pool) == 0
+    pool.get_or_create("key", create)
+    assert len(calls) == 2
+
+def test_node_pool_single_flight():
+    pool = NodePool()
+    calls = []
+
+    def create():
+        calls.append(1)
+        time.sleep(0.05)
+        return Node("a")
+
+    nodes = []
+    threads = [
+        threading.Thread(target=lambda: nodes.append(pool.get_or_create("key", create)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(node is nodes[0] for node in nodes)
+
+def test_node_pool_single_flight_after_error():
+    pool = NodePool()
+    active = []
+    overlaps = []
+    failed = []
+
+    def create():
+        active.append(1)
+        overlaps.append(len(active))
+        try:
+            time.sleep(0.1)
+            if not failed:
+                failed.append(1)
+                raise ConnectionError("unavailable")
+            return Node("a")
+        finally:
+            active.pop()
+
+    nodes = []
+
+    def get():
+        try:
+            nodes.append(pool.get_or_create("key", create))
+        except ConnectionError:
+            pass
+
+    # the first call fails while the second waits, and the third arrives
+    # while the second is creating the node after the failure.
+    threads = []
+    for delay in (0, 0.03, 0.15):
+        time.sleep(delay)
+        threads.append(threading.Thread(target=get))
+        threads[-1].start()
+    for thread in threads:
+        thread.join()
+
+    assert max(overlaps) == 1
+    assert pool.misses == 1
+    assert len(nodes) == 2 and nodes[0] is nodes[1]
+    assert len(pool._key_locks) == 0
+
+def test_node_pool_unreferenceable():
+    pool = NodePool()
+    node = Node("a")
+
+    # bound methods are held weakly, and pooled while a graph references them
+    method = pool.get_or_create("key", lambda: node.__call__)
+    assert pool.get_or_create("key", lambda: None) is method
+    assert pool.stats()["misses"] == 1
+
+    # objects without weak reference support are not pooled
+    assert pool.get_or_create("dict", lambda: {"a": 1}) == {"a": 1}
+    assert pool.get_or_create("dict", lambda: {"b": 1}) == {"b": 1}
+    assert len(pool) == 1
+
+def test_state_graph_builder_shared_node_factory():
+    calls = []
+
+    def node_factory(factory_parameter,flow_parameter):
+        calls.append(factory_parameter)
+        return Node(factory_parameter["node_secret"])
+
+    pool = NodePool()
+    settings = {
+        **graph_settings,
+        "flows": graph_settings["flows"] + [
+            {
+                "graph_type":"node",
+                "flow_parameter": {
+                    "name":"test_node_b",
+                    "factory":"node_factory_key",
+                },
+                "factory_parameter" : {"node_secret":"I'm A"},
+            },
+            {
+                "graph_type":"node",
+                "flow_parameter": {
+                    "name":"test_node_c",
+                    "factory":"node_factory_key",
+                },
+                "factory_parameter" : {"node_secret":"I'm C"},
+            },
+        ],
+    }
+
+    builder_1 = StateGraphBuilder(settings, node_pool=pool)
+    builder_1.add_node_factory("node_factory_key", node_factory, shared=True)
+    stategraph_1 = builder_1.gen_stategraph()
+
+    builder_2 = StateGraphBuilder(settings, node_pool=pool)
+    builder_2.add_node_factory("node_factory_key", node_factory, shared=True)
+    stategraph_2 = builder_2.gen_stategraph()
+
+    assert calls == [{"node_secret":"I'm A"}, {"node_secret":"I'm C"}]
+    assert len(pool) == 2
+    node_a = stategraph_1.nodes["test_node_a"].runnable.func
+    assert stategraph_1.nodes["test_node_b"].runnable.func is node_a
+    assert stategraph_2.nodes["test_node_a"].runnable.func is node_a
+
+    # not shared by default
+    builder_3 = StateGraphBuilder(settings, node_pool=pool)
+    builder_3.add_node_factory("node_factory_key", node_factory)
+    builder_3.gen_stategraph()
+    assert len(calls) == 5
+
+def test_node_output_cache():
+    calls = []
+
+    def node(state, config):
+        calls.append(state["query"])
+        return {"answer": state["query"].upper()}
+
+    node_cache = NodeOutputCache(["query", "history"], maxsize=2)
+    cached_node = node_cache.wrap(node)
+
+    assert cached_node.invoke({"query": "a", "history": ["x"], "other": 1}) == {"answer": "A"}
+    assert cached_node.invoke({"query": "a", "history": ["x"], "other": 2}) == {"answer": "A"}
+    assert calls == ["a"]
+    assert cached_node.invoke({"query": "a", "history": ["y"]}) == {"answer": "A"}
+    assert calls == ["a", "a"]
+
+    cached_node.invoke({"query": "b", "history": []})
+    assert node_cache.stats() == {
+        "hits": 1, "misses": 3, "evictions": 1, "expirations": 0, "size": 2, "maxsize": 2,
+    }
+
+    # unhashable values that cannot be converted are not cached.
+    class Unhashable:
+        __hash__ = None
+    cached_node.invoke({"query": "c", "history": Unhashable()})
+    cached_node.invoke({"query": "c", "history": Unhashable()})
+    assert calls[-2:] == ["c", "c"]
+
+    with pytest.raises(ValueError):
+        NodeOutputCache(["query"], ttl=0)
+
+def test_node_output_cache_ttl():
+    node_cache = NodeOutputCache(["query"], ttl=0.05)
+    cached_node = node_cache.wrap(lambda state: {"answer": time.perf_counter()})
+
+    first = cached_node.invoke({"query": "a"})
+    assert cached_node.invoke({"query": "a"}) == first
+    time.sleep(0.06)
+    assert cached_node.invoke({"query": "a"}) != first
+    assert node_cache.stats()["expirations"] == 1
+
+def test_node_output_cache_async():
+    import asyncio
+    calls = []
+
+    async def node(state):
+        calls.append(state["query"])
+        return {"answer": state["query"]}
+
+    cached_node = NodeOutputCache(["query"]).wrap(node)
+
+    async def run():
+        await cached_node.ainvoke({"query": "a"})
+        return await cached_node.ainvoke({"query": "a"})
+
+    assert asyncio.run(run()) == {"answer": "a"}
+    assert calls == ["a"]
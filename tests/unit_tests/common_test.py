@@ -1,4 +1,5 @@
-from kenkenpa.common import convert_key, to_list_key
+import pytest
+from kenkenpa.common import convert_key, freeze, to_list_key
 
 def test_convert_key_start():
     assert convert_key('START') == '__start__'
@@ -16,4 +17,12 @@ def test_to_list_key_single_list():
     assert to_list_key(['any_key']) == ['any_key']
 
 def test_to_list_key_mixed_list():
-    assert to_list_key(['START', 'any_key', 'END']) == ['__start__', 'any_key', '__end__']
\ No newline at end of file
+    assert to_list_key(['START', 'any_key', 'END']) == ['__start__', 'any_key', '__end__']
+
+def test_freeze():
+    assert freeze({"a": [1, {2}]}) == freeze({"a": [1, {2}]})
+    assert hash(freeze({"a": [1, {2}]}))
+    assert freeze(1) != freeze(True) != freeze(1.0)
+    assert freeze([1]) != freeze((1,))
+    with pytest.raises(TypeError):
+        freeze([object.__new__(type("Unhashable", (), {"__hash__": None}))])
@@ -2,6 +2,7 @@ import pytest
 from typing_extensions import TypedDict
 from langgraph.types import Send
 from kenkenpa.edges import ConfigurableConditionalHandler
+from kenkenpa.edges import _detect_switch
 
 class DummyType(TypedDict):
     dummy: str
@@ -295,4 +296,738 @@ def test_handler_call():
 
     handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
 
-    assert handler.__call__({}, {}) == ["Result_Value"]
\ No newline at end of file
+    assert handler.__call__({}, {}) == ["Result_Value"]
+
+def test_handler_compiles_conditions_on_init():
+    conditions = [
+        {
+            "expression": {"error_op": [10, 10]},
+            "result": "Result_Value"
+        },
+    ]
+
+    exc_info = pytest.raises(ValueError, ConfigurableConditionalHandler, conditions, {})
+    assert str(exc_info.value) == "Unsupported operation: error_op"
+
+    conditions = [
+        {
+            "expression": {"eq": [{"type": "error_type", "name": "value"}, 10]},
+            "result": "Result_Value"
+        },
+    ]
+
+    exc_info = pytest.raises(ValueError, ConfigurableConditionalHandler, conditions, {})
+    assert str(exc_info.value) == "Unsupported type: error_type"
+
+def test_handler_call_reuses_compiled_conditions():
+    calls = []
+    def func_a(state, config, **kwargs):
+        calls.append(kwargs)
+        return state["value"]
+
+    evaluate_functions = {"func_name_a": func_a}
+    conditions = [
+        {
+            "expression": {
+                "or": [
+                    {"eq": [{"type": "state_value", "name": "value"}, "a"]},
+                    {"eq": [{"type": "function", "name": "func_name_a", "args": {"key": 1}}, "b"]},
+                ]
+            },
+            "result": ["node_a", "END"]
+        },
+        {"default": "START"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
+
+    assert handler({"value": "a"}, {}) == ["node_a", "__end__"]
+    assert not calls
+    assert handler({"value": "b"}, {}) == ["node_a", "__end__"]
+    assert calls == [{"key": 1}]
+    assert handler({"value": "c"}, {}) == ["__start__"]
+
+def test_handler_late_bound_function():
+    evaluate_functions = {}
+    conditions = [
+        {
+            "expression": {"eq": [{"type": "function", "name": "func_name_a"}, True]},
+            "result": "Result_Value"
+        },
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
+
+    exc_info = pytest.raises(ValueError, handler, {}, {})
+    assert str(exc_info.value) == "The function func_name_a cannot be found in evaluate_functions."
+
+    evaluate_functions["func_name_a"] = lambda state, config, **kwargs: True
+    assert handler({}, {}) == ["Result_Value"]
+
+def test_handler_match_first():
+    calls = []
+    def func_a(state, config, **kwargs):
+        calls.append(kwargs["name"])
+        return True
+
+    evaluate_functions = {"func_name_a": func_a}
+    conditions = [
+        {
+            "expression": {"eq": [{"type": "state_value", "name": "value"}, "a"]},
+            "result": "Result_Value_A"
+        },
+        {
+            "expression": {"eq": [{"type": "function", "name": "func_name_a", "args": {"name": "b"}}, True]},
+            "result": ["Result_Value_B", "Result_Value_C"]
+        },
+        {
+            "expression": {"eq": [{"type": "function", "name": "func_name_a", "args": {"name": "c"}}, True]},
+            "result": "Result_Value_D"
+        },
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions, match="first")
+    assert handler.match == "first"
+
+    assert handler({"value": "a"}, {}) == ["Result_Value_A"]
+    assert not calls
+
+    assert handler({"value": "b"}, {}) == ["Result_Value_B", "Result_Value_C"]
+    assert calls == ["b"]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
+    assert handler.match == "all"
+    assert handler({"value": "a"}, {}) == [
+        "Result_Value_A", "Result_Value_B", "Result_Value_C", "Result_Value_D"
+        ]
+
+    conditions = [
+        {
+            "expression": {"eq": [{"type": "state_value", "name": "value"}, "a"]},
+            "result": "Result_Value_A"
+        },
+        {"default": "Default_Value"}
+    ]
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions, match="first")
+    assert handler({"value": "b"}, {}) == ["Default_Value"]
+
+    exc_info = pytest.raises(ValueError, ConfigurableConditionalHandler, conditions, {}, "error_mode")
+    assert str(exc_info.value) == "Unsupported match mode: error_mode"
+
+def test_handler_switch_condition():
+    def return_function(state, config, **kwargs):
+        return Send("node", {"arg": state["intent"]})
+
+    evaluate_functions = {"return_function": return_function}
+    conditions = [
+        {
+            "switch": {"type": "state_value", "name": "intent"},
+            "cases": [
+                {"value": "search", "result": "Result_Value_A"},
+                {"value": "chat", "result": ["Result_Value_B", "END"]},
+                {"value": 1, "result": {"type": "function", "name": "return_function"}},
+                {"value": "search", "result": "Result_Value_C"},
+            ]
+        },
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
+    assert handler({"intent": "search"}, {}) == ["Result_Value_A", "Result_Value_C"]
+    assert handler({"intent": "chat"}, {}) == ["Result_Value_B", "__end__"]
+    assert handler({"intent": 1.0}, {}) == [Send("node", {"arg": 1.0})]
+    assert handler({"intent": "other"}, {}) == ["Default_Value"]
+    assert handler({"intent": ["unhashable"]}, {}) == ["Default_Value"]
+    assert handler({}, {}) == ["Default_Value"]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions, match="first")
+    assert handler({"intent": "search"}, {}) == ["Result_Value_A"]
+
+def test_handler_detects_switch():
+    calls = []
+    def func_a(state, config, **kwargs):
+        calls.append(kwargs)
+        return state["intent"]
+
+    evaluate_functions = {"func_name_a": func_a}
+    operand = {"type": "function", "name": "func_name_a", "args": {"key": "value"}}
+    conditions = [
+        {"expression": {"eq": [operand, "search"]}, "result": "Result_Value_A"},
+        {"expression": {"==": ["chat", operand]}, "result": "Result_Value_B"},
+        {"expression": {"equals": [operand, "search"]}, "result": "Result_Value_C"},
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
+    assert handler({"intent": "search"}, {}) == ["Result_Value_A", "Result_Value_C"]
+    assert len(calls) == 1
+    assert handler({"intent": "chat"}, {}) == ["Result_Value_B"]
+    assert handler({"intent": "other"}, {}) == ["Default_Value"]
+    assert len(calls) == 3
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions, match="first")
+    assert handler({"intent": "search"}, {}) == ["Result_Value_A"]
+
+def test_handler_switch_function_error():
+    def func_a(state, config, **kwargs):
+        raise TypeError("broken")
+
+    operand = {"type": "function", "name": "func_name_a"}
+    conditions = [
+        {"expression": {"eq": [operand, "search"]}, "result": "Result_Value_A"},
+        {"expression": {"eq": [operand, "chat"]}, "result": "Result_Value_B"},
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, {"func_name_a": func_a})
+    with pytest.raises(TypeError, match="broken"):
+        handler({}, {})
+
+    state_operand = {"type": "state_value", "name": "intent"}
+    conditions = [
+        {"expression": {"eq": [state_operand, "search"]}, "result": "Result_Value_A"},
+        {"default": "Default_Value"}
+    ]
+    handler = ConfigurableConditionalHandler(conditions, {})
+    assert handler({"intent": ["unhashable"]}, {}) == ["Default_Value"]
+
+def test_handler_does_not_detect_switch():
+    state_operand = {"type": "state_value", "name": "intent"}
+    conditions_list = [
+        # different operands
+        [
+            {"expression": {"eq": [state_operand, "search"]}, "result": "Result_Value_A"},
+            {"expression": {"eq": [{"type": "state_value", "name": "other"}, "chat"]}, "result": "Result_Value_B"},
+        ],
+        # non equality operator
+        [
+            {"expression": {"eq": [state_operand, "search"]}, "result": "Result_Value_A"},
+            {"expression": {"neq": [state_operand, "chat"]}, "result": "Result_Value_B"},
+        ],
+        # unhashable and NaN constants
+        [
+            {"expression": {"eq": [state_operand, "search"]}, "result": "Result_Value_A"},
+            {"expression": {"eq": [state_operand, float("nan")]}, "result": "Result_Value_B"},
+        ],
+    ]
+
+    for conditions in conditions_list:
+        assert _detect_switch(conditions) is None
+
+    conditions = [
+        {"expression": {"eq": [state_operand, "search"]}, "result": "Result_Value_A"},
+        {"expression": {"neq": [state_operand, "chat"]}, "result": "Result_Value_B"},
+        {"default": "Default_Value"}
+    ]
+    handler = ConfigurableConditionalHandler(conditions, {})
+    assert handler({"intent": "search"}, {}) == ["Result_Value_A", "Result_Value_B"]
+    assert handler({"intent": "chat"}, {}) == ["Default_Value"]
+
+def test_handler_memoizes_function_operands():
+    calls = []
+    def is_tool_message(state, config, **kwargs):
+        calls.append(kwargs)
+        return state["tool_call"]
+
+    evaluate_functions = {"is_tool_message": is_tool_message}
+    operand = {"type": "function", "name": "is_tool_message", "args": {"depth": [1, {"a": 2}]}}
+    conditions = [
+        {"expression": {"eq": [operand, True]}, "result": "tools"},
+        {"expression": {"not": {"eq": [operand, True]}}, "result": "END"},
+        {
+            "expression": {"eq": [
+                {"type": "function", "name": "is_tool_message", "args": {"depth": [2]}}, True
+                ]},
+            "result": "other"
+        },
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
+    assert handler({"tool_call": True}, {}) == ["tools", "other"]
+    assert calls == [{"depth": [1, {"a": 2}]}, {"depth": [2]}]
+
+    calls.clear()
+    assert handler({"tool_call": False}, {}) == ["__end__"]
+    assert calls == [{"depth": [1, {"a": 2}]}, {"depth": [2]}]
+
+    calls.clear()
+    handler = ConfigurableConditionalHandler(
+        conditions, evaluate_functions, impure_functions=["is_tool_message"]
+        )
+    assert handler({"tool_call": True}, {}) == ["tools", "other"]
+    assert calls == [{"depth": [1, {"a": 2}]}, {"depth": [1, {"a": 2}]}, {"depth": [2]}]
+
+def test_handler_impure_function_not_detected_as_switch():
+    calls = []
+    def next_value(state, config, **kwargs):
+        calls.append(kwargs)
+        return len(calls)
+
+    evaluate_functions = {"next_value": next_value}
+    operand = {"type": "function", "name": "next_value"}
+    conditions = [
+        {"expression": {"eq": [operand, 2]}, "result": "Result_Value_A"},
+        {"expression": {"eq": [operand, 2]}, "result": "Result_Value_B"},
+        {"default": "Default_Value"}
+    ]
+
+    assert _detect_switch(conditions, frozenset({"next_value"})) is None
+
+    handler = ConfigurableConditionalHandler(
+        conditions, evaluate_functions, impure_functions={"next_value"}
+        )
+    assert handler({}, {}) == ["Result_Value_B"]
+    assert len(calls) == 2
+
+def test_handler_acall():
+    import asyncio
+    import threading
+
+    main_thread = threading.get_ident()
+    events = []
+
+    async def async_func(state, config, **kwargs):
+        events.append(("start", kwargs["name"]))
+        await asyncio.sleep(0.01)
+        events.append(("end", kwargs["name"]))
+        return state["value"]
+
+    def sync_func(state, config, **kwargs):
+        events.append(("sync", threading.get_ident() != main_thread))
+        return state["value"]
+
+    evaluate_functions = {"async_func": async_func, "sync_func": sync_func}
+    conditions = [
+        {
+            "expression": {"eq": [
+                {"type": "function", "name": "async_func", "args": {"name": "a"}},
+                {"type": "function", "name": "async_func", "args": {"name": "b"}},
+            ]},
+            "result": "Result_Value_A"
+        },
+        {
+            "expression": {"and": [
+                {"eq": [{"type": "state_value", "name": "value"}, 1]},
+                {"eq": [{"type": "function", "name": "sync_func"}, 1]},
+            ]},
+            "result": {"type": "function", "name": "async_func", "args": {"name": "c"}}
+        },
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
+    assert handler.is_async
+
+    assert asyncio.run(handler.acall({"value": "x"}, {})) == ["Result_Value_A"]
+    # Both operands of the comparison run concurrently.
+    assert events[:2] == [("start", "a"), ("start", "b")]
+    # The and expression short-circuits before calling sync_func.
+    assert ("sync", True) not in events
+
+    events.clear()
+    assert asyncio.run(handler.acall({"value": 1}, {})) == ["Result_Value_A", 1]
+    assert ("sync", True) in events
+
+    # The synchronous call runs coroutine functions to completion.
+    assert handler({"value": 1}, {}) == ["Result_Value_A", 1]
+
+    async def call_in_loop():
+        return handler({"value": 1}, {})
+    exc_info = pytest.raises(RuntimeError, asyncio.run, call_in_loop())
+    assert "cannot be evaluated synchronously" in str(exc_info.value)
+
+def test_handler_memo_keys_are_not_shared():
+    import asyncio
+
+    calls = []
+    async def async_func(state, config, **kwargs):
+        calls.append(kwargs)
+        return state["value"]
+
+    evaluate_functions = {"async_func": async_func}
+    operand = {"type": "function", "name": "async_func"}
+    conditions = [
+        {"expression": {"gt": [operand, 1]}, "result": "Result_Value_A"},
+        {"expression": {"lt": [operand, 10]}, "result": "Result_Value_B"},
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
+    assert handler._evaluate_conditions([{"default": "Other"}], {"value": 5}, {}) == ["Other"]
+    assert asyncio.run(handler.acall({"value": 5}, {})) == ["Result_Value_A", "Result_Value_B"]
+    assert len(calls) == 1
+
+def test_handler_legacy_entry_points_with_metrics():
+    from kenkenpa.instrumentation import RoutingMetrics
+
+    def func(state, config, **kwargs):
+        return state["value"]
+
+    handler = ConfigurableConditionalHandler(
+        [{"default": "Default_Value"}], {"func": func}, metrics=RoutingMetrics(), name="edge")
+    operand = {"type": "function", "name": "func"}
+    assert handler._evaluate_expr({"gt": [operand, 1]}, {"value": 5}, {}) is True
+    assert handler._get_value(operand, {"value": 5}, {}) == 5
+
+def test_handler_acall_cancels_conditions_on_error():
+    import asyncio
+
+    finished = []
+    async def failing(state, config, **kwargs):
+        raise ConnectionError("unavailable")
+
+    async def slow(state, config, **kwargs):
+        await asyncio.sleep(0.1)
+        finished.append(1)
+        return True
+
+    conditions = [
+        {"expression": {"eq": [{"type": "function", "name": "failing"}, True]}, "result": "A"},
+        {"expression": {"eq": [{"type": "function", "name": "slow"}, True]}, "result": "B"},
+    ]
+    handler = ConfigurableConditionalHandler(conditions, {"failing": failing, "slow": slow})
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await handler.acall({}, {})
+        await asyncio.sleep(0.2)
+    asyncio.run(run())
+    assert not finished
+
+def test_handler_acall_memoizes_concurrent_operands():
+    import asyncio
+
+    calls = []
+    async def async_func(state, config, **kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.01)
+        return state["value"]
+
+    evaluate_functions = {"async_func": async_func}
+    operand = {"type": "function", "name": "async_func"}
+    conditions = [
+        {"expression": {"gt": [operand, 1]}, "result": "Result_Value_A"},
+        {"expression": {"lt": [operand, 10]}, "result": "Result_Value_B"},
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions)
+    assert asyncio.run(handler.acall({"value": 5}, {})) == ["Result_Value_A", "Result_Value_B"]
+    assert len(calls) == 1
+
+    handler = ConfigurableConditionalHandler(conditions, evaluate_functions, match="first")
+    assert asyncio.run(handler.acall({"value": 0}, {})) == ["Result_Value_B"]
+
+    conditions = [
+        {"expression": {"eq": [{"type": "state_value", "name": "value"}, 1]}, "result": "Result_Value_A"},
+    ]
+    handler = ConfigurableConditionalHandler(conditions, {})
+    assert not handler.is_async
+    assert asyncio.run(handler.acall({"value": 1}, {})) == ["Result_Value_A"]
+    exc_info = pytest.raises(ValueError, asyncio.run, handler.acall({"value": 2}, {}))
+    assert str(exc_info.value) == "No matching conditions were found, and no default function was provided."
+
+def test_handler_acall_switch():
+    import asyncio
+
+    async def intent(state, config, **kwargs):
+        return state["intent"]
+
+    conditions = [
+        {
+            "switch": {"type": "function", "name": "intent"},
+            "cases": [
+                {"value": "search", "result": "Result_Value_A"},
+                {"value": "chat", "result": ["Result_Value_B", "END"]},
+            ]
+        },
+        {"default": "Default_Value"}
+    ]
+    handler = ConfigurableConditionalHandler(conditions, {"intent": intent})
+    assert asyncio.run(handler.acall({"intent": "chat"}, {})) == ["Result_Value_B", "__end__"]
+    assert asyncio.run(handler.acall({"intent": ["unhashable"]}, {})) == ["Default_Value"]
+
+def test_handler_metrics():
+    import asyncio
+    from kenkenpa.instrumentation import RoutingMetrics
+
+    def func_a(state, config, **kwargs):
+        return state["value"]
+
+    async def afunc_a(state, config, **kwargs):
+        return state["value"]
+
+    conditions = [
+        {
+            "expression": {"eq": [{"type": "function", "name": "func_a"}, 1]},
+            "result": "Result_Value_A"
+        },
+        {
+            "expression": {"gt": [{"type": "function", "name": "func_a"}, 0]},
+            "result": "Result_Value_B"
+        },
+        {"default": "Default_Value"}
+    ]
+
+    for functions, call in (
+        ({"func_a": func_a}, lambda handler, state: handler(state, {})),
+        ({"func_a": afunc_a}, lambda handler, state: asyncio.run(handler.acall(state, {}))),
+    ):
+        metrics = RoutingMetrics()
+        handler = ConfigurableConditionalHandler(conditions, functions, metrics=metrics, name="edge_a")
+
+        assert call(handler, {"value": 1}) == ["Result_Value_A", "Result_Value_B"]
+        assert call(handler, {"value": 2}) == ["Result_Value_B"]
+        assert call(handler, {"value": 0}) == ["Default_Value"]
+
+        snapshot = metrics.snapshot()["edge_a"]
+        assert snapshot["decisions"] == 3
+        assert snapshot["matches"] == {0: 1, 1: 2}
+        assert snapshot["default_taken"] == 1
+        # func_a appears twice with the same args, so it is called once per decision.
+        assert snapshot["function_calls"] == 3
+        assert snapshot["errors"] == 0
+        assert snapshot["latency"]["count"] == 3
+        assert sum(snapshot["latency"]["counts"]) == 3
+
+def test_handler_metrics_switch():
+    from kenkenpa.instrumentation import RoutingMetrics
+
+    conditions = [
+        {
+            "expression": {"eq": [{"type": "state_value", "name": "intent"}, "search"]},
+            "result": "Result_Value_A"
+        },
+        {
+            "expression": {"eq": [{"type": "state_value", "name": "intent"}, "chat"]},
+            "result": "Result_Value_B"
+        },
+        {
+            "expression": {"eq": [{"type": "state_value", "name": "intent"}, "chat"]},
+            "result": "Result_Value_C"
+        },
+        {
+            "switch": {"type": "state_value", "name": "mode"},
+            "cases": [{"value": "fast", "result": "Result_Value_D"}]
+        },
+    ]
+    metrics = RoutingMetrics()
+
+    # conditions 0 to 2 are detected as a switch.
+    handler = ConfigurableConditionalHandler(conditions[:3], {}, metrics=metrics, name="detected")
+    assert handler({"intent": "chat"}, {}) == ["Result_Value_B", "Result_Value_C"]
+    handler = ConfigurableConditionalHandler(conditions[:3], {}, match="first", metrics=metrics, name="first")
+    assert handler({"intent": "chat"}, {}) == ["Result_Value_B"]
+    handler = ConfigurableConditionalHandler(conditions, {}, metrics=metrics, name="switch")
+    assert handler({"intent": "chat", "mode": "fast"}, {}) == ["Result_Value_B", "Result_Value_C", "Result_Value_D"]
+    with pytest.raises(ValueError):
+        handler({"intent": "other"}, {})
+
+    snapshot = metrics.snapshot()
+    assert snapshot["detected"]["matches"] == {1: 1, 2: 1}
+    assert snapshot["first"]["matches"] == {1: 1}
+    assert snapshot["switch"]["matches"] == {1: 1, 2: 1, 3: 1}
+    assert snapshot["switch"]["decisions"] == 2
+    assert snapshot["switch"]["errors"] == 1
+    assert snapshot["switch"]["default_taken"] == 0
+
+def test_handler_adaptive(monkeypatch):
+    import time
+    import kenkenpa.edges
+
+    monkeypatch.setattr(kenkenpa.edges, "ADAPTIVE_INTERVAL", 8)
+    calls = []
+
+    def slow_check(state, config, **kwargs):
+        calls.append(1)
+        time.sleep(0.001)
+        return True
+
+    conditions = [
+        {
+            "expression": {
+                "and": [
+                    {"eq": [{"type": "function", "name": "slow_check"}, True]},
+                    {"eq": [{"type": "state_value", "name": "enabled"}, True]},
+                ]
+            },
+            "result": "Result_Value_A"
+        },
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, {"slow_check": slow_check}, adaptive=True)
+    for _ in range(8):
+        assert handler({"enabled": False}, {}) == ["Default_Value"]
+    assert len(calls) == 8
+
+    # the cheap, decisive state check is now evaluated first.
+    for _ in range(8):
+        assert handler({"enabled": False}, {}) == ["Default_Value"]
+    assert len(calls) == 8
+    assert handler({"enabled": True}, {}) == ["Result_Value_A"]
+    assert len(calls) == 9
+
+    # without adaptive mode, the declaration order is kept.
+    handler = ConfigurableConditionalHandler(conditions, {"slow_check": slow_check})
+    for _ in range(16):
+        handler({"enabled": False}, {})
+    assert len(calls) == 25
+
+def test_handler_adaptive_preserves_semantics(monkeypatch):
+    import kenkenpa.edges
+
+    monkeypatch.setattr(kenkenpa.edges, "ADAPTIVE_INTERVAL", 4)
+    calls = []
+
+    def side_effect(state, config, **kwargs):
+        calls.append(1)
+        return False
+
+    conditions = [
+        {
+            "expression": {
+                "or": [
+                    {"eq": [{"type": "state_value", "name": "value"}, None]},
+                    {"gt": [{"type": "state_value", "name": "value"}, 3]},
+                ]
+            },
+            "result": "Result_Value_A"
+        },
+        {
+            "expression": {
+                "and": [
+                    {"eq": [{"type": "function", "name": "side_effect"}, False]},
+                    {"eq": [{"type": "state_value", "name": "value"}, 0]},
+                ]
+            },
+            "result": "Result_Value_B"
+        },
+        {"default": "Default_Value"}
+    ]
+
+    handler = ConfigurableConditionalHandler(
+        conditions,
+        {"side_effect": side_effect},
+        impure_functions=["side_effect"],
+        adaptive=True,
+        )
+    # The comparison with 3 decides the `or` more often, so it moves first,
+    # but it raises for None, which the guard then handles in declaration order.
+    for _ in range(8):
+        assert handler({"value": 5}, {}) == ["Result_Value_A"]
+    assert handler({"value": None}, {}) == ["Result_Value_A"]
+    assert handler({"value": 1}, {}) == ["Default_Value"]
+
+    # The impure call keeps its position and is made on every decision.
+    assert handler({"value": 0}, {}) == ["Result_Value_B"]
+    assert len(calls) == 11
+
+def test_handler_read_set():
+    conditions = [
+        {
+            "expression": {
+                "and": [
+                    {"eq": [{"type": "state_value", "name": "intent"}, "search"]},
+                    {"gt": [{"type": "function", "name": "score", "args": {"min": 1}}, 0.5]},
+                ]
+            },
+            "result": {"type": "config_value", "name": "search_node"}
+        },
+        {"default": "END"}
+    ]
+
+    handler = ConfigurableConditionalHandler(conditions, {})
+    assert handler.read_set is None
+
+    handler = ConfigurableConditionalHandler(
+        conditions, {}, function_dependencies={"score": (["messages"], ["threshold"])}
+        )
+    assert handler.read_set == (("intent", "messages"), ("search_node", "threshold"))
+
+    handler = ConfigurableConditionalHandler(
+        conditions, {},
+        impure_functions=["score"],
+        function_dependencies={"score": (["messages"], [])},
+        )
+    assert handler.read_set is None
+
+def test_handler_incremental():
+    import asyncio
+    import threading
+
+    calls = []
+
+    def score(state, config, **kwargs):
+        calls.append(1)
+        return len(state["messages"])
+
+    conditions = [
+        {
+            "expression": {
+                "and": [
+                    {"eq": [{"type": "config_value", "name": "mode"}, "fast"]},
+                    {"gt": [{"type": "function", "name": "score"}, 1]},
+                ]
+            },
+            "result": "Result_Value_A"
+        },
+        {"default": "Default_Value"}
+    ]
+    handler = ConfigurableConditionalHandler(
+        conditions,
+        {"score": score},
+        incremental=True,
+        function_dependencies={"score": (["messages"], [])},
+        )
+    messages = ["a", "b"]
+    config = {"configurable": {"mode": "fast"}}
+
+    assert handler({"messages": messages, "other": 1}, config) == ["Result_Value_A"]
+    # keys outside the read set do not matter.
+    assert handler({"messages": messages, "other": 2}, config) == ["Result_Value_A"]
+    assert asyncio.run(handler.acall({"messages": messages}, {"configurable": {"mode": "fast"}})) \
+        == ["Result_Value_A"]
+    assert len(calls) == 1
+
+    # a new object is a change, even when equal.
+    assert handler({"messages": ["a"]}, config) == ["Default_Value"]
+    assert handler({"messages": ["a"]}, {"configurable": {"mode": "slow"}}) == ["Default_Value"]
+    assert len(calls) == 2
+
+    # the last result is kept per conversation, whichever thread runs it.
+    config_a = {"configurable": {"mode": "fast", "thread_id": "a"}}
+    config_b = {"configurable": {"mode": "fast", "thread_id": "b"}}
+    messages_a = ["a", "b"]
+    messages_b = ["c"]
+    assert handler({"messages": messages_a}, config_a) == ["Result_Value_A"]
+    assert handler({"messages": messages_b}, config_b) == ["Default_Value"]
+    assert len(calls) == 4
+    for _ in range(3):
+        assert handler({"messages": messages_a}, config_a) == ["Result_Value_A"]
+        assert asyncio.run(handler.acall({"messages": messages_b}, config_b)) == ["Default_Value"]
+    results = []
+    thread = threading.Thread(target=lambda: results.append(handler({"messages": messages_a}, config_a)))
+    thread.start()
+    thread.join()
+    assert results == [["Result_Value_A"]]
+    assert len(calls) == 4
+
+    # only the most recent conversations are kept.
+    from kenkenpa import edges
+    original = edges.INCREMENTAL_MAXSIZE
+    edges.INCREMENTAL_MAXSIZE = 1
+    try:
+        handler({"messages": ["d"]}, config_b)
+        handler({"messages": messages_a}, config_a)
+    finally:
+        edges.INCREMENTAL_MAXSIZE = original
+    assert len(calls) == 6
+
+    # functions without declared dependencies disable the cache.
+    handler = ConfigurableConditionalHandler(conditions, {"score": score}, incremental=True)
+    handler({"messages": messages}, config)
+    handler({"messages": messages}, config)
+    assert len(calls) == 8
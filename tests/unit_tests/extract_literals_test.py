@@ -164,4 +164,19 @@ def test_extract_literals_with_nested_expressions():
         },
         {"default": "Default_Value"}
     ]
-    assert extract_literals(conditions) == ["Result_Value", "Default_Value"]
\ No newline at end of file
+    assert extract_literals(conditions) == ["Result_Value", "Default_Value"]
+
+def test_extract_literals_with_switch():
+    conditions = [
+        {
+            "switch": {"type": "state_value", "name": "intent"},
+            "cases": [
+                {"value": "search", "result": "Result_Value_A"},
+                {"value": "chat", "result": ["Result_Value_B", "END"]},
+            ]
+        },
+        {"default": "Default_Value"}
+    ]
+    assert extract_literals(conditions) == [
+        "Result_Value_A", "Result_Value_B", "__end__", "Default_Value"
+        ]
@@ -0,0 +1,153 @@
+import json
+import pytest
+from kenkenpa.instrumentation import BuildReport
+
+def test_build_report():
+    hooked = []
+    report = BuildReport(hooked.append)
+
+    report.record("gen_state", ["root"], "root", 0.5)
+    with report.time("node_factory", ("root", "sub"), "node_a", factory="factory_a"):
+        pass
+    with pytest.raises(RuntimeError):
+        with report.time("compile", ("root", "sub"), "sub"):
+            raise RuntimeError("compile")
+
+    assert hooked == report.records
+    assert [entry["phase"] for entry in report.records] == ["gen_state", "node_factory", "compile"]
+    assert report.records[0]["path"] == ("root",)
+    assert report.records[1]["factory"] == "factory_a"
+
+    assert [entry["name"] for entry in report.filter(path=("root", "sub"))] == ["node_a", "sub"]
+    assert report.filter("gen_state", ("root", "sub")) == []
+    assert report.totals()["gen_state"] == 0.5
+
+    report_dict = json.loads(json.dumps(report.to_dict()))
+    assert report_dict["records"][1]["path"] == ["root", "sub"]
+    assert set(report_dict["totals"]) == {"gen_state", "node_factory", "compile"}
+
+    report.clear()
+    assert report.records == []
+
+def test_routing_metrics():
+    import threading
+    from kenkenpa.instrumentation import RoutingMetrics, RoutingMetricsExporter
+
+    class ListExporter(RoutingMetricsExporter):
+        def __init__(self):
+            self.snapshots = []
+
+        def export(self, snapshot):
+            self.snapshots.append(snapshot)
+
+    exporter = ListExporter()
+    metrics = RoutingMetrics(buckets=(0.001, 0.01), exporter=exporter)
+
+    def record():
+        for _ in range(100):
+            metrics.record("edge_a", [0, 2], False, 1, 0.0005)
+            metrics.record("edge_a", [], True, 2, 0.005)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.record("edge_b", [], False, 0, 1.0, error=True)
+
+    metrics.export()
+    snapshot = exporter.snapshots[0]
+    assert snapshot["edge_a"] == {
+        "decisions": 800,
+        "matches": {0: 400, 2: 400},
+        "default_taken": 400,
+        "function_calls": 1200,
+        "errors": 0,
+        "latency": {
+            "buckets": [0.001, 0.01],
+            "counts": [400, 400, 0],
+            "sum": pytest.approx(400 * 0.0005 + 400 * 0.005),
+            "count": 800,
+        },
+    }
+    assert snapshot["edge_b"]["errors"] == 1
+    assert snapshot["edge_b"]["latency"]["counts"] == [0, 0, 1]
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+    with pytest.raises(TypeError):
+        RoutingMetricsExporter()
+    with pytest.raises(ValueError):
+        RoutingMetrics().export()
+    with pytest.raises(ValueError):
+        RoutingMetrics(buckets=(0.01, 0.001))
+
+def test_node_metrics():
+    import asyncio
+    from kenkenpa.instrumentation import MetricsExporter, NodeMetrics, NodeMetricsExporter
+
+    class ListExporter(NodeMetricsExporter):
+        def __init__(self):
+            self.snapshots = []
+
+        def export(self, snapshot):
+            self.snapshots.append(snapshot)
+
+    exporter = ListExporter()
+    metrics = NodeMetrics(buckets=(0.001, 0.01), exporter=exporter)
+    metrics.record("root", "node_a", 0.0005, size=2)
+    metrics.record("root", "node_a", 0.005, size=4)
+    metrics.record("root", "node_a", 1.0, exception="TimeoutError")
+    metrics.record("root/sub", "node_b", 0.0005, interrupted=True)
+
+    metrics.export()
+    snapshot = exporter.snapshots[0]
+    assert snapshot["root/node_a"] == {
+        "graph": "root",
+        "node": "node_a",
+        "calls": 3,
+        "exceptions": {"TimeoutError": 1},
+        "errors": 1,
+        "interrupts": 0,
+        "latency": {
+            "buckets": [0.001, 0.01],
+            "counts": [1, 1, 1],
+            "sum": pytest.approx(1.0055),
+            "count": 3,
+        },
+        "output_size": {"sum": 6, "count": 2, "max": 4},
+    }
+    assert snapshot["root/sub/node_b"]["interrupts"] == 1
+    assert snapshot["root/sub/node_b"]["errors"] == 0
+
+    def node(state):
+        if state.get("fail"):
+            raise KeyError("fail")
+        return {"a": 1}
+
+    async def anode(state):
+        return {"a": 1, "b": 2}
+
+    metrics.reset()
+    wrapped = metrics.wrap(node, "root", "node")
+    assert wrapped.invoke({}) == {"a": 1}
+    with pytest.raises(KeyError):
+        wrapped.invoke({"fail": True})
+    assert asyncio.run(metrics.wrap(anode, "root", "anode").ainvoke({})) == {"a": 1, "b": 2}
+    assert metrics.wrap(lambda state: None, "root", "none").invoke({}) is None
+
+    snapshot = metrics.snapshot()
+    assert snapshot["root/node"]["calls"] == 2
+    assert snapshot["root/node"]["exceptions"] == {"KeyError": 1}
+    assert snapshot["root/node"]["output_size"] == {"sum": 1, "count": 1, "max": 1}
+    assert snapshot["root/anode"]["output_size"]["sum"] == 2
+    assert snapshot["root/none"]["output_size"]["count"] == 0
+
+    with pytest.raises(ValueError):
+        NodeMetrics(buckets=())
+    with pytest.raises(ValueError):
+        NodeMetrics().export()
+    with pytest.raises(TypeError):
+        NodeMetricsExporter()
+    assert NodeMetricsExporter is MetricsExporter
@@ -17,6 +17,9 @@ from kenkenpa.models.conditions import KConditionExpression
 from kenkenpa.models.conditions import KConditionDefaultV1
 from kenkenpa.models.conditions import KConditionDefault
 
+from kenkenpa.models.conditions import KConditionSwitchV1
+from kenkenpa.models.conditions import KConditionSwitch
+
 from kenkenpa.models.conditions import KConditionsV1
 from kenkenpa.models.conditions import KConditions
 
@@ -203,3 +206,36 @@ def test_KCondition():
     KConditionsV1(**conditions)
     KConditions(**conditions)
 
+
+def test_KConditionSwitch():
+    condition = {
+        "switch": {"type": "state_value", "name": "intent"},
+        "cases": [
+            {"value": "search", "result": "tools"},
+            {"value": 10, "result": ["node_a", "node_b"]},
+            {"value": None, "result": {"type": "function", "name": "test_function"}},
+        ]
+    }
+    KConditionSwitchV1(**condition)
+    KConditionSwitch(**condition)
+
+    conditions = {
+        "conditions":[
+            condition,
+            {"default": "END"}
+        ]
+    }
+    KConditionsV1(**conditions)
+    KConditions(**conditions)
+
+    condition = {
+        "switch": "intent",
+        "cases": [{"value": "search", "result": "tools"}]
+    }
+    pytest.raises(ValueError, KConditionSwitchV1, **condition)
+
+    condition = {
+        "switch": {"type": "state_value", "name": "intent"},
+        "cases": [{"value": "search", "result": "tools", "extra": "error"}]
+    }
+    pytest.raises(ValueError, KConditionSwitchV1, **condition)
@@ -66,4 +66,39 @@ def test_ConfigurableConditionalEdge():
         }
 
     KConfigurableConditionalEdgeV1(**flow)
-    KConfigurableConditionalEdge(**flow)
\ No newline at end of file
+    KConfigurableConditionalEdge(**flow)
+
+def test_KConditionalEdgeFlowParam_match():
+    flow_parameter = {
+            "start_key":"agent",
+            "match":"first",
+            "conditions":[
+                {
+                    "expression": {
+                        "eq": [{"type": "state_value", "name": "intent"}, "search"],
+                    },
+                    "result": "tools"
+                },
+                {"default": "END"}
+            ]
+        }
+
+    assert KConditionalEdgeFlowParamV1(**flow_parameter).match == "first"
+
+    del flow_parameter["match"]
+    assert KConditionalEdgeFlowParamV1(**flow_parameter).match == "all"
+
+    flow_parameter["match"] = "any"
+    pytest.raises(ValueError, KConditionalEdgeFlowParamV1, **flow_parameter)
+
+def test_KConditionalEdgeFlowParam_adaptive():
+    flow_parameter = {
+            "start_key":"agent",
+            "adaptive":True,
+            "conditions":[{"default": "END"}]
+        }
+
+    assert KConditionalEdgeFlowParamV1(**flow_parameter).adaptive is True
+
+    del flow_parameter["adaptive"]
+    assert KConditionalEdgeFlowParamV1(**flow_parameter).adaptive is False
@@ -42,3 +42,54 @@ def test_KNode():
     KNodeV1(**flow)
     KNode(**flow)
 
+
+def test_KNode_cache():
+    flow = {
+        "graph_type":"node",
+        "flow_parameter":{
+            "name":"retriever",
+            "factory":"retriever_factory",
+            "cache":{"keys":["query"], "ttl":30, "maxsize":16},
+        },
+    }
+    KNodeV1(**flow)
+
+    flow["flow_parameter"]["cache"] = {"keys":["query"], "ttl":0}
+    with pytest.raises(ValueError):
+        KNodeV1(**flow)
+
+    flow["flow_parameter"]["cache"] = {"keys":["query"], "size":16}
+    with pytest.raises(ValueError):
+        KNodeV1(**flow)
+
+def test_KNode_policies():
+    flow = {
+        "graph_type":"node",
+        "flow_parameter":{
+            "name":"llm",
+            "factory":"llm_factory",
+            "timeout":30,
+            "retry":{"attempts":5, "backoff":1.0, "backoff_factor":2.0, "max_backoff":10, "jitter":False},
+            "max_concurrency":4,
+        },
+    }
+    KNodeV1(**flow)
+
+    for invalid in ({"timeout":0}, {"max_concurrency":0}, {"retry":{"attempts":0}}, {"retry":{"delay":1}}):
+        with pytest.raises(ValueError):
+            KNodeV1(**{**flow, "flow_parameter":{**flow["flow_parameter"], **invalid}})
+
+def test_KNode_batch():
+    flow = {
+        "graph_type":"node",
+        "flow_parameter":{
+            "name":"embed",
+            "factory":"embedding_factory",
+            "batch":{"max_size":32, "max_wait_ms":5},
+        },
+    }
+    KNodeV1(**flow)
+
+    for invalid in ({"max_size":0}, {"max_wait_ms":-1}, {"size":8}):
+        with pytest.raises(ValueError):
+            KNodeV1(**{**flow, "flow_parameter":{**flow["flow_parameter"], "batch":invalid}})
@@ -27,6 +27,19 @@ def test_KState():
     KStateV1(**state)
     KState(**state)
 
+def test_KState_reducer_args():
+    state = {
+            "field_name": "messages",
+            "type": "list",
+            "reducer":"keep_last",
+            "reducer_args":{"n":50},
+        }
+    KStateV1(**state)
+
+    state.pop("reducer")
+    with pytest.raises(ValueError):
+        KStateV1(**state)
+
 def test_KStateGraphParam():
     flow_parameter = {
         "name":"Parallel-node",
@@ -155,3 +168,40 @@ def test_KStateGraph():
 
     KStateGraphV1(**graph_settings)
     KStateGraph(**graph_settings)
+
+def test_KStateGraph_discriminated_flows():
+    graph_settings = {
+        "graph_type":"stategraph",
+        "flow_parameter":{
+            "name":"discriminated",
+        },
+        "flows": [
+            {
+                "graph_type":"node",
+                "flow_parameter": {
+                    "name":"b",
+                },
+            },
+            {
+                "graph_type":"unknown_type",
+                "flow_parameter": {},
+            },
+        ]
+    }
+
+    exc_info = pytest.raises(ValueError, KStateGraphV1, **graph_settings)
+    errors = exc_info.value.errors()
+    assert len(errors) == 2
+    assert errors[0]["loc"] == ("flows", 0, "node", "flow_parameter", "factory")
+    assert errors[0]["type"] == "missing"
+    assert errors[1]["loc"] == ("flows", 1)
+    assert errors[1]["type"] == "union_tag_invalid"
+
+    graph_settings = {
+        "graph_type":"node",
+        "flow_parameter":{
+            "name":"discriminated",
+        },
+        "flows": []
+    }
+    pytest.raises(ValueError, KStateGraphV1, **graph_settings)
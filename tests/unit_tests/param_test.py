@@ -1,11 +1,12 @@
 import pytest
 
 from kenkenpa.models.stategraph import KStateGraphV1,KStateV1
-from kenkenpa.models.node import KNodeV1
+from kenkenpa.models.node import KNodeV1, KNodeCacheV1, KNodeRetryV1, KNodeBatchV1
 from kenkenpa.models.edge import KEdgeV1
 from kenkenpa.models.configurable_conditional_edge import KConfigurableConditionalEdgeV1
 from kenkenpa.models.configurable_conditional_entry_point import KConfigurableConditionalEntryPointV1
 from kenkenpa.models.conditions import KConditionExpressionV1,KConditionDefaultV1
+from kenkenpa.models.conditions import KConditionSwitchV1
 
 from kenkenpa.models.conditions import (
     KExpressionV1,
@@ -29,6 +30,18 @@ def test_create_parameter_node():
     param = create_parameter('node')
     KNodeV1(**param)
 
+def test_create_parameter_node_cache():
+    param = create_parameter('node_cache')
+    KNodeCacheV1(**param)
+
+def test_create_parameter_node_retry():
+    param = create_parameter('node_retry')
+    KNodeRetryV1(**param)
+
+def test_create_parameter_node_batch():
+    param = create_parameter('node_batch')
+    KNodeBatchV1(**param)
+
 def test_create_parameter_edge():
     param = create_parameter('edge')
     KEdgeV1(**param)
@@ -49,6 +62,10 @@ def test_create_parameter_condition_default():
     param = create_parameter('condition_default')
     KConditionDefaultV1(**param)
 
+def test_create_parameter_condition_switch():
+    param = create_parameter('condition_switch')
+    KConditionSwitchV1(**param)
+
 def test_create_parameter_condition_operater():
     param = create_parameter('operater_and')
     KExpressionV1(**param)
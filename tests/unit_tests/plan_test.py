@@ -0,0 +1,117 @@
+import pytest
+from kenkenpa.builder import StateGraphBuilder
+from kenkenpa.plan import (
+    gen_build_plan,
+    check_build_plan,
+    save_build_plan,
+    load_build_plan,
+    PLAN_VERSION,
+)
+
+def gen_visit_node(factory_parameter,flow_parameter):
+    def visit_node(state):
+        return {"visited": state["visited"] + [flow_parameter["name"]]}
+    return visit_node
+
+graph_settings = {
+    "graph_type":"stategraph",
+    "flow_parameter":{
+        "name":"plan_test",
+        "state":[
+            {"field_name": "visited", "type": "list"},
+            {"field_name": "count", "type": "int"},
+        ],
+    },
+    "flows": [
+        {"graph_type":"node","flow_parameter": {"name":"node_a","factory":"visit_node"}},
+        {"graph_type":"node","flow_parameter": {"name":"node_b","factory":"visit_node"}},
+        {"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"node_a"}},
+        {"graph_type":"edge","flow_parameter": {"start_key":"node_b","end_key":"END"}},
+        {
+            "graph_type":"configurable_conditional_edge",
+            "flow_parameter":{
+                "start_key":"node_a",
+                "conditions":[
+                    {
+                        "expression": {
+                            "and": [
+                                {"greater_than": [{"type": "state_value", "name": "count"}, 0]},
+                                {"not": {"==": [{"type": "state_value", "name": "count"}, 5]}},
+                            ]
+                        },
+                        "result": "node_b"
+                    },
+                    {"default": "END"}
+                ]
+            },
+        },
+    ]
+}
+
+def test_gen_build_plan():
+    plan = gen_build_plan(graph_settings)
+    assert plan["version"] == PLAN_VERSION
+    planned = plan["graph_settings"]
+    assert planned["flow_parameter"]["state"][0] == {"field_name": "visited", "type": "list"}
+    assert planned["flows"][2]["flow_parameter"] == {"start_key": ["__start__"], "end_key": ["node_a"]}
+    assert planned["flows"][0]["factory_parameter"] == {}
+
+    edge_parameter = planned["flows"][4]["flow_parameter"]
+    assert edge_parameter["path_map"] == ["node_b", "__end__"]
+    assert edge_parameter["match"] == "all"
+    assert edge_parameter["conditions"][0]["expression"] == {
+        "and": [
+            {"gt": [{"type": "state_value", "name": "count"}, 0]},
+            {"not": {"eq": [{"type": "state_value", "name": "count"}, 5]}},
+        ]
+    }
+    assert edge_parameter["conditions"][1] == {"default": "__end__"}
+
+    # the source settings are not modified.
+    assert graph_settings["flows"][2]["flow_parameter"]["start_key"] == "START"
+
+def test_check_build_plan(tmp_path):
+    plan = gen_build_plan(graph_settings)
+    path = tmp_path / "plan.json"
+    save_build_plan(plan, str(path))
+    assert load_build_plan(str(path), graph_settings) == plan
+
+    with pytest.raises(ValueError):
+        check_build_plan({**plan, "version": PLAN_VERSION + 1})
+    with pytest.raises(ValueError):
+        check_build_plan({**plan, "graph_settings": {**plan["graph_settings"], "flows": []}})
+    with pytest.raises(ValueError):
+        check_build_plan(plan, {**graph_settings, "flows": graph_settings["flows"][:4]})
+    with pytest.raises(ValueError):
+        check_build_plan({"graph_settings": {}})
+
+def test_builder_from_build_plan():
+    plan = gen_build_plan(graph_settings)
+    test_builder = StateGraphBuilder.from_build_plan(plan, graph_settings)
+    assert not test_builder.build_report.filter(phase="validate")
+    test_builder.add_node_factory("visit_node", gen_visit_node)
+    graph = test_builder.gen_stategraph().compile()
+
+    assert graph.invoke({"visited": [], "count": 1})["visited"] == ["node_a", "node_b"]
+    assert graph.invoke({"visited": [], "count": 5})["visited"] == ["node_a"]
+    assert graph.invoke({"visited": [], "count": 0})["visited"] == ["node_a"]
+
+def test_builder_from_build_plan_errors():
+    plan = gen_build_plan(graph_settings)
+    with pytest.raises(ValueError, match="without validation"):
+        StateGraphBuilder.from_build_plan(plan, validate=True)
+
+    # the state spec is kept as is, so a plan fails to build like its settings.
+    settings = {
+        **graph_settings,
+        "flow_parameter": {
+            **graph_settings["flow_parameter"],
+            "state": [{"field_name": "visited", "type": "list", "reducer": None}],
+        },
+    }
+    plan = gen_build_plan(settings)
+    assert plan["graph_settings"]["flow_parameter"]["state"] == settings["flow_parameter"]["state"]
+    for test_builder in (StateGraphBuilder(settings), StateGraphBuilder.from_build_plan(plan)):
+        test_builder.add_node_factory("visit_node", gen_visit_node)
+        with pytest.raises(ValueError, match="Unregistered function: None"):
+            test_builder.gen_stategraph()
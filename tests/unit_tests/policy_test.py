@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+import pytest
+from kenkenpa.policy import ConcurrencyLimiter, get_concurrency_limiter, limit_node, retry_policy
+
+def test_concurrency_limiter_threads():
+    limiter = ConcurrencyLimiter(2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        limiter.acquire()
+        try:
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+        finally:
+            limiter.release()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+    assert limiter.active == 0
+
+def test_concurrency_limiter_async():
+    limiter = ConcurrencyLimiter(1)
+    peak = []
+    active = []
+
+    async def work():
+        await limiter.aacquire()
+        try:
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+        finally:
+            limiter.release()
+
+    async def cancelled():
+        task = asyncio.ensure_future(work())
+        await asyncio.sleep(0)
+        task.cancel()
+
+    async def run():
+        await asyncio.gather(work(), work(), cancelled(), work(), return_exceptions=True)
+
+    asyncio.run(run())
+    assert max(peak) == 1
+    assert limiter.active == 0
+
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(0)
+
+def test_concurrency_limiter_cancelled_after_grant():
+    limiter = ConcurrencyLimiter(1)
+
+    async def run(cancel_before_grant):
+        await limiter.aacquire()
+        waiter = asyncio.ensure_future(limiter.aacquire())
+        await asyncio.sleep(0)
+        # the slot is handed over to the waiter, which is cancelled before
+        # (or after) the hand-off runs on the event loop.
+        limiter.release()
+        if not cancel_before_grant:
+            await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+
+    for cancel_before_grant in (True, False):
+        asyncio.run(run(cancel_before_grant))
+        assert limiter.active == 0
+
+    limiter.acquire()
+    assert limiter.active == 1
+    limiter.release()
+    assert limiter.active == 0
+
+def test_get_concurrency_limiter():
+    assert get_concurrency_limiter(("factory", "node"), 2) is get_concurrency_limiter(("factory", "node"), 2)
+    assert get_concurrency_limiter(("factory", "node"), 2) is not get_concurrency_limiter(("factory", "other"), 2)
+    with pytest.raises(ValueError):
+        get_concurrency_limiter(("factory", "node"), 3)
+
+def test_limit_node_timeout():
+    def slow(state):
+        time.sleep(0.2)
+        return {"done": True}
+
+    async def aslow(state):
+        await asyncio.sleep(0.2)
+        return {"done": True}
+
+    limiter = ConcurrencyLimiter(1)
+    with pytest.raises(TimeoutError):
+        limit_node(slow, "slow", timeout=0.02, limiter=limiter).invoke({})
+    # the slot is held until the abandoned call returns.
+    assert limiter.active == 1
+    time.sleep(0.3)
+    assert limiter.active == 0
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(limit_node(aslow, "aslow", timeout=0.02).ainvoke({}))
+    assert limit_node(slow, "slow", timeout=1).invoke({}) == {"done": True}
+
+    def failing(state, config):
+        raise TimeoutError("backend")
+    with pytest.raises(TimeoutError, match="backend"):
+        limit_node(failing, "failing", timeout=1).invoke({})
+
+    async def afailing(state):
+        raise TimeoutError("backend")
+    with pytest.raises(TimeoutError, match="backend"):
+        asyncio.run(limit_node(afailing, "afailing", timeout=1).ainvoke({}))
+
+def test_limit_node_executor(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from kenkenpa import policy
+
+    def thread_name(state):
+        return threading.current_thread().name
+    assert limit_node(thread_name, "name", timeout=1).invoke({}).startswith("kenkenpa-node")
+
+    def slow(state):
+        time.sleep(0.2)
+        return state
+
+    executor = ThreadPoolExecutor(1)
+    monkeypatch.setattr(policy, "_get_executor", lambda: executor)
+    limiter = ConcurrencyLimiter(2)
+    node = limit_node(slow, "slow", timeout=0.02, limiter=limiter)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            node.invoke({})
+    # the queued call was cancelled and released its slot.
+    assert limiter.active == 1
+    executor.shutdown(wait=True)
+    assert limiter.active == 0
+
+    class Closed:
+        def submit(self, func):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+    monkeypatch.setattr(policy, "_get_executor", Closed)
+    with pytest.raises(RuntimeError):
+        node.invoke({})
+    assert limiter.active == 0
+
+def test_retry_policy():
+    policy = retry_policy({"attempts": 5, "backoff": 0.1, "jitter": False})
+    assert policy.max_attempts == 5
+    assert policy.initial_interval == 0.1
+    assert policy.backoff_factor == 2.0
+    assert policy.retry_on is Exception
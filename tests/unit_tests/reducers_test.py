@@ -0,0 +1,80 @@
+from collections import deque
+import pytest
+from kenkenpa.reducers import (
+    BUILTIN_REDUCERS,
+    append,
+    get_builtin_reducer,
+    keep_last,
+    maximum,
+    merge,
+    minimum,
+    union,
+)
+
+def test_keep_last():
+    reducer = keep_last(3)
+    assert reducer([], [1, 2]) == [1, 2]
+    assert reducer([1, 2], [3, 4]) == [2, 3, 4]
+    assert reducer([1, 2], [3, 4, 5, 6]) == [4, 5, 6]
+    assert reducer([1, 2], 3) == [1, 2, 3]
+    assert reducer(None, None) == []
+    assert reducer(deque([1, 2, 3]), [4]) == [2, 3, 4]
+    assert reducer(deque([1, 2]), deque([3, 4, 5, 6])) == [4, 5, 6]
+    assert reducer([1, 2], {3}) == [1, 2, 3]
+    assert reducer({1}, (2, 3)) == [1, 2, 3]
+    assert sorted(reducer([], {4, 5, 6, 7})) in ([4, 5, 6], [4, 5, 7], [4, 6, 7], [5, 6, 7])
+
+    left = [1, 2]
+    reducer(left, [3])
+    assert left == [1, 2]
+
+    with pytest.raises(ValueError):
+        keep_last(0)
+
+def test_append():
+    reducer = append(3)
+    left = reducer([], [1, 2])
+    assert left == deque([1, 2]) and left.maxlen == 3
+    assert reducer(left, [3, 4]) == deque([2, 3, 4])
+    assert left == deque([1, 2])
+    assert reducer(left, [5, 6, 7, 8]) == deque([6, 7, 8])
+    assert reducer(None, "item") == deque(["item"])
+    assert reducer(deque(range(100)), {100}) == deque([98, 99, 100])
+    assert reducer({1}, deque([2])) == deque([1, 2])
+    assert list(append(5)([], list(range(5)))) == list(range(5))
+
+    with pytest.raises(ValueError):
+        append(0)
+
+def test_merge_union_max_min():
+    assert merge()({"a": 1, "b": 1}, {"b": 2}) == {"a": 1, "b": 2}
+    assert merge()(None, {"a": 1}) == {"a": 1}
+    assert merge()({"a": 1}, None) == {"a": 1}
+
+    assert union()({1, 2}, [2, 3]) == {1, 2, 3}
+    assert union()(None, "a") == {"a"}
+    assert isinstance(union()(frozenset({1}), {2}), frozenset)
+
+    assert maximum()(1, 3) == 3
+    assert maximum()(None, 2) == 2
+    assert maximum()(2, None) == 2
+    assert minimum()(1, 3) == 1
+    assert minimum()(None, 2) == 2
+
+def test_get_builtin_reducer():
+    with pytest.raises(ValueError):
+        get_builtin_reducer("append")
+    assert set(BUILTIN_REDUCERS) == {"keep_last", "append", "merge", "union", "max", "min"}
+    reducer = get_builtin_reducer("keep_last", {"n": 2})
+    assert get_builtin_reducer("keep_last", {"n": 2}) is reducer
+    assert get_builtin_reducer("keep_last", {"n": 3}) is not reducer
+    assert get_builtin_reducer("merge") is get_builtin_reducer("merge", {})
+
+    with pytest.raises(ValueError, match="Unregistered function: unknown"):
+        get_builtin_reducer("unknown")
+    with pytest.raises(ValueError, match="Invalid reducer_args"):
+        get_builtin_reducer("keep_last")
+    with pytest.raises(ValueError, match="Invalid reducer_args"):
+        get_builtin_reducer("merge", {"n": 1})
+    with pytest.raises(ValueError, match="Invalid reducer_args"):
+        get_builtin_reducer("keep_last", {"n": [1]})
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+import pytest
+from kenkenpa.builder import StateGraphBuilder
+from kenkenpa.registry import GraphRegistry
+
+def gen_graph_settings(name, node_count=1):
+    flows = [
+        {"graph_type":"node","flow_parameter": {"name":f"node_{index}","factory":"slow_node"}}
+        for index in range(node_count)
+    ]
+    flows.append({"graph_type":"edge","flow_parameter": {"start_key":"START","end_key":"node_0"}})
+    flows.append({
+        "graph_type":"edge",
+        "flow_parameter": {"start_key":[f"node_{index}" for index in range(node_count)],"end_key":"END"},
+    })
+    return {
+        "graph_type":"stategraph",
+        "flow_parameter":{"name":name,"state":[{"field_name": "count", "type": "int"}]},
+        "flows": flows,
+    }
+
+factory_calls = []
+
+def slow_node_factory(factory_parameter,flow_parameter):
+    factory_calls.append(flow_parameter["name"])
+    time.sleep(0.01)
+    def slow_node(state):
+        return {"count": state["count"] + 1}
+    return slow_node
+
+def new_registry(**kwargs):
+    return GraphRegistry(node_factorys={"slow_node": slow_node_factory}, **kwargs)
+
+def test_registry_build_once():
+    factory_calls.clear()
+    registry = new_registry()
+    registry.register("tenant_a", gen_graph_settings("tenant_a"))
+
+    graphs = []
+    threads = [threading.Thread(target=lambda: graphs.append(registry.get("tenant_a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(graph) for graph in graphs}) == 1
+    assert graphs[0].invoke({"count": 0})["count"] == 1
+    assert factory_calls == ["node_0"]
+    stats = registry.stats()
+    assert stats["builds"] == 1
+    assert stats["hits"] + stats["misses"] == 8
+    assert stats["build_seconds"] > 0
+
+def test_registry_async_build_once():
+    factory_calls.clear()
+    registry = new_registry()
+    registry.register("tenant_a", gen_graph_settings("tenant_a"))
+
+    async def get_all():
+        return await asyncio.gather(*(registry.aget("tenant_a") for _ in range(8)))
+
+    graphs = asyncio.run(get_all())
+    assert len({id(graph) for graph in graphs}) == 1
+    assert registry.stats()["builds"] == 1
+
+def test_registry_lru_eviction():
+    registry = new_registry(maxsize=2)
+    for key in ("a", "b", "c"):
+        registry.register(key, gen_graph_settings(key))
+
+    graph_a = registry.get("a")
+    registry.get("b")
+    assert registry.get("a") is graph_a
+    registry.get("c")
+    stats = registry.stats()
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+    # b was the least recently used.
+    assert registry.get("a") is graph_a
+    registry.get("b")
+    assert registry.stats()["builds"] == 4
+
+def test_registry_weight_budget():
+    registry = new_registry(max_weight=6)
+    registry.register("small", gen_graph_settings("small", 1))
+    registry.register("large", gen_graph_settings("large", 4))
+    registry.register("huge", gen_graph_settings("huge", 8))
+
+    # graphs are weighed by their nodes, including START.
+    registry.get("small")
+    registry.get("large")
+    stats = registry.stats()
+    assert stats["weight"] == 5
+    assert stats["evictions"] == 1
+
+    # a graph heavier than the budget is not kept.
+    registry.get("huge")
+    registry.get("huge")
+    assert registry.stats()["builds"] == 4
+
+def test_registry_register_and_unregister():
+    registry = new_registry()
+    registry.register("tenant_a", gen_graph_settings("tenant_a"))
+    graph = registry.get("tenant_a")
+    registry.register("tenant_a", gen_graph_settings("tenant_a", 2))
+    assert registry.get("tenant_a") is not graph
+    assert "tenant_a" in registry and len(registry) == 1
+
+    registry.unregister("tenant_a")
+    with pytest.raises(ValueError):
+        registry.get("tenant_a")
+    with pytest.raises(ValueError):
+        GraphRegistry(maxsize=0)
+
+def test_registry_builder_factory():
+    def builder_factory(key, graph_settings):
+        builder = StateGraphBuilder(graph_settings)
+        builder.add_node_factory("slow_node", slow_node_factory)
+        return builder
+
+    registry = GraphRegistry(builder_factory)
+    registry.register("tenant_a", gen_graph_settings("tenant_a"))
+    assert registry.get("tenant_a").invoke({"count": 1})["count"] == 2
+
+    registry.register("broken", {"graph_type":"stategraph"})
+    with pytest.raises(Exception):
+        registry.get("broken")
+    assert registry.stats()["build_errors"] == 1
+
+def test_registry_build_once_after_error():
+    active = []
+    overlaps = []
+
+    def builder_factory(key, graph_settings):
+        active.append(1)
+        overlaps.append(len(active))
+        try:
+            time.sleep(0.1)
+            if len(overlaps) == 1:
+                raise ConnectionError("unavailable")
+            builder = StateGraphBuilder(graph_settings)
+            builder.add_node_factory("slow_node", slow_node_factory)
+            return builder
+        finally:
+            active.pop()
+
+    registry = GraphRegistry(builder_factory)
+    registry.register("tenant_a", gen_graph_settings("tenant_a"))
+
+    def get():
+        try:
+            registry.get("tenant_a")
+        except ConnectionError:
+            pass
+
+    # the first build fails while the second waits, and the third get arrives
+    # while the second is building the graph after the failure.
+    threads = []
+    for delay in (0, 0.03, 0.15):
+        time.sleep(delay)
+        threads.append(threading.Thread(target=get))
+        threads[-1].start()
+    for thread in threads:
+        thread.join()
+
+    assert max(overlaps) == 1
+    assert registry.stats()["builds"] == 2
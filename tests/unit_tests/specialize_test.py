@@ -0,0 +1,129 @@
+from kenkenpa.specialize import (
+    specialize_settings,
+    fold_expression,
+    fold_conditions,
+    static_results,
+)
+
+def mode(name="mode"):
+    return {"type": "config_value", "name": name}
+
+def test_fold_expression():
+    config_values = {"mode": "fast", "limit": 3, "tools": ["a"]}
+    assert fold_expression({"eq": [mode(), "fast"]}, config_values) is True
+    assert fold_expression({"eq": [mode(), "slow"]}, config_values) is False
+    assert fold_expression({"not": {"gt": [mode("limit"), 5]}}, config_values) is True
+    assert fold_expression({"eq": [1, 1]}, {}) is True
+
+    # values that are not scalars and unknown names are left to the runtime.
+    assert fold_expression({"eq": [mode("tools"), ["a"]]}, config_values) == {"eq": [mode("tools"), ["a"]]}
+    assert fold_expression({"eq": [mode("other"), 1]}, config_values) == {"eq": [mode("other"), 1]}
+
+    # comparisons that raise are kept.
+    assert fold_expression({"gt": [mode(), 1]}, config_values) == {"gt": ["fast", 1]}
+
+    state_expr = {"eq": [{"type": "state_value", "name": "flag"}, True]}
+    assert fold_expression({"and": [{"eq": [mode(), "fast"]}, state_expr]}, config_values) == {"and": [state_expr]}
+    assert fold_expression({"and": [{"eq": [mode(), "slow"]}, state_expr]}, config_values) is False
+    # operands evaluated before the deciding one are kept, since they may raise.
+    assert fold_expression({"or": [state_expr, {"eq": [mode(), "fast"]}, state_expr]}, config_values) == {
+        "or": [state_expr, {"and": []}]}
+    assert fold_expression({"and": [state_expr, {"eq": [mode(), "slow"]}]}, config_values) == {
+        "and": [state_expr, {"or": []}]}
+    assert fold_expression({"or": [state_expr, {"eq": [mode(), "slow"]}]}, config_values) == {"or": [state_expr]}
+
+def test_fold_conditions():
+    state_expr = {"eq": [{"type": "state_value", "name": "flag"}, True]}
+    conditions = [
+        {"expression": {"eq": [mode(), "slow"]}, "result": "slow_node"},
+        {"expression": state_expr, "result": "state_node"},
+        {"expression": {"eq": [mode(), "fast"]}, "result": mode("next")},
+        {"default": "END"},
+    ]
+    config_values = {"mode": "fast", "next": "fast_node"}
+
+    assert fold_conditions(conditions, config_values) == [
+        {"expression": state_expr, "result": "state_node"},
+        {"expression": {"and": []}, "result": "fast_node"},
+        {"default": "END"},
+    ]
+    assert fold_conditions(conditions[2:], config_values, "first") == [
+        {"expression": {"and": []}, "result": "fast_node"},
+    ]
+
+def test_fold_conditions_keeps_errors():
+    import pytest
+    from kenkenpa.edges import ConfigurableConditionalHandler
+
+    conditions = [
+        {"expression": {"and": [{"lte": [1, "b"]}, {"eq": [mode(), "slow"]}]}, "result": "n1"},
+        {"default": "n2"},
+    ]
+    folded = fold_conditions(conditions, {"mode": "fast"})
+    assert folded[0]["expression"] == {"and": [{"lte": [1, "b"]}, {"or": []}]}
+    assert static_results(folded) is None
+    for settings in (conditions, folded):
+        with pytest.raises(TypeError):
+            ConfigurableConditionalHandler(settings, {})({}, {})
+
+def test_fold_switch():
+    conditions = [
+        {
+            "switch": mode(),
+            "cases": [
+                {"value": "fast", "result": "fast_node"},
+                {"value": "slow", "result": "slow_node"},
+                {"value": "fast", "result": "other_node"},
+            ],
+        },
+        {"default": "END"},
+    ]
+    assert fold_conditions(conditions, {"mode": "fast"}) == [
+        {"expression": {"and": []}, "result": "fast_node"},
+        {"expression": {"and": []}, "result": "other_node"},
+        {"default": "END"},
+    ]
+    assert fold_conditions(conditions, {"mode": "fast"}, "first") == [
+        {"expression": {"and": []}, "result": "fast_node"},
+    ]
+    assert fold_conditions(conditions, {"mode": "none"}) == [{"default": "END"}]
+    assert fold_conditions(conditions, {}) == conditions
+
+def test_static_results():
+    always = {"and": []}
+    assert static_results([{"expression": always, "result": ["a", "b"]}, {"expression": always, "result": "a"}]) == ["a", "b"]
+    assert static_results([{"default": "END"}]) == ["END"]
+    assert static_results([{"expression": always, "result": "a"}, {"default": "END"}]) == ["a"]
+    assert static_results([{"expression": {"eq": [{"type": "state_value", "name": "x"}, 1]}, "result": "a"}]) is None
+    assert static_results([{"expression": always, "result": {"type": "state_value", "name": "x"}}]) is None
+    assert static_results([]) is None
+
+def test_specialize_settings():
+    graph_settings = {
+        "graph_type": "stategraph",
+        "flow_parameter": {"name": "root", "state": []},
+        "flows": [
+            {"graph_type": "node", "flow_parameter": {"name": "fast_node", "factory": "f"}},
+            {"graph_type": "node", "flow_parameter": {"name": "slow_node", "factory": "f"}},
+            {
+                "graph_type": "configurable_conditional_entry_point",
+                "flow_parameter": {
+                    "conditions": [
+                        {"expression": {"eq": [mode(), "fast"]}, "result": "fast_node"},
+                        {"default": "slow_node"},
+                    ],
+                },
+            },
+            {"graph_type": "edge", "flow_parameter": {"start_key": ["fast_node", "slow_node"], "end_key": "END"}},
+        ],
+    }
+    specialized = specialize_settings(graph_settings, {"mode": "fast"})
+    assert specialized["flows"] == [
+        {"graph_type": "node", "flow_parameter": {"name": "fast_node", "factory": "f"}},
+        {"graph_type": "edge", "flow_parameter": {"start_key": "START", "end_key": ["fast_node"]}},
+        {"graph_type": "edge", "flow_parameter": {"start_key": ["fast_node"], "end_key": "END"}},
+    ]
+    assert len(graph_settings["flows"]) == 4
+
+    unpruned = specialize_settings(graph_settings, {"mode": "fast"}, prune=False)
+    assert len(unpruned["flows"]) == 4
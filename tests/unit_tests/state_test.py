@@ -120,4 +120,65 @@ def test_statebuilder_gen_state_init():
     assert state_class.__annotations__['udf'].__origin__ == DummyType
     assert state_class.__annotations__['udf'].__metadata__[0] == reduce_test
     assert 'scalar' in state_class.__annotations__
-    assert state_class.__annotations__['scalar'] == str
\ No newline at end of file
+    assert state_class.__annotations__['scalar'] == str
+
+# Test for interning state classes with StateBuilder
+def test_statebuilder_gen_state_interned():
+    def reduce_test(left, right):
+        pass
+    def other_reduce_test(left, right):
+        pass
+    test_state = [
+        {"field_name": "operatoradd", "type": "list", "reducer": "add"},
+        {"field_name": "udf", "type": "list", "reducer": "reduce_test"},
+        {"field_name": "scalar", "type": "str"},
+    ]
+    state_builder_a = StateBuilder(reducers={"add": operator.add, "reduce_test": reduce_test})
+    state_builder_b = StateBuilder(reducers={"add": operator.add, "reduce_test": reduce_test})
+    state_builder_c = StateBuilder(reducers={"add": operator.add, "reduce_test": other_reduce_test})
+
+    state_class = state_builder_a.gen_state(test_state)
+    assert state_builder_a.gen_state(test_state) is state_class
+    assert state_builder_b.gen_state(test_state) is state_class
+    assert state_builder_c.gen_state(test_state) is not state_class
+
+    assert state_builder_a.gen_state(test_state[:2]) is not state_class
+    assert state_builder_a.gen_state([
+        {"field_name": "scalar", "type": "str", "reducer": "add"}
+    ]) is not state_builder_a.gen_state([
+        {"field_name": "scalar", "type": "str"}
+    ])
+
+def test_statebuilder_gen_state_weakly_interned():
+    import gc
+    from kenkenpa import state as state_module
+
+    test_state = [{"field_name": "weakly_interned_field", "type": "int"}]
+    state_builder = StateBuilder()
+    state_class = state_builder.gen_state(test_state)
+    key = (("weakly_interned_field", id(int), id(state_module._NO_REDUCER)),)
+    assert state_module._state_classes.get(key) is state_class
+
+    del state_class
+    gc.collect()
+    assert state_module._state_classes.get(key) is None
+
+def test_statebuilder_builtin_reducers():
+    from kenkenpa.reducers import get_builtin_reducer
+
+    test_state = [
+        {"field_name": "messages", "type": "list", "reducer": "keep_last", "reducer_args": {"n": 50}},
+        {"field_name": "scores", "type": "dict", "reducer": "merge"},
+    ]
+    state_builder = StateBuilder()
+    state_class = state_builder.gen_state(test_state)
+    assert state_class.__annotations__['messages'].__metadata__[0] is get_builtin_reducer("keep_last", {"n": 50})
+    assert state_class.__annotations__['scores'].__metadata__[0] is get_builtin_reducer("merge")
+    assert StateBuilder().gen_state(test_state) is state_class
+
+    def custom_merge(left, right):
+        pass
+    state_builder = StateBuilder(reducers={"merge": custom_merge})
+    assert state_builder._get_reducer("merge") is custom_merge
+    with pytest.raises(ValueError, match="only supported by built-in reducers"):
+        state_builder._get_reducer("merge", {"n": 1})